@@ -0,0 +1,308 @@
+"""
+Indicadores por vendedor para GET /api/analytics/*.
+
+- ranking(de, ate): total de cada vendedor no período, posição e
+  participação no total
+- periodos("semana" | "mes", de, ate): total de cada vendedor por semana
+  ISO ou por mês, lido dos rollups (daily_sales já agregado, ver
+  rollups.py), com posição e participação no período, média móvel das
+  últimas 4 semanas (ou meses) e variação sobre o período anterior
+
+Dois motores, com o mesmo resultado:
+- "sql": funções de janela (RANK, SUM/AVG/LAG OVER) numa consulta só.
+  Padrão no PostgreSQL
+- "numpy": o banco só devolve os totais e as janelas são calculadas em
+  matrizes vendedor x período. Padrão no SQLite quando o pacote opcional
+  numpy está instalado; sem ele, o SQLite usa as funções de janela
+
+ANALYTICS_ENGINE=sql|numpy força um dos dois.
+
+As respostas ficam num LRU próprio de cada worker (ANALYTICS_CACHE_MAX_ITEMS,
+ANALYTICS_CACHE_TTL), nunca no render_cache: a query string é livre e não
+pode descartar o HTML de /tv e /resumo. A chave inclui o token "history".
+
+Vendedor sem registro num período não aparece nele, mas conta como zero
+na média móvel e na variação do período seguinte. A média e a variação do
+primeiro período pedido usam os períodos anteriores a ele; para o ranking,
+os meses inteiros do intervalo vêm do rollup mensal e só as pontas são
+somadas de daily_sales.
+"""
+import os
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select, text, tuple_, union_all
+
+from grid_cache import LocalBackend
+from models.archive import DailySales, MonthlySalesRollup
+from models.user import db
+
+ENGINES = ("sql", "numpy")
+# Períodos na média móvel (4 semanas, ou 4 meses na visão mensal)
+JANELA_MEDIA = 4
+
+# tabela de rollup e colunas (ano, número do período) de cada visão
+PERIODOS = {
+    "semana": ("weekly_sales_rollup", "iso_ano", "iso_semana"),
+    "mes": ("monthly_sales_rollup", "ano", "mes"),
+}
+
+# ordem: posição do período entre os que têm vendas (1, 2, ...), para a
+# média e a variação enxergarem os períodos em que o vendedor não aparece
+PERIODOS_SQL = """
+WITH base AS (
+    SELECT vendedor, {ano} AS ano, {num} AS num, total,
+           DENSE_RANK() OVER (ORDER BY {ano}, {num}) AS ordem,
+           RANK() OVER p AS posicao,
+           total / NULLIF(SUM(total) OVER (p RANGE BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING), 0)
+               AS participacao
+    FROM {tabela}
+    WHERE ({ano}, {num}) >= (:ano_antes, :num_antes) AND ({ano}, {num}) <= (:ano_fim, :num_fim)
+    WINDOW p AS (PARTITION BY {ano}, {num} ORDER BY total DESC)
+),
+janelas AS (
+    SELECT vendedor, ano, num, total, posicao, participacao,
+           SUM(total) OVER (w RANGE BETWEEN {precedentes} PRECEDING AND CURRENT ROW)
+               / CASE WHEN ordem < {janela} THEN ordem ELSE {janela} END AS media_movel,
+           CASE WHEN LAG(ordem) OVER w = ordem - 1 THEN LAG(total) OVER w
+                WHEN ordem > 1 THEN 0 END AS anterior
+    FROM base
+    WINDOW w AS (PARTITION BY vendedor ORDER BY ordem)
+)
+SELECT vendedor, ano, num, total, posicao, participacao, media_movel, anterior
+FROM janelas
+WHERE (ano, num) >= (:ano_ini, :num_ini) {filtro_vendedor}
+ORDER BY ano, num, posicao, vendedor
+"""
+
+
+class AnalyticsError(ValueError):
+    pass
+
+
+def init_app(app):
+    app.config.setdefault("ANALYTICS_CACHE_MAX_ITEMS", int(os.getenv("ANALYTICS_CACHE_MAX_ITEMS", "128")))
+    app.config.setdefault("ANALYTICS_CACHE_TTL", int(os.getenv("ANALYTICS_CACHE_TTL", "60")))
+    app.extensions["analytics_cache"] = LocalBackend(app.config["ANALYTICS_CACHE_MAX_ITEMS"])
+
+
+def cached(key, compute):
+    """Resposta guardada sob `key` (que deve incluir a versão dos dados), ou compute()."""
+    backend = current_app.extensions["analytics_cache"]
+    body = backend.get(key)
+    if body is None:
+        body = compute()
+        backend.set(key, body, current_app.config["ANALYTICS_CACHE_TTL"])
+    return body
+
+
+def engine():
+    """Motor em uso nesta aplicação ("sql" ou "numpy")."""
+    escolhido = current_app.config.get("ANALYTICS_ENGINE") or os.getenv("ANALYTICS_ENGINE", "auto")
+    if escolhido in ENGINES:
+        return escolhido
+    if db.engine.dialect.name == "sqlite":
+        try:
+            import numpy  # noqa: F401
+            return "numpy"
+        except ImportError:
+            pass
+    return "sql"
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise AnalyticsError("ANALYTICS_ENGINE=numpy requer o pacote 'numpy'")
+    return numpy
+
+
+# ---------------------------
+# Ranking do período
+# ---------------------------
+def _fonte_ranking(de, ate):
+    """(vendedor, total) do intervalo: meses inteiros do rollup mensal, pontas de daily_sales."""
+    primeiro = de if de.day == 1 else (de.replace(day=28) + timedelta(days=4)).replace(day=1)
+    fim_mes = (ate.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    ultimo = ate if ate == fim_mes else ate.replace(day=1) - timedelta(days=1)
+    if primeiro > ultimo:
+        # Nenhum mês inteiro no intervalo
+        return select(DailySales.vendedor, DailySales.total).where(DailySales.dia.between(de, ate))
+
+    partes = [
+        select(MonthlySalesRollup.vendedor, MonthlySalesRollup.total).where(
+            tuple_(MonthlySalesRollup.ano, MonthlySalesRollup.mes) >= (primeiro.year, primeiro.month),
+            tuple_(MonthlySalesRollup.ano, MonthlySalesRollup.mes) <= (ultimo.year, ultimo.month),
+        )
+    ]
+    if de < primeiro:
+        partes.append(select(DailySales.vendedor, DailySales.total).where(DailySales.dia.between(de, primeiro - timedelta(days=1))))
+    if ultimo < ate:
+        partes.append(select(DailySales.vendedor, DailySales.total).where(DailySales.dia.between(ultimo + timedelta(days=1), ate)))
+    return union_all(*partes)
+
+
+def ranking(de, ate, motor=None):
+    motor = motor or engine()
+    fonte = _fonte_ranking(de, ate).subquery()
+    total = func.sum(fonte.c.total)
+    query = db.session.query(fonte.c.vendedor, total.label("total")).group_by(fonte.c.vendedor)
+    if motor == "sql":
+        posicao = func.rank().over(order_by=total.desc())
+        participacao = total / func.nullif(func.sum(total).over(), 0)
+        rows = [
+            (r.vendedor, r.total, r.posicao, r.participacao)
+            for r in query.add_columns(posicao.label("posicao"), participacao.label("participacao"))
+            .order_by(posicao, fonte.c.vendedor)
+        ]
+    else:
+        rows = _ranking_numpy(query.all())
+    return [
+        {"vendedor": vendedor, "total": total or 0, "posicao": posicao, "participacao": participacao}
+        for vendedor, total, posicao, participacao in rows
+    ]
+
+
+def _posicoes(np, valores):
+    # RANK(): 1 + quantos valores são maiores (empates dividem a posição)
+    return np.searchsorted(np.sort(-valores), -valores, side="left") + 1
+
+
+def _ranking_numpy(rows):
+    np = _numpy()
+    if not rows:
+        return []
+    vendedores = [r.vendedor for r in rows]
+    totais = np.array([r.total or 0 for r in rows], dtype=float)
+    posicoes = _posicoes(np, totais)
+    soma = totais.sum()
+    participacoes = totais / soma if soma else np.full(len(totais), np.nan)
+    ordem = sorted(range(len(rows)), key=lambda i: (posicoes[i], vendedores[i]))
+    return [
+        (vendedores[i], float(totais[i]), int(posicoes[i]), _float(participacoes[i]))
+        for i in ordem
+    ]
+
+
+# ---------------------------
+# Séries por semana / mês (rollups)
+# ---------------------------
+def _chave(periodo, dia):
+    if periodo == "semana":
+        iso = dia.isocalendar()
+        return iso[0], iso[1]
+    return dia.year, dia.month
+
+
+def _antes(periodo, dia):
+    """Dia dentro do período JANELA_MEDIA - 1 períodos antes do de `dia`."""
+    if periodo == "semana":
+        return dia - timedelta(weeks=JANELA_MEDIA - 1)
+    mes = dia.year * 12 + dia.month - 1 - (JANELA_MEDIA - 1)
+    return date(mes // 12, mes % 12 + 1, 1)
+
+
+def _rotulo(periodo, ano, num):
+    if periodo == "semana":
+        return date.fromisocalendar(ano, num, 1).isoformat()  # segunda-feira da semana
+    return f"{ano}-{num:02d}"
+
+
+def periodos(periodo, de, ate, vendedor=None, motor=None):
+    if periodo not in PERIODOS:
+        raise AnalyticsError(f"Período inválido: {periodo}")
+    motor = motor or engine()
+    params = {}
+    for nome, dia in (("antes", _antes(periodo, de)), ("ini", de), ("fim", ate)):
+        params[f"ano_{nome}"], params[f"num_{nome}"] = _chave(periodo, dia)
+    rows = _periodos_sql(periodo, params, vendedor) if motor == "sql" else _periodos_numpy(periodo, params, vendedor)
+
+    itens = []
+    for vendedor_, ano, num, total, posicao, participacao, media, anterior in rows:
+        variacao = total - anterior if anterior is not None else None
+        itens.append({
+            "periodo": _rotulo(periodo, ano, num),
+            "vendedor": vendedor_,
+            "total": total,
+            "posicao": posicao,
+            "participacao": participacao,
+            "media_movel": media,
+            "variacao": variacao,
+            "variacao_pct": variacao / anterior if anterior else None,
+        })
+    return itens
+
+
+def _periodos_sql(periodo, params, vendedor):
+    tabela, ano, num = PERIODOS[periodo]
+    filtro = ""
+    if vendedor:
+        filtro = "AND vendedor = :vendedor"
+        params = dict(params, vendedor=vendedor)
+    sql = PERIODOS_SQL.format(
+        tabela=tabela, ano=ano, num=num, janela=JANELA_MEDIA, precedentes=JANELA_MEDIA - 1, filtro_vendedor=filtro
+    )
+    return [tuple(r) for r in db.session.execute(text(sql), params)]
+
+
+def _periodos_numpy(periodo, params, vendedor):
+    np = _numpy()
+    tabela, ano, num = PERIODOS[periodo]
+    # Os limites são inteiros calculados de datas: podem ir no texto da consulta
+    rows = db.session.connection().exec_driver_sql(
+        f"SELECT vendedor, {ano} * 100 + {num}, total FROM {tabela} "
+        f"WHERE ({ano}, {num}) >= ({params['ano_antes']:d}, {params['num_antes']:d}) "
+        f"AND ({ano}, {num}) <= ({params['ano_fim']:d}, {params['num_fim']:d})"
+    ).all()
+    if not rows:
+        return []
+    nomes, chaves, totais = zip(*rows)
+    indices = {}
+    v_idx = np.array([indices.setdefault(nome, len(indices)) for nome in nomes])
+    vendedores = list(indices)
+    periodos_, p_idx = np.unique(np.array(chaves, dtype=np.int64), return_inverse=True)
+
+    # Matrizes vendedor x período; sem registro conta como zero
+    grade = np.zeros((len(vendedores), len(periodos_)))
+    grade[v_idx, p_idx] = np.array(totais, dtype=float)
+    presente = np.zeros(grade.shape, dtype=bool)
+    presente[v_idx, p_idx] = True
+
+    somas = grade.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        participacao = np.where(somas != 0, grade / somas, np.nan)
+    # Posição só entre quem tem registro no período
+    concorrentes = np.where(presente, grade, -np.inf)
+    posicao = np.empty(grade.shape, dtype=np.int64)
+    for j in range(grade.shape[1]):
+        posicao[:, j] = _posicoes(np, concorrentes[:, j])
+
+    # Média móvel pela soma acumulada: janela de até JANELA_MEDIA períodos
+    acumulado = np.concatenate([np.zeros((len(grade), 1)), grade.cumsum(axis=1)], axis=1)
+    fim = np.arange(1, grade.shape[1] + 1)
+    inicio = np.maximum(fim - JANELA_MEDIA, 0)
+    media = (acumulado[:, fim] - acumulado[:, inicio]) / (fim - inicio)
+    anterior = np.concatenate([np.full((len(grade), 1), np.nan), grade[:, :-1]], axis=1)
+
+    # Células com registro nos períodos pedidos, na ordem do SQL: período, posição, vendedor
+    selecao = presente & (periodos_ >= params["ano_ini"] * 100 + params["num_ini"])
+    if vendedor:
+        selecao &= (np.arange(len(vendedores)) == indices.get(vendedor, -1))[:, None]
+    ordem_nome = np.empty(len(vendedores), dtype=np.int64)
+    ordem_nome[sorted(range(len(vendedores)), key=vendedores.__getitem__)] = np.arange(len(vendedores))
+    i, j = np.nonzero(selecao)
+    ordem = np.lexsort((ordem_nome[i], posicao[i, j], j))
+    i, j = i[ordem], j[ordem]
+    anos, nums = np.divmod(periodos_[j], 100)
+    return [
+        (vendedores[v], ano_, num_, total, pos, _float(part), media_, _float(ant))
+        for v, ano_, num_, total, pos, part, media_, ant in zip(
+            i.tolist(), anos.tolist(), nums.tolist(), grade[i, j].tolist(), posicao[i, j].tolist(),
+            participacao[i, j].tolist(), media[i, j].tolist(), anterior[i, j].tolist(),
+        )
+    ]
+
+
+def _float(valor):
+    return None if valor != valor else float(valor)  # NaN -> None (NULL no SQL)
@@ -1,29 +1,41 @@
 import os
-import logging
+import json
 import urllib.parse
-from flask import Flask, send_from_directory, render_template
+from flask import Flask, send_from_directory, render_template, make_response
 from flask_cors import CORS
-
-# Lista fixa de funcionários (reutilizada em /tv e outros lugares)
-EMPLOYEES = [
-    {"name": "Anderson", "password": "123"},
-    {"name": "Vitoria", "password": "123"},
-    {"name": "Jemima", "password": "123"},
-    {"name": "Maiany", "password": "123"},
-    {"name": "Fernanda", "password": "123"},
-    {"name": "Nadia", "password": "123"},
-    {"name": "Giovana", "password": "123"}
-]
+from sqlalchemy.engine import make_url
 
 # Imports dos blueprints
 from models.user import db
+from models.migrations import db_cli
+from grid_cache import conditional_response, grid_cache
+from render_cache import render_cache
+from roster import roster
+import analytics
+import live_updates
+import formatting
+from formatting import format_brl_many
+import health
+import log_config
+import metrics
+import request_timing
+from db_pool import engine_options
+from rollups import rollups_cli
+from sales_export import export_command
+from sales_import import import_command
+from scheduler import jobs_cli
 from routes.user import user_bp
 from routes.data import data_bp
 from routes.archive import archive_bp
 from routes.resumo import resumo_bp  # dashboard
+from routes.analytics import analytics_bp
+
+
+def safe_database_uri(app):
+    return make_url(app.config["SQLALCHEMY_DATABASE_URI"]).render_as_string(hide_password=True)
 
 
-def create_app():
+def create_app(test_config=None):
     # ✅ Define explicitamente onde estão os templates
     app = Flask(
         __name__,
@@ -43,26 +55,47 @@ def create_app():
         db_url = db_url.replace("postgres://", "postgresql+psycopg2://", 1)
         db_url = db_url.replace("postgresql://", "postgresql+psycopg2://", 1)
         app.config["SQLALCHEMY_DATABASE_URI"] = db_url
-        print(f"🔗 Conectando ao banco PostgreSQL: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    elif db_url and db_url.startswith("sqlite:"):
+        app.config["SQLALCHEMY_DATABASE_URI"] = db_url
     else:
         # Usar SQLite como padrão
         db_path = os.path.join(os.path.dirname(__file__), "database", "app.db")
         app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
-        print(f"🔗 Usando banco SQLite: {app.config['SQLALCHEMY_DATABASE_URI']}")
 
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-    # Ativar logs SQL
-    logging.basicConfig()
-    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+    # Sobrescritas explícitas (benchmarks/scripts), ex.: banco SQLite em memória
+    if test_config:
+        app.config.update(test_config)
+
+    # Pool de conexões (PostgreSQL): tamanho, recycle e pre-ping via ambiente
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config["SQLALCHEMY_DATABASE_URI"]))
+
+    # Logs: SQL desligado por padrão; consultas lentas/amostradas em JSON (ver log_config)
+    log_config.init_app(app)
+    app.logger.info("Banco: %s", safe_database_uri(app))
 
     # Inicializa banco
     db.init_app(app)
+    grid_cache.init_app(app)
+    render_cache.init_app(app)
+    analytics.init_app(app)
+    roster.init_app(app)
+    live_updates.init_app(app)
+    metrics.init_app(app)
+    request_timing.init_app(app)
+    # Nenhum acesso ao banco aqui: o esquema é conferido na primeira
+    # requisição e migrado por `flask db upgrade` (ver health.py)
+    health.init_app(app)
 
-    # 🔑 Cria as tabelas no banco (incluindo 'sales')
-    with app.app_context():
-        db.create_all()
-        print("✅ Tabelas do banco verificadas/criadas com sucesso.")
+    # ---------------------------
+    # Comandos de linha (flask rollups rebuild, ...)
+    # ---------------------------
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(export_command)
+    app.cli.add_command(import_command)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(db_cli)
 
     # ---------------------------
     # CORS
@@ -76,35 +109,47 @@ def create_app():
     app.register_blueprint(data_bp, url_prefix="/api")
     app.register_blueprint(archive_bp, url_prefix="/archive")  # API de arquivamento
     app.register_blueprint(resumo_bp)  # Dashboard /resumo
+    app.register_blueprint(analytics_bp, url_prefix="/api/analytics")  # Indicadores em JSON
 
     # ---------------------------
     # Filtro Jinja moeda brasileira
     # ---------------------------
-    @app.template_filter("format_brl")
-    def format_brl(value):
-        try:
-            return f"{float(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        except (ValueError, TypeError):
-            return "0,00"
+    formatting.init_app(app)
 
     # ---------------------------
     # Rota para verificar banco
     # ---------------------------
     @app.route("/db-check")
     def db_check():
-        return f"Banco em uso: {app.config['SQLALCHEMY_DATABASE_URI']}"
+        return f"Banco em uso: {safe_database_uri(app)}"
 
     # ---------------------------
     # Rota pública /tv para exibição em telão (AGORA USA O BANCO!)
     # ---------------------------
     @app.route("/tv")
     def tv():
-        from models.sales import Sale  # Importa dentro da rota para evitar problemas de ciclo
+        from routes.data import grid_etag, load_data_snapshot  # Importa dentro da rota para evitar problemas de ciclo
+        grade = grid_etag()
+        # A página depende só da grade e do template: mesma grade, mesmo ETag
+        etag = f"tv-{grade}-{tv_template_version}"
+        # Mesmo ETag, mesmo HTML: hits repetidos não passam pelo Jinja nem montam a grade
+        return conditional_response(etag, lambda: make_response(
+            render_cache.get_or_render(etag, lambda: render_tv(json.loads(load_data_snapshot(grade).body)))
+        ))
+
+    # Telas conectadas recebem as células alteradas assim que a planilha é salva
+    @app.route("/tv/stream")
+    def tv_stream():
+        from routes.data import load_data_snapshot
+        return live_updates.stream_response(load_data_snapshot)
+
+    def render_tv(data):
+        planilha = data["spreadsheetData"]
         dados = []
-        for emp in EMPLOYEES:
+        # Vendedores do próprio snapshot: o HTML fica em cache sob o ETag dele
+        for emp in data["employees"]:
             nome = emp["name"]
-            sales = Sale.query.filter_by(employee_name=nome).all()
-            day_values = {s.day: s.value for s in sales}
+            day_values = planilha.get(nome, {})
             linha = {
                 "nome": nome,
                 "seg": day_values.get("monday", 0),
@@ -129,8 +174,19 @@ def create_app():
             "qui": sum(linha["qui"] for linha in dados),
             "sex": sum(linha["sex"] for linha in dados),
         }
+        totais_diarios["total"] = sum(totais_diarios.values())
+
+        # Grade inteira formatada num lote só (linhas e a linha de totais)
+        campos = ("seg", "ter", "qua", "qui", "sex", "total")
+        textos = iter(format_brl_many([linha[c] for linha in dados + [totais_diarios] for c in campos]))
+        for linha in dados:
+            linha["brl"] = {c: next(textos) for c in campos}
+        totais_brl = {c: next(textos) for c in campos}
+
+        return render_template("tv.html", dados=dados, totais_brl=totais_brl)
 
-        return render_template("tv.html", dados=dados, totais_diarios=totais_diarios)
+    # Muda quando o template muda (deploy), invalidando ETags antigos do /tv
+    tv_template_version = int(os.path.getmtime(os.path.join(app.template_folder, "tv.html")))
 
     # ---------------------------
     # Rotas estáticas / SPA
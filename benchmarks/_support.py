@@ -0,0 +1,77 @@
+"""Utilitários compartilhados pelos benchmarks (app em memória, contagem de SQL)."""
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from models.migrations import run_migrations
+from models.sales import SaleFact
+from models.seller import Seller
+from models.user import db
+from roster import roster
+
+
+def make_app(database_uri="sqlite://"):
+    """Cria a aplicação real apontando para um banco descartável, já migrado."""
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_uri})
+    with app.app_context():
+        run_migrations()
+    return app
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+        self.parameters = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+
+@contextmanager
+def count_queries():
+    """Conta os comandos SQL enviados ao banco dentro do bloco."""
+    counter = QueryCounter()
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+def timeit(fn, repeat):
+    """Executa fn `repeat` vezes e devolve a lista de durações em segundos."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def fake_roster(size):
+    return [{"name": f"Vendedor {i:04d}", "password": "123"} for i in range(size)]
+
+
+def seed_sellers(names, password="123"):
+    """
+    Recria o cadastro de vendedores (apagando as vendas, que apontam para
+    eles); um só hash para todos (o hash é lento de propósito). Retorna
+    nome -> id.
+    """
+    hashed = generate_password_hash(password)
+    db.session.query(SaleFact).delete()
+    db.session.query(Seller).delete()
+    db.session.execute(Seller.__table__.insert(), [
+        {"name": name, "password": hashed, "position": i, "active": True}
+        for i, name in enumerate(names)
+    ])
+    db.session.commit()
+    roster.changed()
+    return dict(db.session.query(Seller.name, Seller.id).all())
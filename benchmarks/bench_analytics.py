@@ -0,0 +1,98 @@
+"""
+Benchmark dos indicadores de /api/analytics (analytics.py).
+
+Gera a massa de benchmarks.seed (ATENÇÃO: apaga as tabelas; use um banco
+descartável) e mede cada consulta nos dois motores (funções de janela no
+SQL e NumPy), sem o cache de resposta. Antes de medir, confere que os dois
+motores devolvem os mesmos itens. Sai com código 1 se divergirem ou se a
+mediana de alguma consulta no motor padrão do banco (analytics.engine())
+passar do orçamento; o outro motor só é medido para comparação.
+
+Uso:
+    python -m benchmarks.bench_analytics --sellers 300 --years 3
+    python -m benchmarks.bench_analytics --database-url postgresql+psycopg2://... --budget-ms 100
+"""
+import argparse
+import math
+import statistics
+import sys
+from datetime import date, timedelta
+
+import analytics
+from benchmarks._support import make_app, timeit
+from benchmarks.seed import seed
+
+
+def consultas(hoje):
+    inicio_mes = hoje.replace(day=1)
+    return [
+        ("ranking (mês)", lambda m: analytics.ranking(inicio_mes, hoje, motor=m)),
+        ("ranking (1 ano)", lambda m: analytics.ranking(hoje - timedelta(days=365), hoje, motor=m)),
+        ("semanal (12 semanas)", lambda m: analytics.periodos("semana", hoje - timedelta(weeks=11), hoje, motor=m)),
+        ("semanal (1 ano, 1 vendedor)", lambda m: analytics.periodos(
+            "semana", hoje - timedelta(days=365), hoje, vendedor="Vendedor 0000", motor=m)),
+        ("mensal (12 meses)", lambda m: analytics.periodos("mes", date(hoje.year - 1, hoje.month, 1), hoje, motor=m)),
+    ]
+
+
+def iguais(a, b):
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if x.keys() != y.keys():
+            return False
+        for k in x:
+            if isinstance(x[k], float) or isinstance(y[k], float):
+                if x[k] is None or y[k] is None or not math.isclose(x[k], y[k], rel_tol=1e-9, abs_tol=1e-9):
+                    if x[k] != y[k]:
+                        return False
+            elif x[k] != y[k]:
+                return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sellers", type=int, default=300)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=100)
+    parser.add_argument("--database-url", default="sqlite:////tmp/vendas_analytics.db")
+    args = parser.parse_args(argv)
+
+    app = make_app(args.database_url)
+    ok = True
+    with app.app_context():
+        rows = seed(args.sellers, args.years)
+        padrao = analytics.engine()
+        print(f"{db_name(app)}: {rows['daily_sales']} registros diários, {args.sellers} vendedores; padrão: {padrao}")
+        try:
+            analytics._numpy()
+            motores = analytics.ENGINES
+        except analytics.AnalyticsError:
+            motores = ("sql",)
+            print("numpy não instalado: só o motor sql")
+
+        hoje = date.today()
+        for nome, consulta in consultas(hoje):
+            resultados = {m: consulta(m) for m in motores}
+            if not all(iguais(resultados["sql"], r) for r in resultados.values()):
+                ok = False
+                print(f"DIVERGÊNCIA: {nome} difere entre {', '.join(motores)}")
+            for motor in motores:
+                mediana = statistics.median(timeit(lambda: consulta(motor), args.repeat)) * 1000
+                print(f"  {nome:28} {motor:6} itens={len(resultados[motor]):6d}  mediana={mediana:8.2f} ms")
+                if motor == padrao and mediana > args.budget_ms:
+                    ok = False
+                    print(f"  ACIMA DO ORÇAMENTO ({args.budget_ms:.0f} ms)")
+    return 0 if ok else 1
+
+
+def db_name(app):
+    from models.user import db
+
+    return db.engine.dialect.name
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Benchmark das rotas quentes sobre uma massa de dados sintética grande.
+
+Popula o banco com benchmarks.seed (vendedores x anos de daily_sales,
+resumos semanais e a planilha da semana) e dispara cada cenário N vezes:
+GET/POST/PATCH /api/data, /tv, /resumo e os históricos do /archive.
+Para cada cenário reporta latência (p50/p90/p95/p99/máx), vazão e
+consultas SQL por requisição, e grava tudo em JSON (com o commit do git)
+para comparar execuções entre commits.
+
+Dois modos:
+- padrão: Flask test client no próprio processo; as consultas são
+  contadas no engine (inclusive as feitas durante respostas em streaming)
+- --base-url http://127.0.0.1:8000: servidor já rodando (ex.: gunicorn);
+  as consultas vêm do cabeçalho Server-Timing. O seed usa --database-url,
+  que deve ser o mesmo banco do servidor (--no-seed para pular).
+
+Uso:
+    python -m benchmarks.bench_endpoints --sellers 50 --years 3 --requests 100
+    python -m benchmarks.bench_endpoints --database-url postgresql+psycopg2://... --output pg.json
+    python -m benchmarks.bench_endpoints --compare benchmarks/results/anterior.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.cookiejar import CookieJar
+
+from benchmarks._support import count_queries, make_app
+from benchmarks.seed import seed
+from grid_cache import grid_cache
+from models.user import db
+from roster import roster
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+ADMIN = {"username": "admin", "password": "admin123"}
+
+
+# ---------------------------
+# Clientes
+# ---------------------------
+class TestClientDriver:
+    """Flask test client; conta as consultas no engine, lendo o corpo inteiro."""
+
+    name = "test_client"
+    supports_cache_control = True
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        with count_queries() as counter:
+            response = self.client.open(path, method=method, json=body, headers=headers or {})
+            data = response.get_data()
+        return response.status_code, response.headers, data, counter.count
+
+
+class HttpDriver:
+    """Servidor externo via HTTP; consultas lidas do Server-Timing (db;desc="N queries")."""
+
+    name = "http"
+    supports_cache_control = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with self.opener.open(req) as response:
+                status, response_headers, content = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:  # inclui 304
+            status, response_headers, content = e.code, e.headers, e.read()
+        match = re.search(r'(\d+) queries', response_headers.get("Server-Timing", ""))
+        return status, response_headers, content, int(match.group(1)) if match else None
+
+
+# ---------------------------
+# Cenários
+# ---------------------------
+def build_scenarios(driver, sellers):
+    status, headers, body, _ = driver.request("GET", "/api/data")
+    grid = json.loads(body)
+    etag = headers.get("ETag")
+    vendedor = sellers[0]
+    contador = {"n": 0}
+
+    def novo_payload():
+        contador["n"] += 1
+        payload = {"employees": grid["employees"], "spreadsheetData": json.loads(json.dumps(grid["spreadsheetData"]))}
+        payload["spreadsheetData"][vendedor]["monday"] = float(contador["n"])
+        return payload
+
+    def nova_celula():
+        contador["n"] += 1
+        return {"cells": [{"seller": vendedor, "day": "tuesday", "value": float(contador["n"])}]}
+
+    scenarios = [
+        {"name": "GET /api/data", "path": "/api/data"},
+        {"name": "GET /api/data (sem cache)", "path": "/api/data", "before": grid_cache.invalidate, "cache_control": True},
+        {"name": "GET /api/data (304)", "path": "/api/data", "headers": {"If-None-Match": etag}},
+        {"name": "POST /api/data", "method": "POST", "path": "/api/data", "body": novo_payload},
+        {"name": "PATCH /api/data (1 célula)", "method": "PATCH", "path": "/api/data", "body": nova_celula},
+        {"name": "GET /tv", "path": "/tv"},
+        {"name": "GET /resumo", "path": "/resumo"},
+        {"name": "GET daily-history", "path": "/archive/api/daily-history?limit=100"},
+        {"name": "GET daily-history (vendedor)", "path": f"/archive/api/daily-history?limit=100&vendedor={urllib.request.quote(vendedor)}"},
+        {"name": "GET resumo-history", "path": "/archive/api/resumo-history?limit=100"},
+    ]
+    return [s for s in scenarios if driver.supports_cache_control or not s.get("cache_control")]
+
+
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(driver, scenario, requests, warmup, concurrency):
+    def one():
+        if scenario.get("before"):
+            scenario["before"]()
+        body = scenario["body"]() if scenario.get("body") else None
+        start = time.perf_counter()
+        status, _, _, queries = driver.request(scenario.get("method", "GET"), scenario["path"], body, scenario.get("headers"))
+        return time.perf_counter() - start, status, queries
+
+    for _ in range(warmup):
+        one()
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(lambda _: one(), range(requests)))
+    else:
+        samples = [one() for _ in range(requests)]
+    elapsed = time.perf_counter() - started
+
+    durations = sorted(d * 1000 for d, _, _ in samples)
+    queries = [q for _, _, q in samples if q is not None]
+    statuses = sorted({s for _, s, _ in samples})
+    return {
+        "name": scenario["name"],
+        "requests": requests,
+        "status": statuses,
+        "errors": sum(1 for _, s, _ in samples if s >= 400),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "p50_ms": round(_percentile(durations, 50), 3),
+        "p90_ms": round(_percentile(durations, 90), 3),
+        "p95_ms": round(_percentile(durations, 95), 3),
+        "p99_ms": round(_percentile(durations, 99), 3),
+        "max_ms": round(durations[-1], 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "queries_mean": round(statistics.fmean(queries), 2) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+
+# ---------------------------
+# Relatório
+# ---------------------------
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, previous=None):
+    anteriores = {r["name"]: r for r in (previous or {}).get("results", [])}
+    print(f"{'cenário':34} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'queries':>8}")
+    for r in results:
+        linha = (f"{r['name']:34} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} "
+                 f"{r['throughput_rps']:9.1f} {r['queries_mean'] if r['queries_mean'] is not None else '-':>8}")
+        antes = anteriores.get(r["name"])
+        if antes and antes["p50_ms"]:
+            linha += f"   p50 {(r['p50_ms'] / antes['p50_ms'] - 1) * 100:+.0f}% vs {previous['meta'].get('git_commit')}"
+        if r["errors"]:
+            linha += f"   ({r['errors']} erros: {r['status']})"
+        print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sellers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=50, help="requisições medidas por cenário")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=1, help="threads simultâneas (só com --base-url)")
+    parser.add_argument("--database-url", default="sqlite:////tmp/vendas_bench.db")
+    parser.add_argument("--base-url", help="servidor já rodando (ex.: http://127.0.0.1:8000)")
+    parser.add_argument("--no-seed", action="store_true", help="usa os dados já existentes no banco")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: benchmarks/results/<commit>_<banco>.json)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+    if args.concurrency > 1 and not args.base_url:
+        parser.error("--concurrency exige --base-url (o test client roda em uma thread)")
+
+    app = make_app(args.database_url)
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        rows = None
+        if not args.no_seed:
+            start = time.perf_counter()
+            rows = seed(args.sellers, args.years, random_seed=args.seed)
+            print(f"Massa gerada em {time.perf_counter() - start:.1f}s: {rows}")
+        sellers = roster.names()
+        if not sellers:
+            sys.exit("Banco sem vendedores: rode sem --no-seed")
+
+        driver = HttpDriver(args.base_url) if args.base_url else TestClientDriver(app)
+        driver.request("POST", "/api/login", ADMIN)
+        results = [
+            run_scenario(driver, scenario, args.requests, args.warmup, args.concurrency)
+            for scenario in build_scenarios(driver, sellers)
+        ]
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": commit,
+            "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": dialect,
+            "driver": driver.name,
+            "base_url": args.base_url,
+            "sellers": args.sellers,
+            "years": args.years,
+            "seed": args.seed,
+            "rows": rows,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_table(results, previous)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'local'}_{dialect}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {output}")
+
+
+if __name__ == "__main__":
+    main()
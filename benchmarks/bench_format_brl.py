@@ -0,0 +1,81 @@
+"""
+Micro-benchmark do format_brl.
+
+Compara a implementação antiga (três .replace encadeados por valor, como
+nas cópias que existiam em app.py/scheduler.py/routes/archive.py) com as
+variantes de formatting: um translate sem marcador, lote
+(format_brl_many) e memoizada (format_brl_cached). Antes de medir, confere
+que todas produzem exatamente o mesmo texto; se não, sai com código 1.
+
+Uso:
+    python -m benchmarks.bench_format_brl --values 10000 --repeat 20
+"""
+import argparse
+import random
+import statistics
+import sys
+
+from benchmarks._support import timeit
+from formatting import _format_brl_memo, format_brl, format_brl_cached, format_brl_many
+
+
+def format_brl_antigo(value):
+    try:
+        return f"{float(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    except (ValueError, TypeError):
+        return "0,00"
+
+
+def amostra(n, seed=3):
+    """Valores no formato da planilha: muitos zeros e valores repetidos, alguns inválidos."""
+    rng = random.Random(seed)
+    valores = []
+    for _ in range(n):
+        sorteio = rng.random()
+        if sorteio < 0.4:
+            valores.append(0)
+        elif sorteio < 0.7:
+            valores.append(float(rng.choice([50, 100, 150, 200, 250, 500, 1000])))
+        elif sorteio < 0.99:
+            valores.append(round(rng.uniform(0, 1_000_000), 2))
+        else:
+            valores.append(rng.choice([None, "", "abc", "1234.5", -87.125]))
+    return valores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--values", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    def variantes(valores):
+        return {
+            "antigo (3x replace)": lambda: [format_brl_antigo(v) for v in valores],
+            "format_brl (translate)": lambda: [format_brl(v) for v in valores],
+            "format_brl_many (lote)": lambda: format_brl_many(valores),
+            "format_brl_cached (LRU)": lambda: [format_brl_cached(v) for v in valores],
+        }
+
+    # Conferência com valores inválidos misturados; a medição usa só números,
+    # que é o que vem do banco (a planilha nunca tem texto nas células)
+    mistos = amostra(args.values)
+    esperado = [format_brl_antigo(v) for v in mistos]
+    falhas = [nome for nome, fn in variantes(mistos).items() if fn() != esperado]
+    if falhas:
+        print(f"Saída diferente da implementação antiga: {', '.join(falhas)}")
+        sys.exit(1)
+    valores = [float(v) for v in mistos if isinstance(v, (int, float))]
+
+    base = None
+    print(f"{len(valores)} valores, mediana de {args.repeat} execuções")
+    for nome, fn in variantes(valores).items():
+        _format_brl_memo.cache_clear()
+        fn()  # aquece (e, no LRU, preenche o cache como num telão já aberto)
+        mediana = statistics.median(timeit(fn, args.repeat))
+        base = base or mediana
+        print(f"  {nome:26} {mediana * 1000:8.2f} ms  {args.values / mediana / 1e6:6.2f} M valores/s  {base / mediana:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark do carregamento da planilha (routes.data.load_data_from_db).
+
+Mede o tempo por chamada e, principalmente, quantos comandos SQL cada
+chamada emite. O carregamento deve custar uma única consulta,
+independente do número de vendedores; se isso mudar, o script sai com
+código 1.
+
+Uso:
+    python -m benchmarks.bench_load_data --sellers 7 50 500
+"""
+import argparse
+import statistics
+import sys
+
+from benchmarks._support import count_queries, fake_roster, make_app, seed_sellers, timeit
+from models.sales import SaleFact
+from models.user import db
+from routes import data as data_module
+from sales_facts import day_date, week_start
+
+MAX_QUERIES = 1
+
+
+def seed(sellers):
+    ids = seed_sellers([emp["name"] for emp in sellers])
+    segunda = week_start()
+    db.session.add_all(
+        SaleFact(seller_id=ids[emp["name"]], sale_date=day_date(day, segunda), value=float(i + j))
+        for i, emp in enumerate(sellers)
+        for j, day in enumerate(data_module.WEEKDAYS)
+    )
+    db.session.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sellers", type=int, nargs="+", default=[7, 50, 500])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    app = make_app()
+    ok = True
+    with app.app_context():
+        for size in args.sellers:
+            roster = fake_roster(size)
+            seed(roster)
+            data_module.load_data_from_db()  # monta o índice de vendedores (roster)
+            with count_queries() as counter:
+                result = data_module.load_data_from_db()
+            assert len(result["spreadsheetData"]) == size
+            durations = timeit(data_module.load_data_from_db, args.repeat)
+
+            mediana = statistics.median(durations) * 1000
+            print(f"sellers={size:5d}  queries/call={counter.count}  median={mediana:8.3f} ms")
+            if counter.count > MAX_QUERIES:
+                ok = False
+                print(f"  REGRESSÃO: esperado no máximo {MAX_QUERIES} consulta(s) por chamada")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
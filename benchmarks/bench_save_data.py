@@ -0,0 +1,74 @@
+"""
+Benchmark do salvamento da planilha (routes.data.save_data_to_db).
+
+Compara o upsert em lote (INSERT ... ON CONFLICT DO UPDATE) com o caminho
+antigo linha a linha, para algumas centenas de vendedores, reportando
+células/segundo e comandos SQL por salvamento.
+
+Uso:
+    python -m benchmarks.bench_save_data --sellers 7 300 --repeat 20
+"""
+import argparse
+import statistics
+import sys
+from unittest import mock
+
+from benchmarks._support import count_queries, fake_roster, make_app, seed_sellers, timeit
+import sales_facts
+from routes import data as data_module
+
+
+def build_payload(roster, seed):
+    return {
+        "employees": roster,
+        "spreadsheetData": {
+            emp["name"]: {day: float(seed + i + j) for j, day in enumerate(data_module.WEEKDAYS)}
+            for i, emp in enumerate(roster)
+        },
+    }
+
+
+def run(roster, repeat, bulk):
+    seed_sellers([emp["name"] for emp in roster])
+    data_module.roster.records()  # monta o índice de vendedores fora da medição
+    payloads = [build_payload(roster, n) for n in range(repeat + 1)]
+
+    with mock.patch.object(sales_facts, "supports_upsert", lambda: bulk):
+        # primeira chamada insere; as demais atualizam todas as células
+        with count_queries() as insert_counter:
+            assert data_module.save_data_to_db(payloads[0])
+        with count_queries() as update_counter:
+            durations = timeit(lambda: data_module.save_data_to_db(payloads.pop()), repeat)
+
+    cells = len(roster) * len(data_module.WEEKDAYS)
+    return {
+        "cells": cells,
+        "insert_queries": insert_counter.count,
+        "update_queries": update_counter.count // repeat,
+        "median_ms": statistics.median(durations) * 1000,
+        "cells_per_s": cells / statistics.median(durations),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sellers", type=int, nargs="+", default=[7, 300])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    app = make_app()
+    with app.app_context():
+        for size in args.sellers:
+            roster = fake_roster(size)
+            for label, bulk in (("upsert", True), ("linha-a-linha", False)):
+                r = run(roster, args.repeat, bulk)
+                print(
+                    f"sellers={size:4d} {label:14s} cells={r['cells']:5d} "
+                    f"sql/insert={r['insert_queries']:5d} sql/update={r['update_queries']:5d} "
+                    f"median={r['median_ms']:9.3f} ms  {r['cells_per_s']:10.0f} cells/s"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
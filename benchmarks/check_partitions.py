@@ -0,0 +1,89 @@
+"""
+Verifica se as consultas a sales_facts leem só as partições do período (PostgreSQL).
+
+Gera a massa de benchmarks.seed (ATENÇÃO: apaga as tabelas; use um banco
+descartável), roda EXPLAIN sobre a consulta da grade (view
+current_week_sales, podada na execução pelo now()) e sobre somas por
+período, e compara as partições que aparecem no plano com os meses do
+período. Sai com código 1 se alguma partição a mais (ou a menos) for lida.
+
+Uso:
+    python -m benchmarks.check_partitions --database-url postgresql+psycopg2://...
+"""
+import argparse
+import re
+import sys
+from datetime import timedelta
+
+from benchmarks._support import count_queries, make_app
+from benchmarks.seed import seed
+from models.sales import SaleFact
+from models.user import db
+from routes import data as data_module
+from sales_facts import partition_name, week_start
+
+PARTITION = re.compile(r"\bsales_facts_\d{4}_\d{2}\b")
+
+
+def _months(inicio, fim):
+    meses = set()
+    dia = inicio
+    while dia <= fim:
+        meses.add(partition_name(dia.replace(day=1)))
+        dia += timedelta(days=1)
+    return meses
+
+
+def explain(statement, parameters=None):
+    rows = db.session.connection().exec_driver_sql("EXPLAIN " + statement, parameters or ()).fetchall()
+    return "\n".join(r[0] for r in rows)
+
+
+def _period_sql(inicio, fim):
+    query = db.select(db.func.sum(SaleFact.value)).where(SaleFact.sale_date.between(inicio, fim))
+    return str(query.compile(db.engine, compile_kwargs={"literal_binds": True}))
+
+
+def checks():
+    segunda = week_start()
+    with count_queries() as c:
+        data_module.load_data_from_db()
+    statement = next(s for s in c.statements if "current_week_sales" in s)
+    yield "grade (current_week_sales)", statement, c.parameters[c.statements.index(statement)], \
+        _months(segunda, segunda + timedelta(days=4))
+
+    for nome, inicio, fim in (
+        ("um mês", segunda.replace(day=1) - timedelta(days=60), segunda.replace(day=1) - timedelta(days=35)),
+        ("seis semanas", segunda - timedelta(weeks=10), segunda - timedelta(weeks=4)),
+        ("um ano", segunda - timedelta(days=365), segunda),
+    ):
+        yield f"soma por período ({nome})", _period_sql(inicio, fim), None, _months(inicio, fim)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--years", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    app = make_app(args.database_url)
+    ok = True
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            sys.exit("Particionamento só existe no PostgreSQL")
+        seed(sellers=20, years=args.years)
+        for nome, statement, parameters, esperadas in checks():
+            plano = explain(statement, parameters)
+            db.session.rollback()
+            lidas = set(PARTITION.findall(plano))
+            certo = lidas == esperadas
+            ok = ok and certo
+            print(f"[{'OK' if certo else 'FALHA'}] {nome}: {len(lidas)} partição(ões) lida(s), esperadas {len(esperadas)}")
+            if not certo:
+                print(f"    a mais: {sorted(lidas - esperadas)}  faltando: {sorted(esperadas - lidas)}")
+                print("    " + plano.replace("\n", "\n    "))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
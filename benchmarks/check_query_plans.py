@@ -0,0 +1,105 @@
+"""
+Verifica se as consultas quentes usam os índices esperados.
+
+Executa as rotas/funções reais, captura o SQL que elas emitem e roda
+EXPLAIN sobre cada comando (EXPLAIN QUERY PLAN no SQLite; EXPLAIN com
+enable_seqscan=off no PostgreSQL, para que tabelas pequenas não escondam
+um índice ausente). Sai com código 1 se algum índice não aparecer no plano.
+
+Uso:
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --database-url postgresql+psycopg2://...
+"""
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+
+from benchmarks._support import count_queries, make_app
+from models.archive import DailySales, ResumoHistory
+from models.user import db
+from routes import resumo
+
+
+def seed(days=120, sellers=20):
+    random.seed(7)
+    inicio = date.today() - timedelta(days=days)
+    db.session.add_all(
+        DailySales(vendedor=f"Vendedor {v:02d}", dia=inicio + timedelta(days=d), total=random.random() * 100)
+        for d in range(days)
+        for v in range(sellers)
+    )
+    db.session.add_all(
+        ResumoHistory(
+            week_label=f"semana {w}",
+            started_at=inicio + timedelta(weeks=w),
+            ended_at=inicio + timedelta(weeks=w, days=4),
+            total=0.0,
+            breakdown=[],
+        )
+        for w in range(days // 7)
+    )
+    db.session.commit()
+
+
+def _query_matching(counter, needle):
+    for statement, parameters in zip(counter.statements, counter.parameters):
+        if needle in statement:
+            return statement, parameters
+    raise AssertionError(f"nenhuma consulta contendo {needle!r} foi executada")
+
+
+def explain(statement, parameters):
+    conn = db.session.connection()
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()
+    else:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    return "\n".join(str(r[-1]) for r in rows)
+
+
+def checks(app):
+    client = app.test_client()
+    hoje = date.today()
+
+    with count_queries() as c:
+        resumo._totais_por_dia(hoje - timedelta(days=30), hoje)
+    yield "resumo: totais por dia", _query_matching(c, "GROUP BY daily_sales.dia"), "ix_daily_sales_dia_vendedor"
+
+    # As rotas de histórico respondem em streaming: o corpo precisa ser lido
+    with count_queries() as c:
+        primeira = client.get("/archive/api/daily-history?limit=50").get_json()
+    yield "histórico diário", _query_matching(c, "FROM daily_sales"), "ix_daily_sales_created_at_id"
+
+    with count_queries() as c:
+        client.get("/archive/api/daily-history", query_string={"limit": 50, "cursor": primeira["next_cursor"]}).get_data()
+    yield "histórico diário (cursor)", _query_matching(c, "FROM daily_sales"), "ix_daily_sales_created_at_id"
+
+    with count_queries() as c:
+        client.get("/archive/api/resumo-history").get_data()
+    yield "histórico de resumos", _query_matching(c, "FROM resumo_history"), "ix_resumo_history_created_at_id"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args(argv)
+
+    app = make_app(args.database_url)
+    ok = True
+    with app.app_context():
+        seed()
+        for nome, (statement, parameters), indice in checks(app):
+            plano = explain(statement, parameters)
+            db.session.rollback()
+            usa = indice in plano
+            ok = ok and usa
+            print(f"[{'OK' if usa else 'FALHA'}] {nome}: espera {indice}")
+            if not usa:
+                print("    " + plano.replace("\n", "\n    "))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
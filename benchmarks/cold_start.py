@@ -0,0 +1,112 @@
+"""
+Tempo de subida a frio de um worker, contra um orçamento.
+
+Cada rodada é um processo Python novo (como um worker do gunicorn) que:
+1. importa main (create_app + blueprints; SCHEDULER_ENABLED=0)
+2. faz a primeira requisição a /healthz, /readyz e /api/data
+Reporta a mediana de cada fase, o tempo total do processo e quantos
+comandos SQL a importação emitiu (deve ser zero). O banco é migrado
+antes das rodadas, como no início de um deploy.
+
+Sai com código 1 se a importação emitir SQL ou se a mediana da importação
+ou da primeira requisição passar do orçamento.
+
+Uso:
+    python -m benchmarks.cold_start --runs 5
+    python -m benchmarks.cold_start --database-url postgresql+psycopg2://... --budget-import-ms 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def probe():
+    """Roda dentro do processo novo; imprime as medições em JSON na última linha."""
+    start = time.perf_counter()
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    queries = []
+    event.listen(Engine, "before_cursor_execute", lambda *args: queries.append(1))
+
+    import main
+
+    result = {"import_ms": (time.perf_counter() - start) * 1000, "import_queries": len(queries)}
+    client = main.app.test_client()
+    for name, path in (("healthz", "/healthz"), ("readyz", "/readyz"), ("api_data", "/api/data")):
+        t = time.perf_counter()
+        status = client.get(path).status_code
+        result[f"first_{name}_ms"] = (time.perf_counter() - t) * 1000
+        if status != 200:
+            result[f"first_{name}_status"] = status
+    print(json.dumps(result))
+
+
+def run_once(env):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.cold_start", "--probe"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    total = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        sys.exit(f"Rodada falhou:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_ms"] = total
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", default="sqlite:////tmp/vendas_cold_start.db")
+    parser.add_argument("--budget-import-ms", type=float, default=1500)
+    parser.add_argument("--budget-first-request-ms", type=float, default=250,
+                        help="primeira requisição com banco (/readyz, /api/data)")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.probe:
+        probe()
+        return 0
+
+    env = dict(os.environ, DATABASE_URL=args.database_url, SCHEDULER_ENABLED="0", LOG_LEVEL="WARNING")
+    subprocess.run([sys.executable, "-m", "flask", "--app", "app", "db", "upgrade"],
+                   cwd=ROOT, env=env, check=True, capture_output=True)
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    ok = True
+    print(f"{args.runs} rodadas, mediana (ms):")
+    for key in ("process_ms", "import_ms", "first_healthz_ms", "first_readyz_ms", "first_api_data_ms"):
+        print(f"  {key:20} {statistics.median(r[key] for r in runs):8.1f}")
+    import_queries = max(r["import_queries"] for r in runs)
+    print(f"  {'import_queries':20} {import_queries:8d}")
+    for r in runs:
+        for key, status in r.items():
+            if key.endswith("_status"):
+                ok = False
+                print(f"ERRO: {key[:-7]} respondeu {status}")
+
+    checks = [
+        ("import_ms", args.budget_import_ms),
+        ("first_readyz_ms", args.budget_first_request_ms),
+        ("first_api_data_ms", args.budget_first_request_ms),
+    ]
+    for key, budget in checks:
+        valor = statistics.median(r[key] for r in runs)
+        if valor > budget:
+            ok = False
+            print(f"ACIMA DO ORÇAMENTO: {key} = {valor:.1f} ms (limite {budget:.0f} ms)")
+    if import_queries:
+        ok = False
+        print("REGRESSÃO: importar main não deve acessar o banco")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
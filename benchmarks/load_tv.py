@@ -0,0 +1,174 @@
+"""
+Teste de carga: quantas telas (/tv/stream) e editores uma instância aguenta.
+
+Contra um servidor já rodando (gunicorn com gunicorn.conf.py), abre
+--screens conexões SSE em /tv/stream e --editors clientes que, em loop,
+salvam uma célula (PATCH /api/data) e releem a grade (GET /api/data).
+Ao fim de --duration segundos reporta:
+- telas: conectadas (200), recusadas (503 = LIVE_MAX_STREAMS ou worker
+  sem streaming), erros, e o atraso entre o PATCH e o delta chegar à tela
+- editores: requisições, erros e latência p50/p95/p99
+
+Cada tela e cada editor é uma thread aqui no cliente; o que se mede é o
+servidor. Exemplo comparando os modos:
+    WORKER_MODE=gthread gunicorn 'app:create_app()' &
+    python -m benchmarks.load_tv --base-url http://127.0.0.1:5000 --screens 50 --editors 10
+    WORKER_MODE=gevent gunicorn 'app:create_app()' &
+    python -m benchmarks.load_tv --base-url http://127.0.0.1:5000 --screens 400 --editors 10
+"""
+import argparse
+import http.client
+import itertools
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+from urllib.parse import urlparse
+
+ADMIN = {"username": "admin", "password": "admin123"}
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return round(sorted_values[index], 2)
+
+
+class Load:
+    def __init__(self, base_url, duration, think):
+        self.base_url = base_url.rstrip("/")
+        self.parsed = urlparse(self.base_url)
+        self.duration = duration
+        self.think = think
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.sent = {}  # valor gravado -> instante do PATCH
+        self.values = itertools.count(1)
+        self.screens = {"connected": 0, "refused": 0, "errors": 0, "deltas": 0, "lag_ms": []}
+        self.editors = {"requests": 0, "errors": 0, "latency_ms": []}
+
+    # ---------------------------
+    # Telas
+    # ---------------------------
+    def screen(self):
+        conn = http.client.HTTPConnection(self.parsed.hostname, self.parsed.port or 80, timeout=self.duration + 30)
+        try:
+            conn.request("GET", "/tv/stream", headers={"Accept": "text/event-stream"})
+            response = conn.getresponse()
+            if response.status != 200:
+                with self.lock:
+                    self.screens["refused" if response.status == 503 else "errors"] += 1
+                return
+            with self.lock:
+                self.screens["connected"] += 1
+            event = None
+            while not self.stop.is_set():
+                line = response.fp.readline()
+                if not line:
+                    break
+                line = line.decode().rstrip("\n")
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: ") and event == "delta":
+                    agora = time.perf_counter()
+                    for cell in json.loads(line[6:])["cells"]:
+                        enviado = self.sent.get(cell["value"])
+                        if enviado is not None:
+                            with self.lock:
+                                self.screens["deltas"] += 1
+                                self.screens["lag_ms"].append((agora - enviado) * 1000)
+        except (OSError, http.client.HTTPException):
+            if not self.stop.is_set():
+                with self.lock:
+                    self.screens["errors"] += 1
+        finally:
+            conn.close()
+
+    # ---------------------------
+    # Editores
+    # ---------------------------
+    def editor(self, sellers):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+        def call(method, path, body=None):
+            data = json.dumps(body).encode() if body is not None else None
+            req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"} if data else {})
+            start = time.perf_counter()
+            try:
+                with opener.open(req, timeout=30) as response:
+                    response.read()
+                ok = True
+            except (urllib.error.URLError, OSError):
+                ok = False
+            with self.lock:
+                self.editors["requests"] += 1
+                self.editors["errors"] += 0 if ok else 1
+                self.editors["latency_ms"].append((time.perf_counter() - start) * 1000)
+            return start
+
+        call("POST", "/api/login", ADMIN)
+        while not self.stop.is_set():
+            valor = float(next(self.values))
+            self.sent[valor] = time.perf_counter()
+            call("PATCH", "/api/data", {"cells": [{
+                "seller": random.choice(sellers),
+                "day": random.choice(["monday", "tuesday", "wednesday", "thursday", "friday"]),
+                "value": valor,
+            }]})
+            call("GET", "/api/data")
+            self.stop.wait(self.think)
+
+    def run(self, screens, editors):
+        with urllib.request.urlopen(self.base_url + "/api/data", timeout=30) as response:
+            sellers = list(json.load(response)["spreadsheetData"])
+
+        threads = [threading.Thread(target=self.screen, daemon=True) for _ in range(screens)]
+        for t in threads:
+            t.start()
+        time.sleep(min(5, self.duration / 4))  # telas conectam antes das edições
+        threads += [threading.Thread(target=self.editor, args=(sellers,), daemon=True) for _ in range(editors)]
+        for t in threads[screens:]:
+            t.start()
+        time.sleep(self.duration)
+        self.stop.set()
+        for t in threads[screens:]:
+            t.join(timeout=30)
+
+        lag = sorted(self.screens.pop("lag_ms"))
+        latency = sorted(self.editors.pop("latency_ms"))
+        return {
+            "screens": dict(self.screens, requested=screens,
+                            lag_p50_ms=_percentile(lag, 50), lag_p95_ms=_percentile(lag, 95)),
+            "editors": dict(self.editors, clients=editors,
+                            throughput_rps=round(self.editors["requests"] / self.duration, 1),
+                            p50_ms=_percentile(latency, 50), p95_ms=_percentile(latency, 95),
+                            p99_ms=_percentile(latency, 99),
+                            mean_ms=round(statistics.fmean(latency), 2) if latency else None),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--screens", type=int, default=50)
+    parser.add_argument("--editors", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--think", type=float, default=0.2, help="pausa de cada editor entre salvamentos (s)")
+    parser.add_argument("--output", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    result = Load(args.base_url, args.duration, args.think).run(args.screens, args.editors)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
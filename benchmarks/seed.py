@@ -0,0 +1,119 @@
+"""
+Massa de dados sintética para os benchmarks.
+
+Gera, de forma reprodutível (mesma semente, mesmos dados):
+- sellers: o cadastro (senha 123), que define as linhas da grade
+- sales_facts: uma venda por vendedor e dia útil dos últimos `years` anos,
+  incluindo a semana corrente (a grade)
+- daily_sales: um registro por vendedor e dia útil dos últimos `years` anos
+- resumo_history: um resumo por semana, com o breakdown por vendedor
+- rollups mensais/semanais recalculados a partir de daily_sales
+
+ATENÇÃO: apaga essas tabelas antes de gravar; use só com bancos descartáveis.
+
+Uso:
+    python -m benchmarks.seed --sellers 50 --years 3 --database-url sqlite:////tmp/bench.db
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from benchmarks._support import fake_roster, make_app, seed_sellers
+from grid_cache import grid_cache
+from models.archive import DailySales, ResumoHistory
+from models.sales import SaleFact
+from models.user import db
+from rollups import rebuild_rollups
+from sales_facts import ensure_partitions, week_start
+
+NOMES_DIAS = ["segunda", "terca", "quarta", "quinta", "sexta"]
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+CHUNK = 5000
+
+
+def _insert(model, rows):
+    for i in range(0, len(rows), CHUNK):
+        db.session.execute(model.__table__.insert(), rows[i:i + CHUNK])
+
+
+def seed(sellers=50, years=3, end=None, random_seed=42):
+    """Recria a massa de dados; retorna quantas linhas foram gravadas por tabela."""
+    rng = random.Random(random_seed)
+    end = end or date.today()
+    start = end - timedelta(days=365 * years)
+    roster = [emp["name"] for emp in fake_roster(sellers)]
+
+    for model in (DailySales, ResumoHistory):
+        db.session.query(model).delete()
+
+    ids = seed_sellers(roster)
+    segunda = week_start()
+    ensure_partitions(start, max(end, segunda + timedelta(days=4)))
+    _insert(SaleFact, [
+        {"seller_id": ids[nome], "sale_date": segunda + timedelta(days=i), "value": float(rng.randint(0, 5000)), "version": 1}
+        for nome in roster
+        for i in range(len(WEEKDAYS))
+    ])
+
+    facts = []
+    daily = []
+    semanas = defaultdict(lambda: defaultdict(float))  # segunda-feira -> vendedor -> total
+    dia = start
+    while dia <= end:
+        if dia.weekday() < 5:
+            for nome in roster:
+                valor = float(rng.randint(0, 2000))
+                row = {"vendedor": nome, "dia": dia, "total": valor, "created_at": datetime.combine(dia, datetime.min.time())}
+                row.update({campo: (valor if i == dia.weekday() else 0.0) for i, campo in enumerate(NOMES_DIAS)})
+                daily.append(row)
+                if dia < segunda:
+                    facts.append({"seller_id": ids[nome], "sale_date": dia, "value": valor, "version": 1})
+                semanas[dia - timedelta(days=dia.weekday())][nome] += valor
+        dia += timedelta(days=1)
+    _insert(DailySales, daily)
+    _insert(SaleFact, facts)
+
+    resumos = []
+    for segunda, por_vendedor in sorted(semanas.items()):
+        sexta = segunda + timedelta(days=4)
+        resumos.append({
+            "week_label": f"{segunda} a {sexta}",
+            "started_at": segunda,
+            "ended_at": sexta,
+            "total": sum(por_vendedor.values()),
+            "breakdown": [{"seller": nome, "total": total} for nome, total in por_vendedor.items()],
+            "created_at": datetime.combine(sexta, datetime.min.time()),
+        })
+    _insert(ResumoHistory, resumos)
+    db.session.commit()
+
+    mensais, semanais = rebuild_rollups()
+    grid_cache.invalidate()
+    return {
+        "sales_facts": sellers * len(WEEKDAYS) + len(facts),
+        "daily_sales": len(daily),
+        "resumo_history": len(resumos),
+        "monthly_rollup": mensais,
+        "weekly_rollup": semanais,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sellers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default="sqlite:////tmp/vendas_bench.db")
+    args = parser.parse_args()
+
+    app = make_app(args.database_url)
+    with app.app_context():
+        start = time.perf_counter()
+        rows = seed(args.sellers, args.years, random_seed=args.seed)
+        print(f"Massa gerada em {time.perf_counter() - start:.1f}s: {rows}")
+
+
+if __name__ == "__main__":
+    main()
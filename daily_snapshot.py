@@ -0,0 +1,84 @@
+"""
+Snapshot diário da planilha em daily_sales.
+
+Usado pelo job das 18:20 (scheduler.salvar_resumo_diario) e por
+POST /archive/api/daily-save. Grava um registro por vendedor para o dia
+com um único upsert em (vendedor, dia): rodar de novo no mesmo dia
+(os dois disparando, worker reiniciado) sobrescreve em vez de duplicar.
+Os rollups recebem só a diferença em relação ao que já estava gravado,
+lido com o dia travado (rollups.lock_days) até o commit.
+Os valores vêm da grade, que já é sales_facts: aqui só daily_sales e os
+rollups são gravados.
+"""
+from models.archive import DailySales
+from models.upsert import supports_upsert, upsert_rows
+from models.user import db
+from render_cache import render_cache
+from rollups import apply_daily_sales, lock_days
+
+DIAS_SEMANA = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+NOMES_DIAS = ["segunda", "terca", "quarta", "quinta", "sexta"]
+VALORES = NOMES_DIAS + ["total"]
+
+
+def _rows(spreadsheet, today):
+    campo_dia = DIAS_SEMANA[today.weekday()]
+    nome_dia = NOMES_DIAS[today.weekday()]
+    rows = []
+    for nome, valores in spreadsheet.items():
+        valor_dia = float(valores.get(campo_dia, 0) or 0)
+        row = {"vendedor": nome, "dia": today, "total": valor_dia}
+        row.update({campo: (valor_dia if campo == nome_dia else 0) for campo in NOMES_DIAS})
+        rows.append(row)
+    return rows
+
+
+def _save_row_by_row(rows, existentes):
+    for row in rows:
+        record = existentes.get(row["vendedor"])
+        if record:
+            for campo in VALORES:
+                setattr(record, campo, row[campo])
+        else:
+            db.session.add(DailySales(**row))
+
+
+def save_daily_snapshot(spreadsheet, today):
+    """
+    Grava (ou regrava) o valor do dia `today` de cada vendedor.
+    Retorna (nome_dia, total_dia), ou None em fim de semana. Faz commit.
+    """
+    if today.weekday() >= 5:
+        return None
+
+    rows = _rows(spreadsheet, today)
+    if not rows:
+        return NOMES_DIAS[today.weekday()], 0.0
+
+    try:
+        lock_days([today])
+        # Registros que serão sobrescritos: saem dos rollups
+        existentes = {
+            r.vendedor: r
+            for r in DailySales.query.filter(
+                DailySales.dia == today,
+                DailySales.vendedor.in_([row["vendedor"] for row in rows]),
+            )
+        }
+        substituidos = [
+            {"vendedor": r.vendedor, "dia": r.dia, "total": r.total}
+            for r in existentes.values()
+        ]
+
+        if supports_upsert():
+            upsert_rows(DailySales, rows, index_elements=["vendedor", "dia"], update_columns=VALORES)
+        else:
+            _save_row_by_row(rows, existentes)
+        apply_daily_sales(rows, substituidos=substituidos)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    render_cache.invalidate("history")
+
+    return NOMES_DIAS[today.weekday()], sum(row["total"] for row in rows)
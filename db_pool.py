@@ -0,0 +1,100 @@
+"""
+Pool de conexões do PostgreSQL.
+
+Sem configuração o SQLAlchemy usa um QueuePool sem pre-ping: no plano free
+do Render o banco derruba conexões ociosas e a primeira requisição depois
+de uma pausa falha ou espera a reconexão. engine_options() monta
+SQLALCHEMY_ENGINE_OPTIONS a partir do ambiente:
+
+- DB_POOL_SIZE (5), DB_MAX_OVERFLOW (10), DB_POOL_TIMEOUT (30 s)
+- DB_POOL_RECYCLE (280 s): conexões mais velhas são trocadas antes de
+  chegarem ao tempo limite de ociosidade do servidor
+- DB_POOL_PRE_PING (1): testa a conexão ao tirá-la do pool
+- DB_PGBOUNCER (0): modo compatível com PgBouncer em transaction pooling
+  (o scheduler também troca o advisory lock pela linha de lease, ver leader.py)
+
+O pool registrado (InstrumentedQueuePool) mede quanto cada checkout espera
+por uma conexão livre; GET /metrics expõe essa espera e o uso do pool.
+"""
+import os
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+import metrics
+from models.user import db
+
+checkout_wait = metrics.Histogram((0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30))
+checkout_timeouts = metrics.Counter()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede o tempo de espera por uma conexão livre."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            checkout_timeouts.inc()
+            checkout_wait.observe(time.perf_counter() - start)
+            raise
+        checkout_wait.observe(time.perf_counter() - start)
+        return conn
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def _env_bool(name, default):
+    return os.getenv(name, "1" if default else "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def pgbouncer_mode():
+    return _env_bool("DB_PGBOUNCER", False)
+
+
+def engine_options(database_uri):
+    """SQLALCHEMY_ENGINE_OPTIONS para a URI; vazio fora do PostgreSQL."""
+    if not database_uri.startswith("postgresql"):
+        return {}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": _env_int("DB_POOL_SIZE", 5),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 280),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+    }
+
+    if pgbouncer_mode():
+        # Em transaction pooling cada transação pode cair em outra conexão do
+        # servidor, então nada preparado numa sessão pode ser reaproveitado.
+        # O psycopg2 não usa prepared statements do lado do servidor (nada a
+        # desligar); o psycopg 3 prepara após 5 execuções e precisa de
+        # prepare_threshold=None.
+        if database_uri.startswith("postgresql+psycopg:"):
+            options["connect_args"] = {"prepare_threshold": None}
+        # O PgBouncer já mantém as conexões com o servidor: conexões de
+        # overflow aqui só disputariam as mesmas vagas.
+        options["max_overflow"] = _env_int("DB_MAX_OVERFLOW", 0)
+
+    return options
+
+
+@metrics.register_collector
+def pool_metrics():
+    pool = db.engine.pool
+    lines = []
+    if isinstance(pool, QueuePool):
+        lines += metrics.gauge("db_pool_size", "Conexões permanentes do pool", pool.size())
+        lines += metrics.gauge("db_pool_checked_out", "Conexões em uso", pool.checkedout())
+        lines += metrics.gauge("db_pool_checked_in", "Conexões livres no pool", pool.checkedin())
+        lines += metrics.gauge("db_pool_overflow", "Conexões além de pool_size (negativo: vagas ainda não abertas)", pool.overflow())
+    if isinstance(pool, InstrumentedQueuePool):
+        lines += checkout_wait.render("db_pool_checkout_wait_seconds", "Espera por uma conexão livre")
+        lines += metrics.counter("db_pool_checkout_timeouts_total", "Checkouts que estouraram DB_POOL_TIMEOUT", checkout_timeouts.value)
+    return lines
@@ -0,0 +1,56 @@
+"""
+Formatação de valores em reais (1234.5 -> "1.234,50").
+
+Antes havia uma cópia de format_brl em app.py, scheduler.py e
+routes/archive.py, cada uma com um marcador temporário e três .replace
+por valor. Aqui a troca de "," por "." e vice-versa é um único
+str.translate sobre a saída de :,.2f. Variantes:
+
+- format_brl_many(valores): uma linha/coluna inteira (a grade do /tv, as
+  semanas do /resumo); o translate roda uma vez sobre o texto já juntado
+- format_brl_cached(valor): memoizado (LRU); usado pelo filtro do Jinja,
+  onde os mesmos valores (zeros, totais) se repetem em várias células
+
+Valor inválido (None, texto não numérico) vira "0,00", como antes.
+Números: python -m benchmarks.bench_format_brl
+"""
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+# 1,234.50 -> 1.234,50 numa passada
+BRL = str.maketrans(",.", ".,")
+
+
+def format_brl(value):
+    try:
+        return f"{float(value):,.2f}".translate(BRL)
+    except (ValueError, TypeError):
+        return "0,00"
+
+
+def _en(value):
+    try:
+        return f"{float(value):,.2f}"
+    except (ValueError, TypeError):
+        return "0.00"
+
+
+def format_brl_many(values):
+    """Lista com cada valor formatado; uma linha da planilha ou uma coluna de totais."""
+    return "\n".join(_en(v) for v in values).translate(BRL).split("\n") if values else []
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _format_brl_memo(value):
+    return format_brl(value)
+
+
+def format_brl_cached(value):
+    try:
+        return _format_brl_memo(value)
+    except TypeError:  # valor não hasheável
+        return format_brl(value)
+
+
+def init_app(app):
+    app.add_template_filter(format_brl_cached, "format_brl")
@@ -0,0 +1,149 @@
+"""
+Cache do snapshot da planilha semanal (vendedor x dia).
+
+GET /api/data, /tv e os jobs do scheduler leem a mesma grade; ela fica
+guardada já serializada em JSON e só é recarregada do banco quando não
+está no cache. Toda escrita em sales_facts invalida o snapshot.
+
+Backends:
+- memória do processo (padrão): cada worker do gunicorn tem sua cópia;
+  GRID_CACHE_TTL limita por quanto tempo um worker pode servir dados
+  gravados por outro worker.
+- Redis (opcional, GRID_CACHE_URL=redis://...): todos os workers
+  compartilham o snapshot e a invalidação.
+
+Cada snapshot carrega um ETag forte. Quem carrega passa uma versão barata
+dos dados (em routes/data.py: uma consulta escalar), então um GET
+condicional (If-None-Match) responde 304 sem montar nem serializar a grade;
+com o snapshot em cache, nem consulta o banco.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import Response, current_app, request
+
+CACHE_KEY = "vendas:grid"
+
+# etag: versão dos dados lida antes de carregar a grade (ou digest do corpo)
+Snapshot = namedtuple("Snapshot", ["etag", "body"])
+
+
+class LocalBackend:
+    def __init__(self, max_items=None):
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._max_items = max_items  # None = sem limite; senão descarta o menos usado
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            if self._max_items is not None:
+                while len(self._items) > self._max_items:
+                    self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class RedisBackend:
+    def __init__(self, url):
+        import redis  # dependência opcional
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self._client.get(key)
+        if value is None:
+            return None
+        etag, _, body = value.decode("utf-8").partition("\n")
+        return Snapshot(etag, body)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, f"{value.etag}\n{value.body}", ex=ttl or None)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+
+def make_backend(url, max_items=None):
+    if url and url.startswith(("redis://", "rediss://")):
+        try:
+            return RedisBackend(url)
+        except ImportError:
+            print("⚠️ GRID_CACHE_URL definido, mas o pacote 'redis' não está instalado. Usando cache em memória.")
+    return LocalBackend(max_items)
+
+
+class GridCache:
+    def init_app(self, app):
+        app.config.setdefault("GRID_CACHE_URL", os.getenv("GRID_CACHE_URL"))
+        app.config.setdefault("GRID_CACHE_TTL", int(os.getenv("GRID_CACHE_TTL", "10")))
+        app.extensions["grid_cache"] = make_backend(app.config["GRID_CACHE_URL"])
+
+    @property
+    def _backend(self):
+        return current_app.extensions["grid_cache"]
+
+    def get(self):
+        """Snapshot (etag, corpo JSON) ou None se não estiver em cache."""
+        return self._backend.get(CACHE_KEY)
+
+    def set(self, body, etag=None):
+        snapshot = Snapshot(etag or make_etag(body), body)
+        self._backend.set(CACHE_KEY, snapshot, current_app.config["GRID_CACHE_TTL"])
+        return snapshot
+
+    def get_or_load(self, loader, version=None):
+        """
+        Snapshot do cache ou carregado com loader(). version() dá o ETag e é
+        lido antes da grade: uma escrita no meio deixa o ETag velho (o
+        cliente só baixa de novo), nunca um ETag novo com dados velhos.
+        """
+        snapshot = self.get()
+        if snapshot is None:
+            etag = version() if version else None
+            snapshot = self.set(current_app.json.dumps(loader()), etag)
+        return snapshot
+
+    def invalidate(self):
+        self._backend.delete(CACHE_KEY)
+
+
+grid_cache = GridCache()
+
+
+def make_etag(body):
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()[:20]
+
+
+def conditional_response(etag, build):
+    """
+    Responde 304 se o cliente já tem essa versão (If-None-Match); senão
+    chama build() para montar a resposta. Em ambos os casos envia o ETag e
+    pede revalidação a cada uso (no-cache).
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = build()
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
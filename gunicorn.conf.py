@@ -0,0 +1,76 @@
+"""
+Configuração do gunicorn (lida automaticamente do diretório de trabalho).
+
+Modelo de workers, escolhido por WORKER_MODE:
+
+- gthread (padrão): WEB_CONCURRENCY processos x GUNICORN_THREADS threads.
+  Cada requisição ocupa uma thread enquanto espera o banco, e cada tela
+  conectada em /tv/stream prende uma thread pelo tempo da conexão (até
+  LIVE_STREAM_MAX_SECONDS). Capacidade por processo ~ GUNICORN_THREADS,
+  dos quais LIVE_MAX_STREAMS podem ser telas.
+
+- gevent: WEB_CONCURRENCY processos, cada um com até
+  GEVENT_WORKER_CONNECTIONS greenlets. O gunicorn aplica o monkey patch do
+  gevent e aqui o psycopg2 recebe o wait callback do psycogreen, então
+  uma ida ao PostgreSQL lenta só suspende o greenlet da requisição, não
+  o processo. Telas em /tv/stream ficam quase de graça (um greenlet
+  parado na Condition), por isso LIVE_MAX_STREAMS sobe para 500.
+  O limite passa a ser o pool do banco (DB_POOL_SIZE + DB_MAX_OVERFLOW,
+  ver db_pool): requisições além disso esperam na fila do pool
+  (db_pool_checkout_wait_seconds em /metrics).
+
+Não há modo ASGI: o Flask é WSGI e um adaptador (asgiref/uvicorn) só
+rodaria as views num pool de threads, igual ao gthread.
+
+O scheduler entra em cada processo, mas só o líder eleito roda os jobs
+(ver scheduler.py e leader.py): WEB_CONCURRENCY pode subir sem duplicar
+o resumo diário nem o reset semanal.
+
+Migrações: on_starting roda `flask db upgrade` uma vez, no mestre, antes
+de abrir os workers (DB_MIGRATE_ON_START=0 desliga). Num subprocesso: o
+mestre não importa a aplicação, então os workers gevent continuam sendo
+os primeiros a importar (e aplicar o monkey patch) e não herdam conexões.
+
+Carga: python -m benchmarks.load_tv --base-url http://127.0.0.1:5000
+"""
+import os
+import subprocess
+import sys
+
+WORKER_MODE = os.getenv("WORKER_MODE", "gthread").lower()
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 20
+keepalive = 5
+
+if WORKER_MODE == "gevent":
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("GEVENT_WORKER_CONNECTIONS", "1000"))
+    os.environ.setdefault("LIVE_MAX_STREAMS", "500")
+elif WORKER_MODE == "gthread":
+    worker_class = "gthread"
+    threads = int(os.getenv("GUNICORN_THREADS", "32"))
+else:
+    raise RuntimeError(f"WORKER_MODE inválido: {WORKER_MODE} (use gthread ou gevent)")
+
+
+def on_starting(server):
+    if os.getenv("DB_MIGRATE_ON_START", "1").lower() not in ("1", "true", "yes", "on"):
+        return
+    # --app app (a fábrica), não main: a CLI não deve entrar na eleição do scheduler
+    result = subprocess.run([sys.executable, "-m", "flask", "--app", "app", "db", "upgrade"])
+    if result.returncode != 0:
+        # Sobe assim mesmo: o /readyz mostra as migrações pendentes
+        server.log.error("flask db upgrade falhou (código %s)", result.returncode)
+
+
+def post_fork(server, worker):
+    if WORKER_MODE == "gevent":
+        # Antes de a aplicação ser carregada: toda conexão do psycopg2 já nasce
+        # cooperativa (espera de socket vira troca de greenlet)
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
+        server.log.info("psycopg2 em modo gevent (psycogreen)")
@@ -0,0 +1,103 @@
+"""
+Verificações de saúde e conferência do esquema sem I/O na subida.
+
+create_app não toca no banco: importar main.py (cada worker do gunicorn,
+cada script) só monta a aplicação. O banco é consultado:
+
+- na primeira requisição de cada processo: pending_migrations (uma
+  consulta a schema_version). Com passos pendentes e DB_AUTO_MIGRATE=1
+  (padrão) eles são aplicados ali; com 0, a aplicação segue e o /readyz
+  responde 503 até alguém rodar `flask db upgrade`
+- em /readyz: SELECT 1 + esquema em dia, com o resultado guardado por
+  READYZ_CACHE_SECONDS (5) para o balanceador poder consultar à vontade
+
+/healthz só diz que o processo responde (liveness): nunca consulta o
+banco, então um banco fora do ar não faz a plataforma reiniciar workers.
+"""
+import os
+import threading
+import time
+
+from flask import current_app, jsonify, request
+from sqlalchemy import text
+
+from models.migrations import pending_migrations, run_migrations
+from models.user import db
+
+
+def _state():
+    return current_app.extensions["health"]
+
+
+def check_schema():
+    """Confere (e, se configurado, aplica) as migrações uma vez por processo."""
+    state = _state()
+    if state["schema_ok"]:
+        return True
+    with state["lock"]:
+        if not state["schema_ok"]:
+            pending = pending_migrations()
+            if pending and current_app.config["DB_AUTO_MIGRATE"]:
+                run_migrations()
+                pending = pending_migrations()
+            if pending:
+                current_app.logger.error("Migrações pendentes: %s (rode flask db upgrade)", ", ".join(pending))
+            state["schema_ok"] = not pending
+    return state["schema_ok"]
+
+
+def _before_request():
+    if request.endpoint == "healthz":
+        return
+    try:
+        check_schema()
+    except Exception:
+        # Banco fora do ar: a requisição segue e falha (ou não) por conta própria;
+        # a conferência é refeita na próxima
+        current_app.logger.exception("Não foi possível conferir o esquema do banco")
+
+
+def healthz():
+    return jsonify({"status": "ok"})
+
+
+def readyz():
+    state = _state()
+    cached = state["ready"]
+    if cached is not None and cached[0] > time.monotonic():
+        body, status = cached[1], cached[2]
+    else:
+        body, status = _probe()
+        state["ready"] = (time.monotonic() + current_app.config["READYZ_CACHE_SECONDS"], body, status)
+    response = jsonify(body)
+    response.status_code = status
+    response.cache_control.no_store = True
+    return response
+
+
+def _probe():
+    start = time.perf_counter()
+    try:
+        db.session.execute(text("SELECT 1"))
+        db.session.commit()
+        pending = [] if check_schema() else pending_migrations()
+    except Exception as e:
+        db.session.rollback()
+        return {"status": "unavailable", "database": "error", "error": e.__class__.__name__}, 503
+    body = {
+        "status": "ok" if not pending else "unavailable",
+        "database": "ok",
+        "database_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    if pending:
+        body["pending_migrations"] = pending
+    return body, 200 if not pending else 503
+
+
+def init_app(app):
+    app.config.setdefault("DB_AUTO_MIGRATE", os.getenv("DB_AUTO_MIGRATE", "1").lower() in ("1", "true", "yes", "on"))
+    app.config.setdefault("READYZ_CACHE_SECONDS", float(os.getenv("READYZ_CACHE_SECONDS", "5")))
+    app.extensions["health"] = {"schema_ok": False, "lock": threading.Lock(), "ready": None}
+    app.before_request(_before_request)
+    app.add_url_rule("/healthz", "healthz", healthz)
+    app.add_url_rule("/readyz", "readyz", readyz)
@@ -0,0 +1,126 @@
+"""
+Eleição de líder entre processos (workers do gunicorn e instâncias).
+
+Só o líder roda os jobs do scheduler. Cada processo chama acquire() a cada
+SCHEDULER_HEARTBEAT_SECONDS: o líder renova a posse, os demais tentam
+assumir. Dois mecanismos, escolhidos pelo banco:
+
+- AdvisoryLockLeader (PostgreSQL): pg_try_advisory_lock numa conexão
+  própria, fora do pool da aplicação, mantida aberta enquanto o processo
+  for líder. Se o processo morre a conexão cai e o lock é liberado na hora.
+- LeaseLeader (SQLite, ou PostgreSQL atrás de PgBouncer em transaction
+  pooling, onde um lock de sessão não sobrevive à transação): uma linha em
+  scheduler_leases com dono e validade. O dono renova; outro processo só
+  assume depois de SCHEDULER_LEASE_SECONDS sem renovação.
+
+A eleição evita o trabalho duplicado; a garantia de execução única de
+cada disparo fica na chave única de job_runs (ver scheduler.run_job).
+"""
+import os
+import socket
+import uuid
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, exc, select, text, update
+from sqlalchemy.pool import NullPool
+
+from models.jobs import SchedulerLease
+
+LEADER_NAME = "scheduler"
+# Chave do advisory lock (bigint), estável entre deploys
+ADVISORY_KEY = zlib.crc32(b"vendas:scheduler")
+
+
+def process_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class AdvisoryLockLeader:
+    kind = "advisory"
+
+    def __init__(self, url):
+        self._engine = create_engine(url, poolclass=NullPool)
+        self._conn = None
+
+    def acquire(self):
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT 1"))
+                self._conn.commit()
+                return True
+            except exc.DBAPIError:
+                # Conexão caiu: o lock foi junto, outro processo pode assumir
+                self._close()
+        conn = self._engine.connect()
+        try:
+            got = conn.execute(select(text(f"pg_try_advisory_lock({ADVISORY_KEY})"))).scalar()
+            conn.commit()
+        except exc.DBAPIError:
+            conn.close()
+            raise
+        if got:
+            self._conn = conn
+            return True
+        conn.close()
+        return False
+
+    def release(self):
+        if self._conn is not None:
+            try:
+                self._conn.execute(text(f"SELECT pg_advisory_unlock({ADVISORY_KEY})"))
+                self._conn.commit()
+            except exc.DBAPIError:
+                pass
+            self._close()
+
+    def _close(self):
+        try:
+            self._conn.close()
+        except exc.DBAPIError:
+            pass
+        self._conn = None
+
+
+class LeaseLeader:
+    kind = "lease"
+
+    def __init__(self, engine, holder, seconds):
+        self._engine = engine
+        self._holder = holder
+        self._seconds = seconds
+
+    def acquire(self):
+        table = SchedulerLease.__table__
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self._seconds)
+        with self._engine.begin() as conn:
+            renewed = conn.execute(
+                update(table)
+                .where(table.c.name == LEADER_NAME)
+                .where((table.c.holder == self._holder) | (table.c.expires_at < now))
+                .values(holder=self._holder, expires_at=expires_at)
+            ).rowcount
+        if renewed:
+            return True
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(table.insert().values(name=LEADER_NAME, holder=self._holder, expires_at=expires_at))
+            return True
+        except exc.IntegrityError:
+            return False  # outro processo tem a posse e ela ainda vale
+
+    def release(self):
+        table = SchedulerLease.__table__
+        with self._engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.name == LEADER_NAME, table.c.holder == self._holder)
+                .values(expires_at=datetime.utcnow())
+            )
+
+
+def make_leader(engine, holder, lease_seconds, pgbouncer=False):
+    if engine.dialect.name == "postgresql" and not pgbouncer:
+        return AdvisoryLockLeader(engine.url)
+    return LeaseLeader(engine, holder, lease_seconds)
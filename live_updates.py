@@ -0,0 +1,152 @@
+"""
+Atualizações ao vivo do /tv via Server-Sent Events.
+
+Cada tela abre um EventSource em /tv/stream. Quando a planilha é gravada
+neste processo, notify() acorda todas as conexões, que releem o snapshot
+(do cache da grade) e enviam só as células que mudaram. Gravações feitas
+por outro worker aparecem na próxima verificação periódica
+(LIVE_POLL_SECONDS), assim que o snapshot em cache expira.
+
+Uma conexão aberta ocupa uma thread (gthread) ou um greenlet (gevent);
+em servidores sem concorrência (worker sync) o stream é recusado com 503
+e o /tv volta ao recarregamento periódico. LIVE_MAX_STREAMS limita quantas
+telas um worker atende, para não esgotar as threads das requisições
+normais.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+from flask import Response, current_app, request, stream_with_context
+
+from models.user import db
+
+
+class Broadcaster:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._streams = 0
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def notify(self):
+        with self._cond:
+            self._seq += 1
+            self._cond.notify_all()
+
+    def wait(self, seq, timeout):
+        """Bloqueia até haver notificação nova (após `seq`) ou até o timeout."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != seq, timeout)
+            return self._seq
+
+    def acquire_stream(self, limit):
+        with self._cond:
+            if self._streams >= limit:
+                return False
+            self._streams += 1
+            return True
+
+    def release_stream(self):
+        with self._cond:
+            self._streams -= 1
+
+
+def init_app(app):
+    app.config.setdefault("LIVE_POLL_SECONDS", float(os.getenv("LIVE_POLL_SECONDS", "5")))
+    app.config.setdefault("LIVE_MAX_STREAMS", int(os.getenv("LIVE_MAX_STREAMS", "24")))
+    app.config.setdefault("LIVE_STREAM_MAX_SECONDS", float(os.getenv("LIVE_STREAM_MAX_SECONDS", "300")))
+    app.extensions["live_updates"] = Broadcaster()
+
+
+def notify():
+    """Chamado após um commit que altera a grade."""
+    broadcaster = current_app.extensions.get("live_updates")
+    if broadcaster is not None:
+        broadcaster.notify()
+
+
+def supports_streaming(environ):
+    # Threads (gthread / servidor de desenvolvimento) ou greenlets (gevent)
+    if environ.get("wsgi.multithread"):
+        return True
+    gevent_monkey = sys.modules.get("gevent.monkey")
+    return bool(gevent_monkey and gevent_monkey.is_module_patched("threading"))
+
+
+def _event(name, payload):
+    return f"event: {name}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+def grid_delta(old, new):
+    """Células (vendedor, dia, valor) que mudaram entre dois snapshots decodificados."""
+    cells = []
+    for seller, days in new["spreadsheetData"].items():
+        before = old["spreadsheetData"].get(seller, {})
+        for day, value in days.items():
+            if before.get(day) != value:
+                cells.append({"seller": seller, "day": day, "value": value})
+    return cells
+
+
+def _roster(data):
+    return [emp["name"] for emp in data["employees"]]
+
+
+def stream_grid(load_snapshot):
+    """
+    Gerador SSE: envia a grade completa ao conectar e depois apenas os
+    deltas. Deve ser consumido com stream_with_context.
+    """
+    app = current_app._get_current_object()
+    broadcaster = app.extensions["live_updates"]
+    poll = app.config["LIVE_POLL_SECONDS"]
+    deadline = time.monotonic() + app.config["LIVE_STREAM_MAX_SECONDS"]
+
+    seq = broadcaster.seq
+    snapshot = load_snapshot()
+    current = json.loads(snapshot.body)
+    db.session.remove()  # não segura conexão do pool enquanto espera
+
+    yield "retry: 3000\n\n"
+    yield _event("grid", {"etag": snapshot.etag, "cells": grid_delta({"spreadsheetData": {}}, current)})
+
+    while time.monotonic() < deadline:
+        seq = broadcaster.wait(seq, poll)
+        latest = load_snapshot()
+        db.session.remove()
+        if latest.etag == snapshot.etag:
+            yield ": keepalive\n\n"
+            continue
+
+        data = json.loads(latest.body)
+        if _roster(data) != _roster(current):
+            # Vendedores entraram/saíram: a tela precisa recriar as linhas
+            yield _event("reload", {"etag": latest.etag})
+            return
+        yield _event("delta", {"etag": latest.etag, "cells": grid_delta(current, data)})
+        snapshot, current = latest, data
+
+
+def stream_response(load_snapshot):
+    """
+    Resposta text/event-stream, ou 503 se este worker não pode segurar
+    conexões longas (worker sync) ou já atingiu LIVE_MAX_STREAMS. O
+    EventSource do /tv trata o 503 voltando ao recarregamento periódico.
+    """
+    broadcaster = current_app.extensions["live_updates"]
+    if not supports_streaming(request.environ) or not broadcaster.acquire_stream(
+        current_app.config["LIVE_MAX_STREAMS"]
+    ):
+        return Response("stream indisponível", status=503, mimetype="text/plain")
+
+    response = Response(stream_with_context(stream_grid(load_snapshot)), mimetype="text/event-stream")
+    response.call_on_close(broadcaster.release_stream)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # proxies não devem bufferizar o stream
+    return response
@@ -0,0 +1,168 @@
+"""
+Configuração de logs da aplicação.
+
+Antes o create_app ligava o echo do SQLAlchemy (INFO): cada comando e seus
+parâmetros iam para o stdout em toda requisição, e nas rotas quentes
+(/api/data, /tv) escrever o log custava mais que as consultas. Agora o SQL
+fica desligado por padrão e o que sai é controlado pelo ambiente:
+
+- LOG_LEVEL (INFO) e LOG_FORMAT (json | text)
+- SQL_ECHO (0): 1 volta a registrar todo comando (só para depuração local)
+- SLOW_QUERY_MS (250): consultas acima disso saem como WARNING
+- QUERY_LOG_SAMPLE_RATE (0): fração das demais consultas registradas (0.01 = 1%)
+
+Em JSON cada linha traz ts, level, logger, msg e request_id; os logs de
+consulta trazem também duration_ms e statement (sem os parâmetros, que
+podem ter senhas e valores). O request_id vem do cabeçalho X-Request-ID
+(ou é gerado) e volta na resposta.
+"""
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+query_logger = logging.getLogger("vendas.sql")
+
+MAX_STATEMENT_CHARS = 2000
+
+# Uma aplicação por processo: os ganchos do SQLAlchemy (globais) leem daqui
+_settings = {"slow_query_ms": 250.0, "sample_rate": 0.0}
+
+# Funções chamadas com a duração (ms) de cada consulta (ex.: request_timing)
+_query_observers = []
+
+# Atributos padrão de LogRecord; o resto (extra=...) vai para o JSON
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+def current_request_id():
+    if has_request_context():
+        return g.get("request_id")
+    return None
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = current_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _configure_handler(level, fmt):
+    root = logging.getLogger()
+    handler = next((h for h in root.handlers if getattr(h, "_vendas", False)), None)
+    if handler is None:
+        handler = logging.StreamHandler(sys.stdout)
+        handler._vendas = True
+        handler.addFilter(RequestIdFilter())
+        root.addHandler(handler)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    root.setLevel(level)
+
+
+# ---------------------------
+# Tempo de cada consulta
+# ---------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    duration_ms = (time.perf_counter() - starts.pop()) * 1000
+    for observer in _query_observers:
+        observer(duration_ms)
+
+    if duration_ms >= _settings["slow_query_ms"]:
+        level, msg = logging.WARNING, "slow query"
+    elif _settings["sample_rate"] and random.random() < _settings["sample_rate"]:
+        level, msg = logging.INFO, "query"
+    else:
+        return
+    if not query_logger.isEnabledFor(level):
+        return
+    query_logger.log(level, msg, extra={
+        "duration_ms": round(duration_ms, 2),
+        "statement": re.sub(r"\s+", " ", statement).strip()[:MAX_STATEMENT_CHARS],
+        "executemany": executemany,
+    })
+
+
+def add_query_observer(fn):
+    """Registra fn(duration_ms), chamada após cada consulta."""
+    if fn not in _query_observers:
+        _query_observers.append(fn)
+    _install_query_hooks()
+
+
+def _install_query_hooks():
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------
+# Request ID
+# ---------------------------
+def _assign_request_id():
+    incoming = request.headers.get("X-Request-ID", "")
+    g.request_id = incoming[:64] if incoming else uuid.uuid4().hex
+
+
+def _echo_request_id(response):
+    request_id = g.get("request_id")
+    if request_id:
+        response.headers["X-Request-ID"] = request_id
+    return response
+
+
+def _env_bool(name, default):
+    return os.getenv(name, "1" if default else "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def init_app(app):
+    app.config.setdefault("LOG_LEVEL", os.getenv("LOG_LEVEL", "INFO").upper())
+    app.config.setdefault("LOG_FORMAT", os.getenv("LOG_FORMAT", "json").lower())
+    app.config.setdefault("SQL_ECHO", _env_bool("SQL_ECHO", False))
+    app.config.setdefault("SLOW_QUERY_MS", float(os.getenv("SLOW_QUERY_MS", "250")))
+    app.config.setdefault("QUERY_LOG_SAMPLE_RATE", float(os.getenv("QUERY_LOG_SAMPLE_RATE", "0")))
+
+    _configure_handler(app.config["LOG_LEVEL"], app.config["LOG_FORMAT"])
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if app.config["SQL_ECHO"] else logging.WARNING)
+
+    _settings["slow_query_ms"] = app.config["SLOW_QUERY_MS"]
+    _settings["sample_rate"] = app.config["QUERY_LOG_SAMPLE_RATE"]
+    _install_query_hooks()
+
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
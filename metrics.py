@@ -0,0 +1,102 @@
+"""
+Métricas do processo no formato de texto do Prometheus (GET /metrics).
+
+Cada módulo registra um coletor: uma função sem argumentos, chamada dentro
+do app context, que devolve linhas já no formato de exposição. Os valores
+são por processo; com vários workers do gunicorn cada um responde pelos
+seus (o Prometheus distingue pela instância/porta).
+
+METRICS_TOKEN (opcional): exige "Authorization: Bearer <token>".
+"""
+import bisect
+import math
+import os
+import threading
+
+from flask import Response, current_app, request
+
+_collectors = []
+
+
+def register_collector(fn):
+    if fn not in _collectors:
+        _collectors.append(fn)
+    return fn
+
+
+def format_value(value):
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def gauge(name, help_text, value):
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {format_value(value)}"]
+
+
+def counter(name, help_text, value):
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {format_value(value)}"]
+
+
+class Counter:
+    """Contador monotônico, seguro entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Histograma cumulativo (buckets fixos), seguro entre threads."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def render(self, name, help_text):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        acumulado = 0
+        for limite, count in zip(self.buckets + (float("inf"),), counts):
+            acumulado += count
+            lines.append(f'{name}_bucket{{le="{format_value(limite)}"}} {acumulado}')
+        lines.append(f"{name}_sum {total!r}")
+        lines.append(f"{name}_count {acumulado}")
+        return lines
+
+
+def render_metrics():
+    lines = []
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return Response("unauthorized\n", status=401, mimetype="text/plain")
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    app.config.setdefault("METRICS_TOKEN", os.getenv("METRICS_TOKEN"))
+    app.add_url_rule("/metrics", "metrics", metrics_view)
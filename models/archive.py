@@ -16,6 +16,11 @@ class ResumoHistory(db.Model):
     breakdown = db.Column(JSON, nullable=False)  # Ex: [{"seller": "João", "total": 123.45}]
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Listagens ordenadas por created_at (desempate por id)
+        db.Index("ix_resumo_history_created_at_id", "created_at", "id"),
+    )
+
     def __repr__(self):
         return f"<ResumoHistory {self.week_label} - Total {self.total:.2f}>"
 
@@ -47,6 +52,16 @@ class DailySales(db.Model):
     total = db.Column(db.Float, default=0.0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Filtros por intervalo de dia (dashboard) e agrupamento por dia/vendedor
+        db.Index("ix_daily_sales_dia_vendedor", "dia", "vendedor"),
+        # Um registro por vendedor por dia (snapshot diário faz upsert nessa chave);
+        # também serve aos filtros por vendedor (+ período)
+        db.UniqueConstraint("vendedor", "dia", name="uq_daily_sales_vendedor_dia"),
+        # Histórico ordenado por created_at (desempate por id)
+        db.Index("ix_daily_sales_created_at_id", "created_at", "id"),
+    )
+
     def __repr__(self):
         return f"<DailySales {self.vendedor} - {self.dia} - Total {self.total:.2f}>"
 
@@ -62,4 +77,89 @@ class DailySales(db.Model):
             "sexta": self.sexta,
             "total": self.total,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-        }
\ No newline at end of file
+        }
+
+# ---------------------------
+# Rollups (agregados mantidos a cada gravação em daily_sales)
+# ---------------------------
+# Atualizados na mesma transação que insere em DailySales (ver rollups.py),
+# para que o dashboard leia poucos registros pré-agregados em vez de
+# varrer todo o histórico diário.
+
+# Total mensal por vendedor
+class MonthlySalesRollup(db.Model):
+    __tablename__ = "monthly_sales_rollup"
+
+    id = db.Column(db.Integer, primary_key=True)
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    vendedor = db.Column(db.String(100), nullable=False)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    dias = db.Column(db.Integer, nullable=False, default=0)  # registros diários somados
+
+    __table_args__ = (
+        db.UniqueConstraint("ano", "mes", "vendedor", name="uq_monthly_rollup"),
+    )
+
+    def to_dict(self):
+        return {
+            "ano": self.ano,
+            "mes": self.mes,
+            "vendedor": self.vendedor,
+            "total": self.total,
+            "dias": self.dias,
+        }
+
+# Total por semana ISO (segunda a domingo) por vendedor
+class WeeklySalesRollup(db.Model):
+    __tablename__ = "weekly_sales_rollup"
+
+    id = db.Column(db.Integer, primary_key=True)
+    iso_ano = db.Column(db.Integer, nullable=False)
+    iso_semana = db.Column(db.Integer, nullable=False)
+    vendedor = db.Column(db.String(100), nullable=False)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    dias = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("iso_ano", "iso_semana", "vendedor", name="uq_weekly_rollup"),
+    )
+
+    def to_dict(self):
+        return {
+            "iso_ano": self.iso_ano,
+            "iso_semana": self.iso_semana,
+            "vendedor": self.vendedor,
+            "total": self.total,
+            "dias": self.dias,
+        }
+
+# ---------------------------
+# Importações em massa (checkpoint para retomar após falha)
+# ---------------------------
+class ImportJob(db.Model):
+    __tablename__ = "import_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    source_key = db.Column(db.String(64), nullable=False, unique=True)  # sha256 do arquivo + dataset
+    dataset = db.Column(db.String(20), nullable=False)
+    filename = db.Column(db.String(255))
+    status = db.Column(db.String(20), nullable=False, default="running")  # running | done | failed
+    rows_committed = db.Column(db.Integer, nullable=False, default=0)  # linhas do arquivo já processadas
+    batches_committed = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "dataset": self.dataset,
+            "filename": self.filename,
+            "status": self.status,
+            "rows_committed": self.rows_committed,
+            "batches_committed": self.batches_committed,
+            "error": self.error,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from .user import db
+
+
+# Uma execução de job do scheduler (scheduler.run_job)
+class JobRun(db.Model):
+    __tablename__ = "job_runs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(50), nullable=False)
+    # Horário agendado que esta execução cobre (UTC); a chave única faz
+    # cada disparo rodar uma vez só, mesmo com vários processos
+    scheduled_for = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="running")  # running, success, skipped, error
+    holder = db.Column(db.String(100))  # processo que executou (host:pid)
+    message = db.Column(db.Text)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Float)
+
+    __table_args__ = (
+        db.UniqueConstraint("job_id", "scheduled_for", name="uq_job_runs_job_scheduled"),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "job_id": self.job_id,
+            "scheduled_for": self.scheduled_for.isoformat(),
+            "status": self.status,
+            "holder": self.holder,
+            "message": self.message,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_ms": self.duration_ms,
+        }
+
+
+# Liderança do scheduler em bancos sem advisory lock (SQLite, PgBouncer)
+class SchedulerLease(db.Model):
+    __tablename__ = "scheduler_leases"
+
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
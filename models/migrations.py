@@ -0,0 +1,270 @@
+import json
+import os
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from .user import db
+
+# ---------------------------
+# Migrações leves e idempotentes
+# ---------------------------
+# O db.create_all() só cria tabelas novas; colunas adicionadas a tabelas
+# que já existem em produção precisam ser aplicadas aqui. Cada passo
+# verifica o esquema antes de alterar, então rodar de novo não faz nada.
+#
+# Os passos aplicados ficam em schema_version: subir a aplicação custa uma
+# consulta (pending_migrations) em vez de inspecionar o esquema inteiro.
+# Passos pendentes rodam com `flask db upgrade` (o gunicorn.conf.py chama
+# no início de cada deploy) ou na primeira requisição (ver health.py).
+# Tabela nova num model: acrescente um passo (pode não fazer nada), pois
+# o create_all só roda quando há passo pendente.
+
+schema_version = db.Table(
+    "schema_version",
+    db.Column("name", db.String(100), primary_key=True),
+    db.Column("applied_at", db.DateTime, nullable=False),
+)
+
+# Chave do advisory lock que serializa migrações de processos que sobem juntos
+MIGRATION_LOCK_KEY = zlib.crc32(b"vendas:migrations")
+
+
+def _add_column(table, column, ddl):
+    inspector = inspect(db.engine)
+    if table not in inspector.get_table_names():
+        return False
+    existing = {c["name"] for c in inspector.get_columns(table)}
+    if column in existing:
+        return False
+    with db.engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+def _create_missing_indexes():
+    # Índices declarados nos models que ainda não existem no banco
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    created = False
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                print(f"🛠️ Índice criado: {index.name}")
+                created = True
+    return created
+
+
+def _sales_version():
+    return _add_column("sales", "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def _rollups_backfill():
+    # Tabelas de rollup recém-criadas pelo create_all: preenche a partir do histórico
+    from rollups import rebuild_rollups, rollups_missing
+
+    if not rollups_missing():
+        return False
+    rebuild_rollups()
+    return True
+
+
+def _daily_sales_unique():
+    # Remove snapshots duplicados (mantém o mais recente de cada vendedor/dia)
+    # e cria a chave única usada pelo upsert do snapshot diário.
+    inspector = inspect(db.engine)
+    if "daily_sales" not in inspector.get_table_names():
+        return False
+    names = {ix["name"] for ix in inspector.get_indexes("daily_sales")}
+    names |= {uc["name"] for uc in inspector.get_unique_constraints("daily_sales")}
+    if "uq_daily_sales_vendedor_dia" in names:
+        return False
+
+    with db.engine.begin() as conn:
+        removed = conn.execute(text(
+            "DELETE FROM daily_sales WHERE id NOT IN "
+            "(SELECT MAX(id) FROM daily_sales GROUP BY vendedor, dia)"
+        )).rowcount
+        conn.execute(text("CREATE UNIQUE INDEX uq_daily_sales_vendedor_dia ON daily_sales (vendedor, dia)"))
+        # coberto pela chave única
+        conn.execute(text("DROP INDEX IF EXISTS ix_daily_sales_vendedor_dia"))
+
+    if removed:
+        print(f"🛠️ {removed} registro(s) duplicado(s) removido(s) de daily_sales")
+        from rollups import rebuild_rollups
+
+        rebuild_rollups()
+    return True
+
+
+def _backfill_created_at():
+    # A paginação por (created_at, id) não funciona com created_at nulo:
+    # registros antigos recebem a data a que se referem.
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    changed = 0
+    with db.engine.begin() as conn:
+        for table, column in (("daily_sales", "dia"), ("resumo_history", "started_at")):
+            if table in tables:
+                changed += conn.execute(text(
+                    f"UPDATE {table} SET created_at = {column} WHERE created_at IS NULL"
+                )).rowcount
+    return changed > 0
+
+
+def _sellers_seed():
+    # Tabela `sellers` recém-criada: importa os vendedores que ficavam em
+    # database/planilha_data.json (senhas passam a ser guardadas como hash)
+    from .seller import Seller
+
+    if db.session.query(Seller.id).first() is not None:
+        return False
+    path = os.path.join(os.path.dirname(__file__), "..", "database", "planilha_data.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            employees = json.load(f).get("employees", [])
+    except (OSError, ValueError):
+        print(f"⚠️ {path} não encontrado: cadastre os vendedores pela tela do admin")
+        return False
+    for position, emp in enumerate(employees):
+        seller = Seller(name=emp["name"], position=position)
+        seller.set_password(emp["password"])
+        db.session.add(seller)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # outro worker subindo junto já importou
+        return False
+    return bool(employees)
+
+
+def _new_tables():
+    # Tabelas novas (job_runs, scheduler_leases) vêm do create_all
+    return False
+
+
+def _data_versions():
+    # data_versions (render_cache) vem do create_all: contadores de "history"
+    # e "roster" no banco, iguais em todos os workers
+    import render_cache  # noqa: F401  registra a tabela no metadata
+
+    return False
+
+
+def _sales_facts():
+    # `sales` (dia da semana em texto, zerada toda segunda) dá lugar a
+    # sales_facts: partições mensais (PostgreSQL), view da semana corrente e
+    # importação do histórico de daily_sales e da semana em andamento
+    from sales_facts import create_view, ensure_future_partitions, import_legacy
+
+    ensure_future_partitions()
+    create_view()
+    import_legacy()
+    return True
+
+
+MIGRATIONS = [
+    ("0001_sales_version", _sales_version),
+    ("0002_rollups_backfill", _rollups_backfill),
+    ("0003_indexes", _create_missing_indexes),
+    ("0004_daily_sales_unique", _daily_sales_unique),
+    ("0005_backfill_created_at", _backfill_created_at),
+    ("0006_sellers_seed", _sellers_seed),
+    ("0007_job_runs", _new_tables),
+    ("0008_sales_facts", _sales_facts),
+    ("0009_data_versions", _data_versions),
+]
+
+
+def applied_migrations():
+    """Nomes registrados em schema_version (vazio em banco anterior a ela)."""
+    try:
+        with db.engine.connect() as conn:
+            return {row[0] for row in conn.execute(select(schema_version.c.name))}
+    except DBAPIError:
+        # Sem a tabela ainda: tudo pendente. Banco fora do ar: o inspect também falha
+        if inspect(db.engine).has_table("schema_version"):
+            raise
+        return set()
+
+
+def pending_migrations():
+    applied = applied_migrations()
+    return [name for name, _ in MIGRATIONS if name not in applied]
+
+
+@contextmanager
+def _migration_lock():
+    # Workers/instâncias subindo juntos: um migra, os outros esperam e
+    # encontram tudo aplicado. Atrás de PgBouncer (transaction pooling) o
+    # lock de sessão não vale; os passos continuam idempotentes.
+    from db_pool import pgbouncer_mode
+
+    if db.engine.dialect.name != "postgresql" or pgbouncer_mode():
+        yield
+        return
+    with db.engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            conn.commit()
+
+
+def _record(name):
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(schema_version.insert().values(name=name, applied_at=datetime.utcnow()))
+    except IntegrityError:
+        pass  # registrado por outro processo
+
+
+def run_migrations():
+    """Aplica os passos pendentes; retorna os nomes dos que alteraram o banco."""
+    with _migration_lock():
+        pending = pending_migrations()
+        if not pending:
+            return []
+        db.create_all()
+        applied = []
+        for name, step in MIGRATIONS:
+            if name not in pending:
+                continue
+            if step():
+                applied.append(name)
+                print(f"🛠️ Migração aplicada: {name}")
+            _record(name)
+    if applied:
+        from render_cache import render_cache  # HTML de /resumo gerado antes da migração
+        render_cache.invalidate("history")
+    return applied
+
+
+db_cli = AppGroup("db", help="Esquema do banco (schema_version).")
+
+
+@db_cli.command("upgrade")
+def upgrade_command():
+    """Cria tabelas novas e aplica as migrações pendentes."""
+    pending = pending_migrations()
+    run_migrations()
+    click.echo(f"{len(pending)} migração(ões) aplicada(s)." if pending else "Esquema em dia.")
+
+
+@db_cli.command("status")
+def status_command():
+    """Migrações aplicadas e pendentes."""
+    applied = applied_migrations()
+    for name, _ in MIGRATIONS:
+        click.echo(f"{'aplicada ' if name in applied else 'PENDENTE '} {name}")
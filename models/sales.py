@@ -1,21 +1,41 @@
 from .user import db
 
-class Sale(db.Model):
-    __tablename__ = 'sales'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    employee_name = db.Column(db.String(100), nullable=False)
-    day = db.Column(db.String(10), nullable=False)
-    value = db.Column(db.Float, default=0.0)
+# Venda de um vendedor num dia. Nada é zerado na virada da semana: a grade
+# semanal é a view current_week_sales e as semanas anteriores continuam aqui.
+# No PostgreSQL a tabela é particionada por mês (RANGE em sale_date), com as
+# partições sales_facts_AAAA_MM criadas por sales_facts.ensure_partitions;
+# consultas por período só leem as partições dos meses pedidos.
+class SaleFact(db.Model):
+    __tablename__ = 'sales_facts'
+
+    seller_id = db.Column(db.Integer, db.ForeignKey('sellers.id'), primary_key=True)
+    sale_date = db.Column(db.Date, primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0.0)
+    # Incrementado a cada alteração de valor (concorrência otimista no PATCH /api/data)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     __table_args__ = (
-        db.UniqueConstraint('employee_name', 'day', name='uq_employee_day'),
+        # Período de todos os vendedores (view da semana, relatórios)
+        db.Index('ix_sales_facts_sale_date', 'sale_date'),
+        {'postgresql_partition_by': 'RANGE (sale_date)'},
     )
 
     def to_dict(self):
         return {
-            'id': self.id,
-            'employee_name': self.employee_name,
-            'day': self.day,
-            'value': self.value
-        }
\ No newline at end of file
+            'seller_id': self.seller_id,
+            'sale_date': self.sale_date.isoformat(),
+            'value': self.value,
+            'version': self.version
+        }
+
+# View da semana corrente (segunda a sexta no fuso de São Paulo), criada
+# pela migração 0008 (DDL em sales_facts.py). MetaData própria: o
+# create_all não pode tentar criá-la como tabela.
+current_week_sales = db.Table(
+    'current_week_sales', db.MetaData(),
+    db.Column('seller_id', db.Integer),
+    db.Column('sale_date', db.Date),
+    db.Column('day', db.String(10)),  # monday..friday
+    db.Column('value', db.Float),
+    db.Column('version', db.Integer),
+)
\ No newline at end of file
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from .user import db
+
+
+# Vendedores da planilha semanal (login, linhas de /api/data e /tv)
+class Seller(db.Model):
+    __tablename__ = "sellers"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    password = db.Column(db.String(256), nullable=False)  # hash (werkzeug), nunca o texto
+    position = db.Column(db.Integer, nullable=False, default=0)  # ordem das linhas na grade
+    # Removido pelo admin: some da grade, mas o nome continua no histórico
+    active = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Seller {self.name}>"
+
+    def set_password(self, password):
+        self.password = generate_password_hash(password)
+
+    def check_password(self, password):
+        return check_password_hash(self.password, password)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "position": self.position,
+            "active": self.active,
+        }
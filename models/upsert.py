@@ -0,0 +1,46 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .user import db
+
+# Dialetos com suporte a INSERT ... ON CONFLICT DO UPDATE
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def supports_upsert(session=None):
+    session = session or db.session
+    return session.get_bind().dialect.name in _INSERTS
+
+
+def upsert_rows(model, rows, index_elements, update_columns=None, set_=None, session=None):
+    """
+    Insere ou atualiza `rows` (lista de dicts) em um único comando em lote
+    usando INSERT ... ON CONFLICT (index_elements) DO UPDATE.
+
+    - update_columns: colunas copiadas do valor novo (EXCLUDED.col)
+    - set_: função opcional (tabela, excluded) -> dict com expressões extras,
+      ex.: {"version": tabela.c.version + 1}
+
+    Não faz commit: quem chama controla a transação.
+    """
+    session = session or db.session
+    if not rows:
+        return
+
+    table = model.__table__
+    insert = _INSERTS[session.get_bind().dialect.name]
+    stmt = insert(table)
+
+    values = {col: stmt.excluded[col] for col in (update_columns or [])}
+    if set_ is not None:
+        values.update(set_(table, stmt.excluded))
+
+    if values:
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=values)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+    # executemany: o driver envia o lote inteiro de uma vez
+    session.execute(stmt, rows)
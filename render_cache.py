@@ -0,0 +1,120 @@
+"""
+Cache do HTML já renderizado de /tv e /resumo.
+
+As duas páginas são telões/painéis abertos o dia todo: recarregam sem que
+os dados tenham mudado, e cada hit renderizava o template de novo
+(format_brl em cada célula). Aqui o HTML pronto fica guardado sob uma
+chave que inclui a versão dos dados, então um hit repetido não passa pelo
+Jinja e a entrada antiga simplesmente deixa de ser usada quando os dados
+mudam.
+
+Versões:
+- /tv: o ETag do snapshot da grade (grid_cache), que já muda a cada escrita
+- /resumo: o token "history", trocado por invalidate("history") depois de
+  cada commit em daily_sales/rollups (snapshot diário, importação, rebuild)
+
+Os tokens ("history", "roster") são contadores na tabela data_versions:
+invalidate() incrementa no banco, então todos os workers enxergam o mesmo
+valor e ele só muda quando algo é gravado (ETags estáveis entre workers e
+ao longo do tempo). Cada worker guarda o valor lido por até
+RENDER_VERSION_TTL segundos (padrão 5), num store à parte que o HTML não
+consegue descartar; é o atraso máximo para enxergar a escrita de outro.
+
+Com Redis (RENDER_CACHE_URL, padrão GRID_CACHE_URL) o HTML é compartilhado;
+senão cada worker tem suas entradas (RENDER_CACHE_MAX_ITEMS, RENDER_CACHE_TTL).
+"""
+import os
+
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from grid_cache import LocalBackend, Snapshot, make_backend
+from models.user import db
+
+HTML_PREFIX = "vendas:html:"
+
+# Contador por conjunto de dados; sem linha = versão 0
+data_versions = db.Table(
+    "data_versions",
+    db.Column("name", db.String(50), primary_key=True),
+    db.Column("version", db.Integer, nullable=False, default=0),
+)
+
+
+class RenderCache:
+    def init_app(self, app):
+        app.config.setdefault("RENDER_CACHE_URL", os.getenv("RENDER_CACHE_URL", app.config.get("GRID_CACHE_URL")))
+        app.config.setdefault("RENDER_CACHE_TTL", int(os.getenv("RENDER_CACHE_TTL", "60")))
+        app.config.setdefault("RENDER_CACHE_MAX_ITEMS", int(os.getenv("RENDER_CACHE_MAX_ITEMS", "64")))
+        app.config.setdefault("RENDER_VERSION_TTL", int(os.getenv("RENDER_VERSION_TTL", "5")))
+        app.extensions["render_cache"] = make_backend(
+            app.config["RENDER_CACHE_URL"], max_items=app.config["RENDER_CACHE_MAX_ITEMS"]
+        )
+        app.extensions["render_cache_versions"] = LocalBackend()
+
+    @property
+    def _backend(self):
+        return current_app.extensions["render_cache"]
+
+    @property
+    def _versions(self):
+        return current_app.extensions["render_cache_versions"]
+
+    def version(self, name):
+        """Token atual dos dados `name` (contador de data_versions, como texto)."""
+        token = self._versions.get(name)
+        if token is None:
+            valor = db.session.execute(
+                select(data_versions.c.version).where(data_versions.c.name == name)
+            ).scalar()
+            token = self._remember(name, valor or 0)
+        return token
+
+    def _remember(self, name, valor):
+        token = f"v{valor}"
+        self._versions.set(name, token, current_app.config["RENDER_VERSION_TTL"])
+        return token
+
+    def _bump(self, name):
+        # A sessão já fez o commit dos dados: este commit só leva o contador.
+        # Valor lido na mesma transação (linha travada pelo UPDATE)
+        incremento = (
+            update(data_versions)
+            .where(data_versions.c.name == name)
+            .values(version=data_versions.c.version + 1)
+        )
+        atual = select(data_versions.c.version).where(data_versions.c.name == name)
+        try:
+            if db.session.execute(incremento).rowcount == 0:
+                db.session.execute(data_versions.insert().values(name=name, version=1))
+            valor = db.session.execute(atual).scalar()
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # linha criada agora por outro processo
+            db.session.execute(incremento)
+            valor = db.session.execute(atual).scalar()
+            db.session.commit()
+        return valor
+
+    def invalidate(self, name):
+        """Chamado depois do commit que alterou os dados `name`."""
+        if "render_cache" in current_app.extensions:
+            self._remember(name, self._bump(name))
+
+    def get_or_render(self, key, render):
+        """HTML guardado sob `key` (que deve incluir a versão dos dados), ou render()."""
+        cached = self._backend.get(HTML_PREFIX + key)
+        if cached is not None:
+            return cached.body
+        html = render()
+        self._backend.set(HTML_PREFIX + key, Snapshot(key, html), current_app.config["RENDER_CACHE_TTL"])
+        return html
+
+
+render_cache = RenderCache()
+
+
+def template_version(name):
+    """Muda quando o template muda (deploy), invalidando HTML e ETags antigos."""
+    return int(os.path.getmtime(os.path.join(current_app.template_folder, name)))
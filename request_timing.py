@@ -0,0 +1,170 @@
+"""
+Tempo de cada requisição: total, banco, número de consultas e templates.
+
+Para cada requisição mede:
+- app: tempo total até a resposta sair da view (inclui banco e templates)
+- db: soma do tempo das consultas e quantas foram
+- tpl: tempo renderizando templates Jinja
+
+Os valores voltam no cabeçalho Server-Timing (aparece na aba Network do
+navegador) e entram numa janela deslizante por endpoint
+(data.get_data, archive.get_daily_history, resumo.resumo_page, tv, ...),
+de onde GET /metrics tira p50/p95/p99 no formato summary do Prometheus.
+
+Respostas em streaming (SSE, exportações) só contam até o início do corpo.
+
+- SERVER_TIMING (1): 0 omite o cabeçalho (as métricas continuam)
+- TIMING_WINDOW_SECONDS (300) / TIMING_WINDOW_SIZE (2048): tamanho da janela
+"""
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import g, request, before_render_template, template_rendered
+
+import log_config
+import metrics
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+SERIES = (
+    ("http_request_duration_seconds", "Tempo total da requisição", "app"),
+    ("http_request_db_seconds", "Tempo em consultas SQL por requisição", "db"),
+    ("http_request_template_seconds", "Tempo renderizando templates por requisição", "tpl"),
+    ("http_request_queries", "Consultas SQL por requisição", "queries"),
+)
+
+
+class RollingWindow:
+    """Amostras recentes por endpoint (limitadas por idade e quantidade)."""
+
+    def __init__(self, max_age, max_size):
+        self.max_age = max_age
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_size))
+        self._totals = defaultdict(lambda: defaultdict(float))  # acumulado desde o início (_sum/_count)
+
+    def add(self, endpoint, sample):
+        now = time.monotonic()
+        with self._lock:
+            self._samples[endpoint].append((now, sample))
+            totals = self._totals[endpoint]
+            totals["count"] += 1
+            for key, value in sample.items():
+                totals[key] += value
+
+    def snapshot(self):
+        limite = time.monotonic() - self.max_age
+        with self._lock:
+            for samples in self._samples.values():
+                while samples and samples[0][0] < limite:
+                    samples.popleft()
+            return (
+                {endpoint: [s for _, s in samples] for endpoint, samples in self._samples.items()},
+                {endpoint: dict(totals) for endpoint, totals in self._totals.items()},
+            )
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+_window = RollingWindow(max_age=300, max_size=2048)
+
+
+# ---------------------------
+# Coleta durante a requisição
+# ---------------------------
+def _start():
+    g.timing = {"start": time.perf_counter(), "db": 0.0, "queries": 0, "tpl": 0.0, "tpl_start": []}
+
+
+def _on_query(duration_ms):
+    timing = _current()
+    if timing is not None:
+        timing["db"] += duration_ms / 1000
+        timing["queries"] += 1
+
+
+def _current():
+    try:
+        return g.get("timing")
+    except RuntimeError:  # fora de uma requisição (scheduler, CLI)
+        return None
+
+
+def _template_start(sender, template, context, **extra):
+    timing = _current()
+    if timing is not None:
+        timing["tpl_start"].append(time.perf_counter())
+
+
+def _template_end(sender, template, context, **extra):
+    timing = _current()
+    if timing is not None and timing["tpl_start"]:
+        timing["tpl"] += time.perf_counter() - timing["tpl_start"].pop()
+
+
+def _finish(response):
+    timing = g.pop("timing", None)
+    if timing is None:
+        return response
+    sample = {
+        "app": time.perf_counter() - timing["start"],
+        "db": timing["db"],
+        "tpl": timing["tpl"],
+        "queries": timing["queries"],
+    }
+    _window.add(request.endpoint or "unmatched", sample)
+
+    if _server_timing_enabled:
+        response.headers["Server-Timing"] = (
+            f"app;dur={sample['app'] * 1000:.1f}, "
+            f'db;dur={sample["db"] * 1000:.1f};desc="{sample["queries"]} queries", '
+            f"tpl;dur={sample['tpl'] * 1000:.1f}"
+        )
+    return response
+
+
+# ---------------------------
+# Exposição em /metrics
+# ---------------------------
+@metrics.register_collector
+def timing_metrics():
+    recentes, totais = _window.snapshot()
+    lines = []
+    for name, help_text, key in SERIES:
+        lines.append(f"# HELP {name} {help_text} (quantis da janela recente)")
+        lines.append(f"# TYPE {name} summary")
+        for endpoint in sorted(totais):
+            valores = sorted(s[key] for s in recentes.get(endpoint, []))
+            label = f'endpoint="{endpoint}"'
+            for q in QUANTILES:
+                lines.append(f'{name}{{{label},quantile="{q}"}} {metrics.format_value(_quantile(valores, q))}')
+            lines.append(f"{name}_sum{{{label}}} {metrics.format_value(totais[endpoint].get(key, 0.0))}")
+            lines.append(f"{name}_count{{{label}}} {int(totais[endpoint]['count'])}")
+    return lines
+
+
+_server_timing_enabled = True
+
+
+def init_app(app):
+    global _window, _server_timing_enabled
+    app.config.setdefault("SERVER_TIMING", os.getenv("SERVER_TIMING", "1").strip().lower() in ("1", "true", "yes", "on"))
+    app.config.setdefault("TIMING_WINDOW_SECONDS", float(os.getenv("TIMING_WINDOW_SECONDS", "300")))
+    app.config.setdefault("TIMING_WINDOW_SIZE", int(os.getenv("TIMING_WINDOW_SIZE", "2048")))
+
+    _server_timing_enabled = app.config["SERVER_TIMING"]
+    _window = RollingWindow(app.config["TIMING_WINDOW_SECONDS"], app.config["TIMING_WINDOW_SIZE"])
+
+    log_config.add_query_observer(_on_query)
+    before_render_template.connect(_template_start, app)
+    template_rendered.connect(_template_end, app)
+    app.before_request(_start)
+    app.after_request(_finish)
@@ -0,0 +1,141 @@
+"""
+Manutenção dos rollups mensais/semanais de vendas.
+
+apply_daily_sales() é chamado por quem grava em daily_sales, antes do
+commit, e soma os novos registros aos rollups na mesma transação. Quem
+grava chama lock_days() antes de ler os registros que vai sobrescrever:
+duas gravações do mesmo dia ao mesmo tempo (job das 18:20 e
+/archive/api/daily-save) veriam "nenhum registro" e somariam duas vezes.
+rebuild_rollups() recalcula tudo a partir de daily_sales (comando
+`flask rollups rebuild`).
+"""
+import zlib
+from collections import defaultdict
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, text
+
+from models.archive import DailySales, MonthlySalesRollup, WeeklySalesRollup
+from models.upsert import supports_upsert, upsert_rows
+from models.user import db
+from render_cache import render_cache
+
+rollups_cli = AppGroup("rollups", help="Rollups mensais/semanais de vendas.")
+
+REBUILD_CHUNK = 5000
+
+
+def lock_days(dias):
+    """
+    Serializa, até o commit, quem grava daily_sales dos mesmos dias
+    (pg_advisory_xact_lock por dia, em ordem para não haver deadlock). No
+    SQLite o próprio banco já serializa as escritas.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return
+    for dia in sorted(set(dias)):
+        db.session.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": zlib.crc32(f"vendas:daily:{dia}".encode())}
+        )
+
+
+def _chaves(dia):
+    iso = dia.isocalendar()
+    return (dia.year, dia.month), (iso[0], iso[1])
+
+
+def _acumular(registros):
+    """(vendedor, dia, total) -> deltas {chave: [total, dias]} por mês e por semana ISO."""
+    mensal = defaultdict(lambda: [0.0, 0])
+    semanal = defaultdict(lambda: [0.0, 0])
+    for vendedor, dia, total, dias in registros:
+        (ano, mes), (iso_ano, iso_semana) = _chaves(dia)
+        for acc, chave in ((mensal, (ano, mes, vendedor)), (semanal, (iso_ano, iso_semana, vendedor))):
+            acc[chave][0] += total or 0.0
+            acc[chave][1] += dias
+    return mensal, semanal
+
+
+def _somar(table, excluded):
+    return {
+        "total": table.c.total + excluded.total,
+        "dias": table.c.dias + excluded.dias,
+    }
+
+
+def _gravar(model, chaves, deltas):
+    rows = [
+        dict(zip(chaves, chave), total=total, dias=dias)
+        for chave, (total, dias) in deltas.items()
+        if total or dias
+    ]
+    if not rows:
+        return
+    if supports_upsert():
+        upsert_rows(model, rows, index_elements=list(chaves), set_=_somar)
+        return
+    for row in rows:
+        filtro = {c: row[c] for c in chaves}
+        existente = model.query.filter_by(**filtro).first()
+        if existente:
+            existente.total += row["total"]
+            existente.dias += row["dias"]
+        else:
+            db.session.add(model(**row))
+
+
+def apply_daily_sales(registros, substituidos=()):
+    """
+    Soma registros de DailySales aos rollups. `substituidos` são as versões
+    antigas de registros que foram sobrescritos (upsert) e saem dos totais.
+    Aceita objetos DailySales ou dicts com vendedor/dia/total. Não faz commit.
+    """
+    def campos(r, sinal):
+        if isinstance(r, dict):
+            return r["vendedor"], r["dia"], sinal * (r.get("total") or 0.0), sinal
+        return r.vendedor, r.dia, sinal * (r.total or 0.0), sinal
+
+    mensal, semanal = _acumular(
+        [campos(r, -1) for r in substituidos] + [campos(r, 1) for r in registros]
+    )
+    _gravar(MonthlySalesRollup, ("ano", "mes", "vendedor"), mensal)
+    _gravar(WeeklySalesRollup, ("iso_ano", "iso_semana", "vendedor"), semanal)
+
+
+def rebuild_rollups():
+    """Recalcula os rollups a partir de daily_sales. Retorna quantas linhas foram geradas."""
+    # Pré-agrega por (dia, vendedor) no banco e lê em blocos
+    query = (
+        db.session.query(
+            DailySales.vendedor,
+            DailySales.dia,
+            func.sum(DailySales.total),
+            func.count(DailySales.id),
+        )
+        .group_by(DailySales.dia, DailySales.vendedor)
+        .execution_options(yield_per=REBUILD_CHUNK)
+    )
+    mensal, semanal = _acumular(query)
+
+    db.session.query(MonthlySalesRollup).delete()
+    db.session.query(WeeklySalesRollup).delete()
+    _gravar(MonthlySalesRollup, ("ano", "mes", "vendedor"), mensal)
+    _gravar(WeeklySalesRollup, ("iso_ano", "iso_semana", "vendedor"), semanal)
+    db.session.commit()
+    render_cache.invalidate("history")
+    return len(mensal), len(semanal)
+
+
+def rollups_missing():
+    """daily_sales tem dados mas os rollups estão vazios (ex.: logo após criar as tabelas)."""
+    if db.session.query(MonthlySalesRollup.id).first() is not None:
+        return False
+    return db.session.query(DailySales.id).first() is not None
+
+
+@rollups_cli.command("rebuild")
+def rebuild_command():
+    """Recalcula os rollups mensais/semanais a partir de daily_sales."""
+    mensais, semanais = rebuild_rollups()
+    click.echo(f"Rollups recalculados: {mensais} mensais, {semanais} semanais.")
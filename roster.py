@@ -0,0 +1,161 @@
+"""
+Cadastro de vendedores (tabela `sellers`) com índice em memória.
+
+A lista de vendedores era fixa em app.py, em routes/data.py e no fallback
+de routes/user.py, que ainda relia database/planilha_data.json a cada
+login e reescrevia o arquivo inteiro a cada troca de senha. Agora a
+tabela é a fonte única e cada worker guarda um índice montado com uma
+consulta:
+
+- by_name: nome (sem diferenciar maiúsculas) -> registro; login e troca
+  de senha são uma busca no dicionário
+- records: vendedores ativos na ordem da grade (/api/data, /tv)
+
+Quem altera o cadastro chama changed() depois do commit: o token "roster"
+do render_cache (contador no banco) muda e o índice é remontado na
+próxima leitura; os outros workers recarregam em até RENDER_VERSION_TTL.
+"""
+import threading
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import update
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import live_updates
+from grid_cache import grid_cache
+from models.seller import Seller
+from models.user import db
+from render_cache import render_cache
+
+# password: hash, só para conferir o login; nunca sai na API
+SellerRecord = namedtuple("SellerRecord", ["id", "name", "password", "position"])
+
+
+class RosterIndex:
+    def __init__(self, version, records):
+        self.version = version
+        self.records = records
+        self.by_name = {r.name.casefold(): r for r in records}
+
+
+def _load(version):
+    rows = db.session.execute(
+        db.select(Seller.id, Seller.name, Seller.password, Seller.position)
+        .where(Seller.active.is_(True))
+        .order_by(Seller.position, Seller.id)
+    )
+    return RosterIndex(version, tuple(SellerRecord(*row) for row in rows))
+
+
+class Roster:
+    def init_app(self, app):
+        app.extensions["roster"] = {"index": None, "lock": threading.Lock()}
+
+    def _index(self):
+        state = current_app.extensions["roster"]
+        # Token lido antes da consulta: um commit no meio troca o token e
+        # força outra recarga, nunca deixa um índice velho marcado como novo
+        version = render_cache.version("roster")
+        index = state["index"]
+        if index is None or index.version != version:
+            with state["lock"]:
+                index = state["index"]
+                if index is None or index.version != version:
+                    index = state["index"] = _load(version)
+        return index
+
+    def records(self):
+        """Vendedores ativos, na ordem das linhas da planilha."""
+        return self._index().records
+
+    def names(self):
+        return [r.name for r in self._index().records]
+
+    def get(self, name):
+        return self._index().by_name.get((name or "").casefold())
+
+    def authenticate(self, name, password):
+        """Registro do vendedor se a senha confere; senão None."""
+        record = self.get(name)
+        if record and password and check_password_hash(record.password, password):
+            return record
+        return None
+
+    def changed(self):
+        """Chamado depois do commit que alterou `sellers`."""
+        render_cache.invalidate("roster")
+        # A grade lista os vendedores: /api/data, /tv e telas conectadas
+        grid_cache.invalidate()
+        live_updates.notify()
+
+    def set_password(self, name, password):
+        """Troca a senha (uma linha); False se o vendedor não existe."""
+        record = self.get(name)
+        if record is None:
+            return False
+        db.session.execute(
+            update(Seller).where(Seller.id == record.id).values(password=generate_password_hash(password))
+        )
+        db.session.commit()
+        self.changed()
+        return True
+
+    def deactivate(self, name):
+        """Desativa o vendedor (DELETE /api/sellers/<nome>); False se não existe."""
+        record = self.get(name)
+        if record is None:
+            return False
+        db.session.execute(update(Seller).where(Seller.id == record.id).values(active=False))
+        db.session.commit()
+        self.changed()
+        return True
+
+    def sync(self, employees):
+        """
+        Aplica a lista de vendedores enviada pelo admin no POST /api/data:
+        nomes novos são criados (exigem senha) e a ordem da lista vira a
+        ordem da grade. Quem não está na lista continua ativo (a tela pode
+        estar velha ou ter falhado ao carregar); remover é DELETE
+        /api/sellers/<nome>. Não faz commit: quem chama grava junto com a
+        planilha e chama changed() se retornou True. ValueError se a lista
+        for inválida.
+        """
+        if not isinstance(employees, list) or not employees:
+            raise ValueError("Lista de vendedores vazia")
+        wanted = []
+        seen = set()
+        for emp in employees:
+            name = (emp.get("name") or "").strip() if isinstance(emp, dict) else ""
+            if not name:
+                raise ValueError("Vendedor sem nome")
+            if name.casefold() not in seen:
+                seen.add(name.casefold())
+                wanted.append((name, emp.get("password")))
+
+        existing = {s.name.casefold(): s for s in Seller.query}
+        changed = False
+        for position, (name, password) in enumerate(wanted):
+            seller = existing.get(name.casefold())
+            if seller is None:
+                if not password:
+                    raise ValueError(f"Informe a senha de {name}")
+                seller = Seller(name=name, position=position)
+                seller.set_password(password)
+                db.session.add(seller)
+                changed = True
+                continue
+            if not seller.active:
+                seller.active = True
+                if password:
+                    seller.set_password(password)
+                changed = True
+            if seller.position != position:
+                seller.position = position
+                changed = True
+        if changed:
+            db.session.flush()
+        return changed
+
+
+roster = Roster()
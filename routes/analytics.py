@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, make_response, request
+
+import analytics
+from grid_cache import conditional_response, make_etag
+from render_cache import render_cache
+from routes.archive import parse_date_arg
+from sales_facts import TZ
+
+analytics_bp = Blueprint("analytics", __name__)
+
+# Período padrão de cada visão, terminando hoje
+PADRAO_SEMANAS = 12
+PADRAO_MESES = 12
+
+
+def _periodo_padrao(visao, hoje):
+    if visao == "ranking":
+        return hoje.replace(day=1)  # mês corrente
+    if visao == "semana":
+        return hoje - timedelta(weeks=PADRAO_SEMANAS - 1)
+    mes = hoje.year * 12 + hoje.month - 1 - (PADRAO_MESES - 1)
+    return hoje.replace(year=mes // 12, month=mes % 12 + 1, day=1)
+
+
+def _responder(visao, calcular):
+    """
+    Lê from/to (AAAA-MM-DD) da query string e responde
+    {"from", "to", "engine", "items"}. O JSON fica no cache do analytics
+    sob o token "history" (trocado a cada gravação em daily_sales/rollups),
+    com ETag para GET condicionais.
+    """
+    hoje = datetime.now(TZ).date()
+    try:
+        de = parse_date_arg(request.args.get("from"), "from") or _periodo_padrao(visao, hoje)
+        ate = parse_date_arg(request.args.get("to"), "to") or hoje
+        if de > ate:
+            raise ValueError("'from' deve ser anterior a 'to'")
+        motor = analytics.engine()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    vendedor = request.args.get("vendedor") or ""
+    etag = "analytics-" + make_etag(f"{render_cache.version('history')}|{motor}|{visao}|{de}|{ate}|{vendedor}")
+
+    def render():
+        itens = calcular(de, ate, vendedor or None, motor)
+        return current_app.json.dumps({"from": de.isoformat(), "to": ate.isoformat(), "engine": motor, "items": itens})
+
+    try:
+        body = analytics.cached(etag, render)
+    except analytics.AnalyticsError as e:
+        return jsonify({"error": str(e)}), 400
+    except (ValueError, OverflowError):
+        # ex.: from=0001-01-01: a janela da média recua para antes do ano 1
+        return jsonify({"error": "Período fora do intervalo de datas suportado"}), 400
+    return conditional_response(etag, lambda: make_response(body, 200, {"Content-Type": "application/json"}))
+
+
+@analytics_bp.route("/ranking", methods=["GET"])
+def ranking():
+    """
+    Total de cada vendedor no período, com posição e participação no total:
+    ?from=AAAA-MM-DD&to=AAAA-MM-DD (padrão: mês corrente)
+    """
+    return _responder("ranking", lambda de, ate, vendedor, motor: analytics.ranking(de, ate, motor=motor))
+
+
+@analytics_bp.route("/weekly", methods=["GET"])
+def weekly():
+    """
+    Por semana ISO e vendedor: total, posição, participação, média móvel de
+    4 semanas e variação sobre a semana anterior.
+    ?from=AAAA-MM-DD&to=AAAA-MM-DD&vendedor=Nome (padrão: últimas 12 semanas)
+    """
+    return _responder("semana", lambda de, ate, vendedor, motor: analytics.periodos("semana", de, ate, vendedor, motor))
+
+
+@analytics_bp.route("/monthly", methods=["GET"])
+def monthly():
+    """
+    Por mês e vendedor: total, posição, participação, média móvel de 4
+    meses e variação sobre o mês anterior.
+    ?from=AAAA-MM-DD&to=AAAA-MM-DD&vendedor=Nome (padrão: últimos 12 meses)
+    """
+    return _responder("mes", lambda de, ate, vendedor, motor: analytics.periodos("mes", de, ate, vendedor, motor))
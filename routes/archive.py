@@ -1,19 +1,18 @@
-from flask import Blueprint, jsonify, current_app, request, render_template
+import base64
+import os
+import tempfile
+from flask import Blueprint, Response, jsonify, current_app, request, render_template, session, stream_with_context
 from datetime import datetime, timedelta, date
+from sqlalchemy import tuple_
 from models.user import db
 from models.archive import ResumoHistory, DailySales
-from routes.data import load_data, save_data
+from routes.data import load_data
+from daily_snapshot import save_daily_snapshot
+from formatting import format_brl
 from pytz import timezone  # ✅ Import necessário para timezone
 
 archive_bp = Blueprint('archive', __name__)
 
-# ✅ Filtro local para formato brasileiro
-def format_brl(value):
-    try:
-        return f"{float(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except (ValueError, TypeError):
-        return "0,00"
-
 # ---------------------------
 # Rota para arquivar semana (Resumo)
 # ---------------------------
@@ -22,7 +21,8 @@ def resumo_archive():
     """
     Fecha a semana (Resumo):
     - Salva totais no banco
-    - Zera a planilha
+    A planilha não é zerada: as vendas ficam em sales_facts e a grade
+    passa para a semana nova sozinha na segunda-feira.
     """
     secret = current_app.config.get('RESUMO_ARCHIVE_SECRET')
     header = request.headers.get('X-SECRET-KEY')
@@ -63,15 +63,6 @@ def resumo_archive():
     db.session.add(history)
     db.session.commit()
 
-    # zera planilha
-    for nome, valores in spreadsheet.items():
-        valores["monday"] = 0
-        valores["tuesday"] = 0
-        valores["wednesday"] = 0
-        valores["thursday"] = 0
-        valores["friday"] = 0
-    save_data(data)
-
     return jsonify({
         "status": "ok",
         "resumo": week_label,
@@ -90,43 +81,20 @@ def daily_save():
     data = load_data()
     spreadsheet = data.get("spreadsheetData", {})
     
-    # Mapeamento de dias da semana (0=segunda, 4=sexta)
-    dias_semana = ["monday", "tuesday", "wednesday", "thursday", "friday"]
-    nomes_dias = ["segunda", "terca", "quarta", "quinta", "sexta"]
-    
     # Pega o dia da semana atual (0=segunda, 1=terça, etc.)
     hoje = datetime.now(timezone("America/Sao_Paulo"))
-    dia_semana = hoje.weekday()  # 0=segunda, 1=terça, ..., 4=sexta
     today = hoje.date()
     
+    # Upsert em (vendedor, dia): chamar de novo no mesmo dia regrava em vez de duplicar
+    resultado = save_daily_snapshot(spreadsheet, today)
+    
     # Verifica se é fim de semana
-    if dia_semana >= 5:  # sábado=5, domingo=6
+    if resultado is None:  # sábado=5, domingo=6
         return jsonify({"status": "weekend", "message": "Fim de semana - não salva"}), 200
     
-    # Pega o campo correspondente ao dia atual
-    campo_dia = dias_semana[dia_semana]
-    nome_dia = nomes_dias[dia_semana]
-    
-    print(f"[INFO] Salvando daily-save para {nome_dia} ({today})")
+    nome_dia, total_dia = resultado
+    print(f"[INFO] daily-save gravado para {nome_dia} ({today})")
     
-    total_dia = 0
-    for nome, valores in spreadsheet.items():
-        valor_dia = float(valores.get(campo_dia, 0) or 0)
-        total_dia += valor_dia
-        
-        record = DailySales(
-            vendedor=nome,
-            dia=today,
-            segunda=valor_dia if nome_dia == "segunda" else 0,
-            terca=valor_dia if nome_dia == "terca" else 0,
-            quarta=valor_dia if nome_dia == "quarta" else 0,
-            quinta=valor_dia if nome_dia == "quinta" else 0,
-            sexta=valor_dia if nome_dia == "sexta" else 0,
-            total=valor_dia
-        )
-        db.session.add(record)
-
-    db.session.commit()
     return jsonify({
         "status": "ok", 
         "date": today.isoformat(),
@@ -140,10 +108,10 @@ def daily_save():
 @archive_bp.route('/api/daily-history', methods=['GET'])
 def get_daily_history():
     """
-    Retorna o histórico diário salvo no banco
+    Retorna o histórico diário salvo no banco, do mais recente ao mais antigo,
+    em páginas: ?limit=100&cursor=<next_cursor>&from=AAAA-MM-DD&to=AAAA-MM-DD&vendedor=Nome
     """
-    records = DailySales.query.order_by(DailySales.created_at.desc()).all()
-    return jsonify([r.to_dict() for r in records])
+    return _history_response(DailySales)
 
 # ---------------------------
 # Página HTML com histórico (Resumo)
@@ -158,5 +126,169 @@ def resumo_page():
 # ---------------------------
 @archive_bp.route('/api/resumo-history', methods=['GET'])
 def get_resumo_history():
-    history = ResumoHistory.query.order_by(ResumoHistory.created_at.desc()).all()
-    return jsonify([h.to_dict() for h in history])
\ No newline at end of file
+    """
+    Resumos semanais, do mais recente ao mais antigo, em páginas:
+    ?limit=100&cursor=<next_cursor>&from=AAAA-MM-DD&to=AAAA-MM-DD
+    """
+    return _history_response(ResumoHistory)
+
+# ---------------------------
+# Exportação em massa (CSV / NDJSON / Parquet) em streaming
+# ---------------------------
+@archive_bp.route('/api/export', methods=['GET'])
+def export_history():
+    """
+    ?dataset=daily|resumo&format=csv|ndjson|parquet&from=AAAA-MM-DD&to=AAAA-MM-DD&vendedor=Nome
+    Só para o admin, como a importação.
+    """
+    from sales_export import MIMETYPES, export  # Importa dentro da rota para evitar problemas de ciclo
+
+    if not session.get('is_admin'):
+        return jsonify({"error": "Acesso negado"}), 403
+    dataset = request.args.get("dataset", "daily")
+    fmt = request.args.get("format", "csv")
+    try:
+        chunks = export(
+            dataset, fmt,
+            de=parse_date_arg(request.args.get("from"), "from"),
+            ate=parse_date_arg(request.args.get("to"), "to"),
+            vendedor=request.args.get("vendedor"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filename = f"{dataset}_{date.today().isoformat()}.{fmt}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=MIMETYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# ---------------------------
+# Importação em massa (CSV / NDJSON / JSON) com retomada
+# ---------------------------
+@archive_bp.route('/api/import', methods=['POST'])
+def import_history():
+    """
+    multipart/form-data: file=<arquivo>, dataset=daily|resumo, format=csv|ndjson|json,
+    week_start=AAAA-MM-DD (só para arquivos de planilha), force=1.
+    Reenviar o mesmo arquivo após uma falha continua do último lote gravado.
+    """
+    from sales_import import import_file  # Importa dentro da rota para evitar problemas de ciclo
+
+    if not session.get('is_admin'):
+        return jsonify({"error": "Acesso negado"}), 403
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "Envie o arquivo no campo 'file'"}), 400
+
+    # Vai para disco em blocos: o arquivo é lido duas vezes (hash + importação)
+    fd, path = tempfile.mkstemp(prefix="import_", suffix=os.path.splitext(upload.filename)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            upload.save(f)
+        report = import_file(
+            path,
+            request.form.get("dataset", "daily"),
+            fmt=request.form.get("format") or None,
+            week_start=parse_date_arg(request.form.get("week_start"), "week_start"),
+            filename=upload.filename,
+            force=request.form.get("force") in ("1", "true"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Erro na importação: {e}")
+        return jsonify({"error": "Falha na importação; reenvie o arquivo para continuar"}), 500
+    finally:
+        os.remove(path)
+
+    return jsonify(report)
+
+# ---------------------------
+# Paginação por cursor (created_at, id) dos históricos
+# ---------------------------
+HISTORY_DEFAULT_LIMIT = 100
+HISTORY_MAX_LIMIT = 1000
+
+def parse_date_arg(value, nome):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Parâmetro '{nome}' deve estar no formato AAAA-MM-DD")
+
+def filtered_history_query(model, de=None, ate=None, vendedor=None):
+    """
+    Consulta de DailySales/ResumoHistory com os filtros aplicados no SQL:
+    período (dia, ou semana para ResumoHistory) e vendedor (só DailySales).
+    """
+    query = model.query
+    if model is DailySales:
+        if de:
+            query = query.filter(DailySales.dia >= de)
+        if ate:
+            query = query.filter(DailySales.dia <= ate)
+        if vendedor:
+            query = query.filter(DailySales.vendedor == vendedor)
+    else:
+        if vendedor:
+            raise ValueError("Filtro 'vendedor' não é suportado para resumos semanais")
+        if de:
+            query = query.filter(ResumoHistory.started_at >= de)
+        if ate:
+            query = query.filter(ResumoHistory.ended_at <= ate)
+    return query
+
+def encode_cursor(record):
+    raw = f"{record.created_at.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, record_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+
+def _history_response(model):
+    try:
+        limit = int(request.args.get("limit", HISTORY_DEFAULT_LIMIT))
+        if not 1 <= limit <= HISTORY_MAX_LIMIT:
+            raise ValueError(f"'limit' deve estar entre 1 e {HISTORY_MAX_LIMIT}")
+        query = filtered_history_query(
+            model,
+            de=parse_date_arg(request.args.get("from"), "from"),
+            ate=parse_date_arg(request.args.get("to"), "to"),
+            vendedor=request.args.get("vendedor"),
+        )
+        cursor = request.args.get("cursor")
+        if cursor:
+            # Keyset: continua logo depois do último item da página anterior
+            query = query.filter(tuple_(model.created_at, model.id) < decode_cursor(cursor))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = (
+        query.order_by(model.created_at.desc(), model.id.desc())
+        .limit(limit + 1)
+        .yield_per(200)
+    )
+    dumps = current_app.json.dumps
+
+    def generate():
+        # {"items": [...], "next_cursor": "..." | null}, escrito item a item
+        yield '{"items":['
+        count, last, has_more = 0, None, False
+        for record in query:
+            if count == limit:
+                has_more = True
+                break
+            yield ("," if count else "") + dumps(record.to_dict())
+            count, last = count + 1, record
+        next_cursor = encode_cursor(last) if has_more else None
+        yield '],"next_cursor":' + dumps(next_cursor) + "}"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
\ No newline at end of file
@@ -1,70 +1,250 @@
 # routes/data.py (versão final segura)
 
-from flask import Blueprint, jsonify, request, session
+import json
+
+from flask import Blueprint, Response, jsonify, request, session
 from flask_cors import cross_origin
-from models.sales import Sale
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from models.sales import SaleFact, current_week_sales
 from models.user import db
+from grid_cache import conditional_response, grid_cache, make_etag
+from render_cache import data_versions
+from roster import roster
+from sales_facts import WEEKDAYS, day_date, upsert_facts, week_start
+import live_updates
 
 data_bp = Blueprint('data', __name__)
 
-EMPLOYEES = [
-    {"name": "Anderson", "password": "123"},
-    {"name": "Vitoria", "password": "123"},
-    {"name": "Jemima", "password": "123"},
-    {"name": "Maiany", "password": "123"},
-    {"name": "Fernanda", "password": "123"},
-    {"name": "Nadia", "password": "123"},
-    {"name": "Giovana", "password": "123"}
-]
-
 def load_data_from_db():
+    # Uma única consulta à view da semana corrente (current_week_sales);
+    # o pivô vendedor x dia para o formato da planilha é feito em memória.
+    rows = db.session.execute(
+        select(current_week_sales.c.seller_id, current_week_sales.c.day,
+               current_week_sales.c.value, current_week_sales.c.version)
+    )
+    celulas = {(row.seller_id, row.day): row for row in rows}
+
+    # Vendedores do índice em memória (roster): não custa consulta
+    records = roster.records()
     spreadsheetData = {}
-    for emp in EMPLOYEES:
-        sales = Sale.query.filter_by(employee_name=emp["name"]).all()
-        day_values = {sale.day: sale.value for sale in sales}
-        spreadsheetData[emp["name"]] = {
-            "monday": day_values.get("monday", 0),
-            "tuesday": day_values.get("tuesday", 0),
-            "wednesday": day_values.get("wednesday", 0),
-            "thursday": day_values.get("thursday", 0),
-            "friday": day_values.get("friday", 0),
+    versions = {}
+    for record in records:
+        cells = [celulas.get((record.id, day)) for day in WEEKDAYS]
+        spreadsheetData[record.name] = {
+            day: (cell.value or 0) if cell else 0 for day, cell in zip(WEEKDAYS, cells)
+        }
+        # versão 0 = célula ainda não existe no banco
+        versions[record.name] = {
+            day: (cell.version or 0) if cell else 0 for day, cell in zip(WEEKDAYS, cells)
         }
     return {
-        "employees": EMPLOYEES,
-        "spreadsheetData": spreadsheetData
+        # Só os nomes: senhas ficam no banco, como hash
+        "employees": [{"name": record.name} for record in records],
+        "spreadsheetData": spreadsheetData,
+        "versions": versions
     }
 
-def save_data_to_db(data):
+def _fact_key(seller, day, segunda):
+    # (vendedor, dia da semana) da grade -> chave de sales_facts
+    return {"seller_id": roster.get(seller).id, "sale_date": day_date(day, segunda)}
+
+def _rows_from_spreadsheet(data):
+    segunda = week_start()
+    return [
+        dict(_fact_key(emp_name, day, segunda), value=value)
+        for emp_name, days in data["spreadsheetData"].items()
+        # vendedor removido pelo admin enquanto a planilha estava aberta
+        if roster.get(emp_name) is not None
+        for day, value in days.items()
+        if day in WEEKDAYS
+    ]
+
+def save_data_to_db(data, employees=None):
+    """
+    Grava a planilha inteira. Com `employees` (admin), aplica antes
+    roster.sync na mesma transação: ou grava tudo ou nada. ValueError
+    (lista de vendedores inválida) sobe depois do rollback.
+    """
+    roster_changed = False
     try:
-        for emp_name, days in data["spreadsheetData"].items():
-            for day, value in days.items():
-                if day in ["monday", "tuesday", "wednesday", "thursday", "friday"]:
-                    sale = Sale.query.filter_by(employee_name=emp_name, day=day).first()
-                    if sale:
-                        sale.value = value
-                    else:
-                        sale = Sale(employee_name=emp_name, day=day, value=value)
-                        db.session.add(sale)
+        if employees is not None:
+            roster_changed = roster.sync(employees)
+        upsert_facts(_rows_from_spreadsheet(data))
         db.session.commit()
         return True
+    except ValueError:
+        db.session.rollback()
+        roster_changed = False
+        raise
     except Exception as e:
         db.session.rollback()
+        roster_changed = False
         print(f"Erro ao salvar: {e}")
         return False
+    finally:
+        if roster_changed:
+            roster.changed()
+        _grid_changed()
+
+def _grid_changed():
+    # Descarta o snapshot em cache e acorda as telas conectadas em /tv/stream
+    grid_cache.invalidate()
+    live_updates.notify()
+
+def grid_version():
+    """
+    ETag da grade sem montá-la: quantas células e a soma das versões da
+    semana corrente (toda gravação cria uma célula ou incrementa a versão),
+    a segunda-feira e o contador do cadastro de vendedores (data_versions).
+    Uma consulta escalar, com o mesmo resultado em todos os workers.
+    """
+    cadastro = select(data_versions.c.version).where(data_versions.c.name == "roster").scalar_subquery()
+    celulas, versoes, vendedores = db.session.execute(
+        select(func.count(), func.coalesce(func.sum(current_week_sales.c.version), 0), cadastro)
+        .select_from(current_week_sales)
+    ).one()
+    return make_etag(f"{week_start()}|{celulas}|{versoes}|{vendedores or 0}")
+
+def grid_etag():
+    """ETag atual: do snapshot em cache ou de grid_version()."""
+    snapshot = grid_cache.get()
+    return snapshot.etag if snapshot is not None else grid_version()
 
 # 🔑 FUNÇÕES PÚBLICAS PARA O archive.py
+def load_data_snapshot(etag=None):
+    """
+    Planilha serializada + ETag, servida do cache e recarregada do banco só
+    se faltar. `etag`: versão já lida com grid_etag(), para não consultar de novo.
+    """
+    return grid_cache.get_or_load(load_data_from_db, lambda: etag or grid_version())
+
 def load_data():
-    return load_data_from_db()
+    # Cópia independente: archive/scheduler alteram o dicionário retornado
+    return json.loads(load_data_snapshot().body)
 
 def save_data(data):
     return save_data_to_db(data)
 
+def reset_data():
+    """
+    Virada da semana (job das 00:01 de segunda). Nada é zerado: a view
+    current_week_sales já mostra a semana nova; só descarta a grade em cache.
+    """
+    _grid_changed()
+    return True
+
+class VersionConflict(Exception):
+    def __init__(self, cells):
+        super().__init__("Conflito de versão")
+        self.cells = cells
+
+def _current_cells(keys):
+    """Valor e versão atuais de um conjunto de (vendedor, dia), numa consulta."""
+    segunda = week_start()
+    chaves = {(seller, day): _fact_key(seller, day, segunda) for seller, day in keys}
+    found = {
+        (s.seller_id, s.sale_date): s
+        for s in SaleFact.query.filter(
+            SaleFact.seller_id.in_({k["seller_id"] for k in chaves.values()}),
+            SaleFact.sale_date.in_({k["sale_date"] for k in chaves.values()}),
+        )
+    }
+    result = []
+    for seller, day in keys:
+        key = chaves[(seller, day)]
+        sale = found.get((key["seller_id"], key["sale_date"]))
+        result.append({
+            "seller": seller,
+            "day": day,
+            "value": sale.value if sale else 0,
+            "version": sale.version if sale else 0,
+        })
+    return result
+
+def _apply_cell(cell, segunda):
+    key = _fact_key(cell["seller"], cell["day"], segunda)
+    value, version = cell["value"], cell.get("version")
+    if version is None:
+        # Sem token: última escrita vence
+        upsert_facts([dict(key, value=value)])
+        return True
+    if version == 0:
+        # O cliente nunca viu essa célula: só insere se ainda não existir
+        if db.session.get(SaleFact, (key["seller_id"], key["sale_date"])) is not None:
+            return False
+        db.session.add(SaleFact(**key, value=value, version=1))
+        db.session.flush()
+        return True
+    result = db.session.execute(
+        update(SaleFact)
+        .where(SaleFact.seller_id == key["seller_id"], SaleFact.sale_date == key["sale_date"],
+               SaleFact.version == version)
+        .values(value=value, version=SaleFact.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def patch_data_in_db(cells):
+    """
+    Aplica apenas as células alteradas, com concorrência otimista:
+    se alguma versão enviada não bater com a do banco nada é gravado
+    e VersionConflict traz o estado atual dessas células.
+    Retorna valor/versão resultantes das células gravadas.
+    """
+    try:
+        segunda = week_start()
+        conflicts = [(c["seller"], c["day"]) for c in cells if not _apply_cell(c, segunda)]
+        if conflicts:
+            db.session.rollback()
+            raise VersionConflict(_current_cells(conflicts))
+        db.session.commit()
+    except VersionConflict:
+        raise
+    except IntegrityError:
+        # outra requisição criou a mesma célula nova ao mesmo tempo
+        db.session.rollback()
+        raise VersionConflict(_current_cells([(c["seller"], c["day"]) for c in cells]))
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        _grid_changed()
+    return _current_cells([(c["seller"], c["day"]) for c in cells])
+
+def _parse_cells(payload):
+    cells = payload.get("cells") if isinstance(payload, dict) else None
+    if not isinstance(cells, list) or not cells:
+        raise ValueError("Informe ao menos uma célula em 'cells'")
+    parsed = {}
+    for cell in cells:
+        if not isinstance(cell, dict):
+            raise ValueError("Célula inválida")
+        seller, day = cell.get("seller"), cell.get("day")
+        if not isinstance(seller, str) or not seller or day not in WEEKDAYS:
+            raise ValueError("Vendedor ou dia inválido")
+        try:
+            value = float(cell.get("value") or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"Valor inválido para {seller}/{day}")
+        version = cell.get("version")
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool) or version < 0):
+            raise ValueError(f"Versão inválida para {seller}/{day}")
+        # a última ocorrência da mesma célula prevalece
+        parsed[(seller, day)] = {"seller": seller, "day": day, "value": value, "version": version}
+    return list(parsed.values())
+
 # Rotas da API
 @data_bp.route('/data', methods=['GET'])
 @cross_origin()
 def get_data():
     try:
-        return jsonify(load_data_from_db()), 200
+        # 304 só com a versão: a grade é montada apenas se o cliente está desatualizado
+        etag = grid_etag()
+        return conditional_response(
+            etag,
+            lambda: Response(load_data_snapshot(etag).body, status=200, mimetype="application/json"),
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -77,9 +257,53 @@ def save_data_endpoint():
         data = request.get_json()
         if not data or 'employees' not in data or 'spreadsheetData' not in data:
             return jsonify({"error": "Dados inválidos"}), 400
-        if save_data_to_db(data):
-            return jsonify({"message": "Dados salvos"}), 200
+        # Admin: vendedores novos e ordem da grade; remover é DELETE /api/sellers/<nome>
+        employees = data['employees'] if session.get('is_admin') else None
+        try:
+            saved = save_data_to_db(data, employees)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if saved:
+            # O POST cria/atualiza todas as células: o cliente precisa das versões
+            # novas, senão o próximo PATCH (versão 0 ou velha) dá 409
+            grade = load_data()
+            return jsonify({
+                "message": "Dados salvos",
+                "spreadsheetData": grade["spreadsheetData"],
+                "versions": grade["versions"],
+            }), 200
         else:
             return jsonify({"error": "Erro ao salvar"}), 500
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@data_bp.route('/data', methods=['PATCH'])
+@cross_origin()
+def patch_data_endpoint():
+    """
+    Salva só as células editadas:
+    {"cells": [{"seller": "Anderson", "day": "monday", "value": 150.0, "version": 3}]}
+    `version` é a versão lida no GET /api/data (0 = célula nova); se omitida,
+    a célula é gravada sem checagem. Responde 409 se alguma versão estiver velha.
+    """
+    if 'user' not in session:
+        return jsonify({"error": "Não autenticado"}), 401
+    try:
+        cells = _parse_cells(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not session.get('is_admin') and any(c["seller"] != session['user'] for c in cells):
+        return jsonify({"error": "Sem permissão para editar outro vendedor"}), 403
+    unknown = sorted({c["seller"] for c in cells if roster.get(c["seller"]) is None})
+    if unknown:
+        return jsonify({"error": f"Vendedor não cadastrado: {', '.join(unknown)}"}), 400
+
+    try:
+        saved = patch_data_in_db(cells)
+    except VersionConflict as e:
+        return jsonify({"error": "Conflito de versão", "conflicts": e.cells}), 409
+    except Exception as e:
+        print(f"Erro ao salvar alterações: {e}")
+        return jsonify({"error": "Erro ao salvar"}), 500
+    return jsonify({"message": "Dados salvos", "cells": saved}), 200
@@ -1,72 +1,131 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify, make_response
 from datetime import datetime, timedelta, date
-from models.archive import DailySales
-from sqlalchemy import extract
+from models.archive import DailySales, MonthlySalesRollup, WeeklySalesRollup
+from models.user import db
+from sqlalchemy import func
 from calendar import monthrange
-from collections import defaultdict
+from grid_cache import conditional_response
+from render_cache import render_cache, template_version
+from formatting import format_brl_many
 
 resumo_bp = Blueprint("resumo", __name__)
 
+DIAS_LABELS = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"]
+NOMES_CAMPOS = ["segunda", "terca", "quarta", "quinta", "sexta"]
+
+
+def _limites_mes(ano, mes):
+    primeiro_dia = date(ano, mes, 1)
+    ultimo_dia = date(ano, mes, monthrange(ano, mes)[1])
+    return primeiro_dia, ultimo_dia
+
+
+def _totais_por_dia(inicio, fim):
+    """
+    Uma consulta agrupada por dia no intervalo [inicio, fim]:
+    {dia: {"total": ..., "segunda": ..., ..., "sexta": ...}}
+    """
+    colunas = [func.coalesce(func.sum(DailySales.total), 0).label("total")]
+    colunas += [
+        func.coalesce(func.sum(getattr(DailySales, campo)), 0).label(campo)
+        for campo in NOMES_CAMPOS
+    ]
+    rows = (
+        db.session.query(DailySales.dia, *colunas)
+        .filter(DailySales.dia >= inicio, DailySales.dia <= fim)
+        .group_by(DailySales.dia)
+        .all()
+    )
+    return {row.dia: row._asdict() for row in rows}
+
+
+def _totais_semanais(ano, mes, por_dia):
+    """Soma os totais diários do mês em semanas (linhas do calendário)."""
+    primeiro_dia, ultimo_dia = _limites_mes(ano, mes)
+    dias_no_mes = (ultimo_dia - primeiro_dia).days + 1
+    num_semanas = ((dias_no_mes + primeiro_dia.weekday()) // 7) + 1
+
+    totais = [0 for _ in range(num_semanas)]
+    for dia, valores in por_dia.items():
+        if not (primeiro_dia <= dia <= ultimo_dia):
+            continue
+        semana_index = ((dia.day + primeiro_dia.weekday() - 1) // 7)
+        if 0 <= semana_index < num_semanas:
+            totais[semana_index] += valores["total"]
+    return totais, num_semanas
+
+
+def _historico_mensal():
+    """Total de cada mês com vendas, lido do rollup mensal: {"AAAA-MM": total}."""
+    rows = (
+        db.session.query(
+            MonthlySalesRollup.ano,
+            MonthlySalesRollup.mes,
+            func.sum(MonthlySalesRollup.total).label("total"),
+        )
+        .group_by(MonthlySalesRollup.ano, MonthlySalesRollup.mes)
+        .order_by(MonthlySalesRollup.ano, MonthlySalesRollup.mes)
+        .all()
+    )
+    return {f"{r.ano}-{r.mes:02d}": r.total or 0 for r in rows}
+
+
+def _total_semana_iso(dia):
+    iso_ano, iso_semana, _ = dia.isocalendar()
+    total = (
+        db.session.query(func.sum(WeeklySalesRollup.total))
+        .filter_by(iso_ano=iso_ano, iso_semana=iso_semana)
+        .scalar()
+    )
+    return total or 0
+
+
 @resumo_bp.route("/resumo")
 def resumo_page():
     hoje = datetime.utcnow().date()
+    # Página depende de daily_sales/rollups, do dia e do template: mesma
+    # combinação, mesmo HTML (e 304 para quem já tem essa versão)
+    etag = f"resumo-{render_cache.version('history')}-{hoje.isoformat()}-{template_version('resumo.html')}"
+    return conditional_response(etag, lambda: make_response(
+        render_cache.get_or_render(etag, lambda: _render_resumo(hoje))
+    ))
+
+
+def _render_resumo(hoje):
     ano = hoje.year
     mes = hoje.month
 
-    # --- Totais do dia ---
-    registros_hoje = DailySales.query.filter_by(dia=hoje).all()
-    total_dia = sum(r.total for r in registros_hoje)
-
-    # --- Totais da semana (segunda a sexta) ---
     inicio_semana = hoje - timedelta(days=hoje.weekday())
     fim_semana = inicio_semana + timedelta(days=4)
-    registros_semana = DailySales.query.filter(
-        DailySales.dia >= inicio_semana,
-        DailySales.dia <= fim_semana
-    ).all()
-    total_semana = sum(r.total for r in registros_semana)
+    primeiro_dia, ultimo_dia = _limites_mes(ano, mes)
+
+    # --- Uma consulta cobre os dias da semana e do mês atuais ---
+    por_dia = _totais_por_dia(min(inicio_semana, primeiro_dia), max(fim_semana, ultimo_dia))
+
+    # --- Totais do dia ---
+    total_dia = por_dia.get(hoje, {}).get("total", 0)
+
+    # --- Totais da semana (rollup semanal ISO) ---
+    total_semana = _total_semana_iso(hoje)
+
+    # --- Histórico mensal completo para o <select> (rollup mensal) ---
+    historico_mensal = _historico_mensal()
 
     # --- Totais do mês atual ---
-    registros_mes = DailySales.query.filter(
-        extract("month", DailySales.dia) == mes,
-        extract("year", DailySales.dia) == ano
-    ).all()
-    total_mes = sum(r.total for r in registros_mes)
+    mes_atual = f"{ano}-{mes:02d}"
+    total_mes = historico_mensal.get(mes_atual, 0)
 
     # --- Histórico diário (segunda a sexta) ---
-    dias_labels = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"]
-    nomes_campos = ["segunda", "terca", "quarta", "quinta", "sexta"]
-    
+    # Soma apenas o campo correspondente ao dia
     historico_diario = {}
-    for i, label in enumerate(dias_labels):
+    for i, label in enumerate(DIAS_LABELS):
         dia_atual = inicio_semana + timedelta(days=i)
-        registros_dia = DailySales.query.filter_by(dia=dia_atual).all()
-        
-        # Soma apenas o campo correspondente ao dia
-        valor_dia = sum(getattr(r, nomes_campos[i]) for r in registros_dia)
-        historico_diario[label] = valor_dia
+        historico_diario[label] = por_dia.get(dia_atual, {}).get(NOMES_CAMPOS[i], 0)
 
     # --- Totais semanais do mês atual ---
-    primeiro_dia = date(ano, mes, 1)
-    ultimo_dia = date(ano, mes, monthrange(ano, mes)[1])
-    dias_no_mes = (ultimo_dia - primeiro_dia).days + 1
-    num_semanas = ((dias_no_mes + primeiro_dia.weekday()) // 7) + 1
-
-    totais_mes = [0 for _ in range(num_semanas)]
-    for r in registros_mes:  # ✅ Agora 'registros_mes' já está definido
-        semana_index = ((r.dia.day + primeiro_dia.weekday() - 1) // 7)
-        if 0 <= semana_index < num_semanas:
-            totais_mes[semana_index] += r.total
+    totais_mes, num_semanas = _totais_semanais(ano, mes, por_dia)
 
     mes_nome = hoje.strftime("%B").capitalize()
-    mes_atual = f"{ano}-{mes:02d}"
-
-    # --- Histórico mensal completo para o <select> ---
-    historico_mensal = defaultdict(float)
-    for r in DailySales.query.all():
-        chave = f"{r.dia.year}-{r.dia.month:02d}"
-        historico_mensal[chave] += r.total
-    historico_mensal = dict(sorted(historico_mensal.items()))
 
     # --- Lista de anos e meses ---
     anos_disponiveis = list(range(2025, 2031))
@@ -87,10 +146,23 @@ def resumo_page():
         total_qui=historico_diario.get("Quinta", 0),
         total_sex=historico_diario.get("Sexta", 0),
         totais_mes=totais_mes,
+        totais_mes_brl=format_brl_many(totais_mes),
         num_semanas=num_semanas,
         mes_nome=mes_nome,
         mes_atual=mes_atual,
         historico_mensal=historico_mensal,
         anos_disponiveis=anos_disponiveis,
         meses_nomes=meses_nomes
-    )
\ No newline at end of file
+    )
+
+
+@resumo_bp.route("/api/semanas/<int:ano>/<int:mes>")
+def semanas_do_mes(ano, mes):
+    """Totais semanais de um mês (usado pelo seletor de mês do /resumo)."""
+    if not 1 <= mes <= 12:
+        return jsonify({"error": "Mês inválido"}), 400
+    if not 1 <= ano <= 9999:
+        return jsonify({"error": "Ano inválido"}), 400
+    primeiro_dia, ultimo_dia = _limites_mes(ano, mes)
+    totais, _ = _totais_semanais(ano, mes, _totais_por_dia(primeiro_dia, ultimo_dia))
+    return jsonify(totais)
\ No newline at end of file
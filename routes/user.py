@@ -1,53 +1,9 @@
 from flask import Blueprint, jsonify, request, session
 from models.user import User, db
-import json
-import os
+from roster import roster
 
 user_bp = Blueprint('user', __name__)
 
-# Função para carregar dados dos funcionários do arquivo JSON
-def load_employees_data():
-    DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "database", "planilha_data.json")
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("employees", [])
-        except (json.JSONDecodeError, IOError):
-            pass
-    
-    # Dados padrão se o arquivo não existir
-    return [
-        {"name": "Anderson", "password": "123"},
-        {"name": "Vitoria", "password": "123"},
-        {"name": "Jemima", "password": "123"},
-        {"name": "Maiany", "password": "123"},
-        {"name": "Fernanda", "password": "123"},
-        {"name": "Nadia", "password": "123"},
-        {"name": "Giovana", "password": "123"}
-    ]
-
-# Função para salvar dados dos funcionários no arquivo JSON
-def save_employees_data(employees):
-    DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "database", "planilha_data.json")
-    try:
-        # Carregar dados existentes
-        existing_data = {}
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-        
-        # Atualizar apenas a lista de funcionários
-        existing_data["employees"] = employees
-        
-        # Salvar de volta
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        print(f"Erro ao salvar dados dos funcionários: {e}")
-        return False
-
 @user_bp.route('/login', methods=['POST'])
 def login():
     data = request.json
@@ -67,16 +23,15 @@ def login():
             "is_admin": True
         })
     
-    # Verificar funcionários
-    employees = load_employees_data()
-    employee = next((emp for emp in employees if emp["name"].lower() == username.lower()), None)
+    # Verificar funcionários (índice em memória, senha em hash)
+    employee = roster.authenticate(username, password)
     
-    if employee and employee["password"] == password:
-        session['user'] = employee["name"]
+    if employee:
+        session['user'] = employee.name
         session['is_admin'] = False
         return jsonify({
             "success": True, 
-            "user": employee["name"], 
+            "user": employee.name, 
             "is_admin": False
         })
     
@@ -110,20 +65,35 @@ def change_employee_password():
     if not employee_name or not new_password:
         return jsonify({"success": False, "message": "Nome do funcionário e nova senha são obrigatórios"}), 400
     
-    employees = load_employees_data()
-    employee = next((emp for emp in employees if emp["name"] == employee_name), None)
+    # Atualizar senha (só a linha do vendedor)
+    try:
+        found = roster.set_password(employee_name, new_password)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erro ao salvar senha do funcionário: {e}")
+        return jsonify({"success": False, "message": "Erro ao salvar alterações"}), 500
     
-    if not employee:
+    if not found:
         return jsonify({"success": False, "message": "Funcionário não encontrado"}), 404
-    
-    # Atualizar senha
-    employee["password"] = new_password
-    
-    if save_employees_data(employees):
-        return jsonify({"success": True, "message": "Senha alterada com sucesso"})
-    else:
+    return jsonify({"success": True, "message": "Senha alterada com sucesso"})
+
+@user_bp.route('/sellers/<name>', methods=['DELETE'])
+def delete_seller(name):
+    # Desativa: o histórico de vendas continua ligado ao vendedor
+    if not session.get('is_admin'):
+        return jsonify({"success": False, "message": "Acesso negado"}), 403
+
+    try:
+        found = roster.deactivate(name)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erro ao remover funcionário: {e}")
         return jsonify({"success": False, "message": "Erro ao salvar alterações"}), 500
 
+    if not found:
+        return jsonify({"success": False, "message": "Funcionário não encontrado"}), 404
+    return jsonify({"success": True, "message": "Funcionário removido"})
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
     users = User.query.all()
@@ -0,0 +1,213 @@
+"""
+Exportação em massa do histórico (daily_sales / resumo_history).
+
+As linhas vêm de um cursor do lado do servidor (yield_per) e são escritas
+em blocos de EXPORT_CHUNK linhas, então a memória usada não depende do
+período exportado. Formatos: csv, ndjson e parquet (este último exige o
+pacote opcional pyarrow).
+
+Usado por GET /archive/api/export e pelo comando `flask export`.
+"""
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Date, DateTime, Float, Integer
+
+from models.archive import DailySales, ResumoHistory
+from routes.archive import filtered_history_query, parse_date_arg
+
+EXPORT_CHUNK = 1000
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+
+DATASETS = {
+    "daily": (
+        DailySales,
+        ["id", "vendedor", "dia", "segunda", "terca", "quarta", "quinta", "sexta", "total", "created_at"],
+        ("dia", "vendedor"),
+    ),
+    "resumo": (
+        ResumoHistory,
+        ["id", "week_label", "started_at", "ended_at", "total", "breakdown", "created_at"],
+        ("started_at", "id"),
+    ),
+}
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def iter_rows(dataset, de=None, ate=None, vendedor=None):
+    """Tuplas com as colunas do dataset, lidas em blocos do banco."""
+    if dataset not in DATASETS:
+        raise ExportError(f"Dataset inválido: {dataset} (use {', '.join(DATASETS)})")
+    model, columns, ordem = DATASETS[dataset]
+    query = (
+        filtered_history_query(model, de=de, ate=ate, vendedor=vendedor)
+        .with_entities(*[getattr(model, c) for c in columns])
+        .order_by(*[getattr(model, c) for c in ordem])
+        .yield_per(EXPORT_CHUNK)  # stream_results: cursor do lado do servidor no PostgreSQL
+    )
+    return columns, query
+
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= EXPORT_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _chunks(rows):
+        writer.writerows(
+            [json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else _plain(v) for v in row]
+            for row in chunk
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_ndjson(columns, rows):
+    for chunk in _chunks(rows):
+        yield "".join(
+            json.dumps({c: _plain(v) for c, v in zip(columns, row)}, ensure_ascii=False) + "\n"
+            for row in chunk
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino do ParquetWriter: acumula os bytes de um bloco e mantém a posição total."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_type(pa, tipo):
+    # DateTime antes de Date; JSON e textos viram string (JSON já serializado)
+    if isinstance(tipo, Integer):
+        return pa.int64()
+    if isinstance(tipo, Float):
+        return pa.float64()
+    if isinstance(tipo, DateTime):
+        return pa.timestamp("us")
+    if isinstance(tipo, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def write_parquet(columns, rows, types):
+    """types: tipos SQLAlchemy das colunas; o esquema não depende do primeiro bloco (coluna toda nula nele)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Exportação parquet requer o pacote 'pyarrow'")
+
+    schema = pa.schema([(c, _arrow_type(pa, t)) for c, t in zip(columns, types)])
+    sink = _ChunkSink()
+    # Sem linhas, o arquivo sai válido só com o esquema
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in _chunks(rows):
+        data = {
+            c: [json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else v for v in values]
+            for c, values in zip(columns, zip(*chunk))
+        }
+        writer.write_table(pa.table(data, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "parquet": write_parquet}
+
+
+def export(dataset, fmt, de=None, ate=None, vendedor=None):
+    """Gerador de blocos (str ou bytes) com o dataset no formato pedido."""
+    if fmt not in WRITERS:
+        raise ExportError(f"Formato inválido: {fmt} (use {', '.join(EXPORT_FORMATS)})")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError("Exportação parquet requer o pacote 'pyarrow'")
+    columns, rows = iter_rows(dataset, de=de, ate=ate, vendedor=vendedor)
+    if fmt == "parquet":
+        model = DATASETS[dataset][0]
+        return write_parquet(columns, rows, [getattr(model, c).type for c in columns])
+    return WRITERS[fmt](columns, rows)
+
+
+@click.command("export")
+@with_appcontext
+@click.argument("dataset", type=click.Choice(sorted(DATASETS)))
+@click.option("--format", "fmt", type=click.Choice(EXPORT_FORMATS), default="csv", show_default=True)
+@click.option("--from", "de", help="Data inicial (AAAA-MM-DD)")
+@click.option("--to", "ate", help="Data final (AAAA-MM-DD)")
+@click.option("--vendedor", help="Filtra por vendedor (só daily)")
+@click.option("--output", "-o", type=click.Path(dir_okay=False), help="Arquivo de saída (padrão: stdout)")
+def export_command(dataset, fmt, de, ate, vendedor, output):
+    """Exporta o histórico de vendas em CSV, NDJSON ou Parquet."""
+    try:
+        chunks = export(
+            dataset, fmt,
+            de=parse_date_arg(de, "from"),
+            ate=parse_date_arg(ate, "to"),
+            vendedor=vendedor,
+        )
+        binary = fmt == "parquet"
+        if output:
+            with open(output, "wb" if binary else "w", encoding=None if binary else "utf-8", newline=None if binary else "") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            stream = sys.stdout.buffer if binary else sys.stdout
+            for chunk in chunks:
+                stream.write(chunk)
+            stream.flush()
+    except ValueError as e:
+        raise click.UsageError(str(e))
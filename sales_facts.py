@@ -0,0 +1,240 @@
+"""
+Fatos de venda por (vendedor, data) e a grade da semana corrente.
+
+A antiga tabela `sales` guardava o dia como texto ('monday'..'friday') e
+era zerada toda segunda; o histórico só sobrevivia nos snapshots de
+daily_sales. Agora cada célula da grade é uma linha de sales_facts com a
+data de verdade:
+
+- a grade (GET /api/data, /tv) lê a view current_week_sales, que filtra a
+  semana corrente no próprio banco; na virada da semana ela passa a mostrar
+  a semana nova sem que nada seja apagado
+- no PostgreSQL a tabela é particionada por mês. Não há partição default:
+  ensure_partitions cria as dos meses que faltam (migração 0008 e o job
+  mensal "particoes" do scheduler, sempre MONTHS_AHEAD meses à frente)
+- no SQLite a mesma tabela e a mesma view, sem particionamento
+
+import_legacy() preenche a tabela nova a partir de daily_sales (semanas
+anteriores) e de `sales` (semana corrente); `sales` fica no banco, sem uso.
+Depois da migração, daily_sales e sales_facts andam juntos:
+- a grade grava em sales_facts (upsert_facts) e o snapshot diário copia
+  para daily_sales os valores lidos da própria grade
+- a importação de histórico (sales_import) grava cada registro diário nos
+  dois, na mesma transação (record_history)
+"""
+from datetime import date, datetime, timedelta
+
+from pytz import timezone
+from sqlalchemy import case, inspect, select, text
+
+from models.archive import DailySales
+from models.sales import SaleFact
+from models.seller import Seller
+from models.upsert import supports_upsert, upsert_rows
+from models.user import db
+
+TZ = timezone("America/Sao_Paulo")
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+# Partições criadas à frente do mês corrente
+MONTHS_AHEAD = 12
+
+# A semana vai de segunda a sexta no fuso de São Paulo (UTC-3, sem horário
+# de verão desde 2019); week_start() calcula a mesma segunda em Python.
+VIEW_SQL = {
+    "postgresql": """
+        CREATE OR REPLACE VIEW current_week_sales AS
+        SELECT seller_id, sale_date,
+               (ARRAY['monday', 'tuesday', 'wednesday', 'thursday', 'friday'])
+                   [EXTRACT(ISODOW FROM sale_date)::int] AS day,
+               value, version
+        FROM sales_facts
+        WHERE sale_date >= date_trunc('week', now() AT TIME ZONE 'America/Sao_Paulo')::date
+          AND sale_date < date_trunc('week', now() AT TIME ZONE 'America/Sao_Paulo')::date + 5
+    """,
+    "sqlite": """
+        CREATE VIEW IF NOT EXISTS current_week_sales AS
+        SELECT seller_id, sale_date,
+               CASE CAST(strftime('%w', sale_date) AS INTEGER)
+                   WHEN 1 THEN 'monday' WHEN 2 THEN 'tuesday' WHEN 3 THEN 'wednesday'
+                   WHEN 4 THEN 'thursday' WHEN 5 THEN 'friday'
+               END AS day,
+               value, version
+        FROM sales_facts
+        WHERE sale_date >= date('now', '-3 hours', 'weekday 0', '-6 days')
+          AND sale_date < date('now', '-3 hours', 'weekday 0', '-1 days')
+    """,
+}
+
+
+def week_start(agora=None):
+    """Segunda-feira da semana corrente (fuso de São Paulo)."""
+    hoje = (agora or datetime.now(TZ)).date()
+    return hoje - timedelta(days=hoje.weekday())
+
+
+def day_date(day, segunda):
+    """Data de 'monday'..'friday' na semana que começa em `segunda`."""
+    return segunda + timedelta(days=WEEKDAYS.index(day))
+
+
+def _month(dia):
+    return date(dia.year, dia.month, 1)
+
+
+def _next_month(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def partition_name(mes):
+    return f"sales_facts_{mes:%Y_%m}"
+
+
+# O DDL vai pela sessão e faz commit: numa conexão à parte ele esperaria
+# para sempre pelo lock que a própria sessão mantém em sales_facts
+
+def create_view():
+    db.session.execute(text(VIEW_SQL[db.engine.dialect.name]))
+    db.session.commit()
+
+
+def ensure_partitions(inicio, fim):
+    """Cria as partições mensais que faltam entre inicio e fim; retorna os nomes criados."""
+    if db.engine.dialect.name != "postgresql":
+        return []
+    existentes = set(db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'sales_facts'::regclass"
+    )).scalars())
+    criadas = []
+    mes = _month(inicio)
+    while mes <= fim:
+        nome = partition_name(mes)
+        if nome not in existentes:
+            db.session.execute(text(
+                f"CREATE TABLE {nome} PARTITION OF sales_facts "
+                f"FOR VALUES FROM ('{mes}') TO ('{_next_month(mes)}')"
+            ))
+            criadas.append(nome)
+        mes = _next_month(mes)
+    db.session.commit()
+    return criadas
+
+
+def ensure_future_partitions(hoje=None):
+    hoje = hoje or datetime.now(TZ).date()
+    fim = _month(hoje)
+    for _ in range(MONTHS_AHEAD):
+        fim = _next_month(fim)
+    return ensure_partitions(hoje, fim)
+
+
+def _bump_version_if_changed(table, excluded):
+    # Regravar o mesmo valor não muda a versão da célula
+    return {
+        "version": case(
+            (table.c.value.is_distinct_from(excluded.value), table.c.version + 1),
+            else_=table.c.version,
+        )
+    }
+
+
+def _save_row_by_row(rows):
+    # Caminho antigo (SELECT + UPDATE/INSERT por célula) para bancos sem ON CONFLICT
+    for row in rows:
+        sale = db.session.get(SaleFact, (row["seller_id"], row["sale_date"]))
+        if sale:
+            if sale.value != row["value"]:
+                sale.version = (sale.version or 0) + 1
+            sale.value = row["value"]
+        else:
+            db.session.add(SaleFact(**row))
+
+
+def upsert_facts(rows):
+    """Grava {seller_id, sale_date, value}; a versão só sobe se o valor mudou. Não faz commit."""
+    if supports_upsert():
+        # Um único INSERT ... ON CONFLICT (seller_id, sale_date) DO UPDATE em lote
+        upsert_rows(
+            SaleFact, rows,
+            index_elements=["seller_id", "sale_date"],
+            update_columns=["value"],
+            set_=_bump_version_if_changed,
+        )
+    else:
+        _save_row_by_row(rows)
+
+
+def record_history(registros):
+    """
+    Leva registros diários ({vendedor, dia, total}) para sales_facts, na
+    transação de quem chama. As partições dos dias precisam existir
+    (ensure_partitions antes, pois ele faz commit).
+    """
+    ids = _seller_ids([r["vendedor"] for r in registros])
+    rows = {
+        (ids[r["vendedor"].casefold()], r["dia"]): {
+            "seller_id": ids[r["vendedor"].casefold()], "sale_date": r["dia"], "value": r["total"] or 0,
+        }
+        for r in registros
+    }
+    if rows:
+        upsert_facts(list(rows.values()))
+    return len(rows)
+
+
+def _seller_ids(nomes):
+    """Id de cada nome; nomes que só existem no histórico viram vendedores inativos."""
+    ids = {s.name.casefold(): s.id for s in Seller.query}
+    novos = sorted({n for n in nomes if n and n.casefold() not in ids})
+    for nome in novos:
+        # "!" não é um hash válido: ninguém faz login com esse vendedor
+        seller = Seller(name=nome, password="!", position=len(ids), active=False)
+        db.session.add(seller)
+        db.session.flush()
+        ids[nome.casefold()] = seller.id
+    return ids
+
+
+def import_legacy():
+    """
+    Preenche sales_facts (migração 0008): daily_sales até a semana passada e
+    a tabela `sales` na semana corrente. Não faz nada se já houver fatos.
+    """
+    if db.session.query(SaleFact.seller_id).first() is not None:
+        return False
+    segunda = week_start()
+    primeiro_dia = db.session.query(db.func.min(DailySales.dia)).scalar() or segunda
+    ensure_partitions(min(primeiro_dia, segunda), segunda)
+
+    nomes = [n for (n,) in db.session.query(DailySales.vendedor).filter(DailySales.dia < segunda).distinct()]
+    legado = []
+    if inspect(db.engine).has_table("sales"):
+        legado = db.session.execute(text("SELECT employee_name, day, value, version FROM sales")).all()
+    ids = _seller_ids(nomes + [row.employee_name for row in legado])
+
+    historico = [
+        {"seller_id": ids[vendedor.casefold()], "sale_date": dia, "value": total or 0, "version": 1}
+        for vendedor, dia, total in db.session.execute(
+            select(DailySales.vendedor, DailySales.dia, DailySales.total).where(DailySales.dia < segunda)
+        )
+    ]
+    semana = [
+        {
+            "seller_id": ids[row.employee_name.casefold()],
+            "sale_date": day_date(row.day, segunda),
+            "value": row.value or 0,
+            "version": row.version or 1,
+        }
+        for row in legado
+        if row.day in WEEKDAYS
+    ]
+    # daily_sales tem um registro por vendedor e dia; `sales`, uma célula por
+    # vendedor e dia da semana. Nomes que só diferem em maiúsculas colidem
+    rows = list({(r["seller_id"], r["sale_date"]): r for r in historico + semana}.values())
+    for i in range(0, len(rows), 5000):
+        upsert_rows(SaleFact, rows[i:i + 5000],
+                    index_elements=["seller_id", "sale_date"], update_columns=["value", "version"])
+    db.session.commit()
+    if rows:
+        print(f"🛠️ {len(rows)} venda(s) importada(s) para sales_facts")
+    return bool(rows)
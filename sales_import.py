@@ -0,0 +1,429 @@
+"""
+Importação em massa de histórico (daily_sales / resumo_history).
+
+Aceita CSV (mesmas colunas do `flask export`), NDJSON e JSON (lista de
+objetos, ou o formato de planilha_data.json com --week-start). Cada linha
+é validada; as inválidas são puladas e listadas no relatório.
+
+As linhas válidas são gravadas em lotes de IMPORT_BATCH com um executemany:
+daily_sales via upsert em (vendedor, dia) (reimportar não duplica, e os
+rollups recebem só a diferença) e o mesmo valor em sales_facts, a
+história por data da grade (vendedor que só existe no arquivo vira
+vendedor inativo); resumo_history via INSERT simples.
+
+Retomada: cada arquivo (sha256 do conteúdo + dataset) tem um registro em
+import_jobs com quantas linhas já foram processadas. Esse contador é
+atualizado na mesma transação de cada lote, então depois de uma falha
+rodar de novo o mesmo arquivo continua do último lote gravado.
+
+Usado por POST /archive/api/import e pelo comando `flask import-sales`.
+"""
+import csv
+import hashlib
+import json
+import math
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import tuple_
+
+from daily_snapshot import DIAS_SEMANA, NOMES_DIAS, VALORES
+from grid_cache import grid_cache
+from models.archive import DailySales, ImportJob, ResumoHistory
+from models.upsert import supports_upsert, upsert_rows
+from models.user import db
+from render_cache import render_cache
+from rollups import apply_daily_sales, lock_days
+from routes.archive import parse_date_arg
+from sales_facts import ensure_partitions, record_history
+
+IMPORT_BATCH = 2000
+IMPORT_FORMATS = ("csv", "ndjson", "json")
+IMPORT_DATASETS = ("daily", "resumo")
+MAX_REPORTED_ERRORS = 50
+
+
+class SalesImportError(ValueError):
+    pass
+
+
+# ---------------------------
+# Leitura do arquivo
+# ---------------------------
+def file_key(path, dataset):
+    digest = hashlib.sha256(dataset.encode() + b"\0")
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def detect_format(filename):
+    ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if ext == "jsonl":
+        return "ndjson"
+    if ext in IMPORT_FORMATS:
+        return ext
+    raise SalesImportError(f"Formato não reconhecido para '{filename}' (use {', '.join(IMPORT_FORMATS)})")
+
+
+def _planilha_records(data, week_start):
+    """planilha_data.json -> um registro por vendedor e dia da semana."""
+    if week_start is None:
+        raise SalesImportError("Arquivo de planilha requer --week-start (segunda-feira da semana)")
+    segunda = week_start - timedelta(days=week_start.weekday())
+    for i, (nome, valores) in enumerate(data.get("spreadsheetData", {}).items(), start=1):
+        for offset, (campo, nome_dia) in enumerate(zip(DIAS_SEMANA, NOMES_DIAS)):
+            valor = valores.get(campo, 0)
+            yield i, {"vendedor": nome, "dia": segunda + timedelta(days=offset), nome_dia: valor, "total": valor}
+
+
+def read_records(path, fmt, week_start=None):
+    """Gera (linha, dict). CSV e NDJSON são lidos em streaming; JSON é carregado inteiro."""
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+    elif fmt == "ndjson":
+        with open(path, encoding="utf-8-sig") as f:
+            for line_num, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_num, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_num, SalesImportError(f"JSON inválido: {e.msg}")
+    elif fmt == "json":
+        with open(path, encoding="utf-8-sig") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise SalesImportError(f"JSON inválido: {e}")
+        if isinstance(data, dict) and "spreadsheetData" in data:
+            yield from _planilha_records(data, week_start)
+        elif isinstance(data, list):
+            yield from enumerate(data, start=1)
+        else:
+            raise SalesImportError("JSON deve ser uma lista de registros ou uma planilha (spreadsheetData)")
+    else:
+        raise SalesImportError(f"Formato inválido: {fmt} (use {', '.join(IMPORT_FORMATS)})")
+
+
+# ---------------------------
+# Validação
+# ---------------------------
+def _texto(record, campo, max_len):
+    valor = record.get(campo)
+    if valor is None or not str(valor).strip():
+        raise ValueError(f"'{campo}' obrigatório")
+    valor = str(valor).strip()
+    if len(valor) > max_len:
+        raise ValueError(f"'{campo}' maior que {max_len} caracteres")
+    return valor
+
+
+def _data(record, campo):
+    valor = record.get(campo)
+    if isinstance(valor, date):
+        return valor
+    if valor is None or not str(valor).strip():
+        raise ValueError(f"'{campo}' obrigatório")
+    valor = str(valor).strip()
+    try:
+        if "/" in valor:
+            return datetime.strptime(valor, "%d/%m/%Y").date()
+        return date.fromisoformat(valor[:10])
+    except ValueError:
+        raise ValueError(f"'{campo}' inválido: {valor} (use AAAA-MM-DD)")
+
+
+def _datetime_opcional(record, campo):
+    valor = record.get(campo)
+    if valor is None or not str(valor).strip():
+        return None
+    try:
+        return datetime.fromisoformat(str(valor).strip())
+    except ValueError:
+        raise ValueError(f"'{campo}' inválido: {valor}")
+
+
+def _numero(record, campo):
+    valor = record.get(campo)
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, bool):
+        raise ValueError(f"'{campo}' não é numérico")
+    if isinstance(valor, str):
+        texto = valor.replace("R$", "").strip()
+        if "," in texto:  # formato brasileiro: 1.234,56
+            texto = texto.replace(".", "").replace(",", ".")
+        try:
+            valor = float(texto)
+        except ValueError:
+            raise ValueError(f"'{campo}' não é numérico: {record.get(campo)}")
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{campo}' não é numérico: {valor}")
+    if not math.isfinite(valor):
+        raise ValueError(f"'{campo}' não é um número finito")
+    return valor
+
+
+def validate_daily(record):
+    vendedor = _texto(record, "vendedor", 100)
+    dia = _data(record, "dia")
+    if dia.weekday() >= 5:
+        raise ValueError(f"'dia' cai no fim de semana: {dia}")
+
+    valores = {campo: _numero(record, campo) for campo in NOMES_DIAS}
+    total = _numero(record, "total")
+    if all(v is None for v in valores.values()):
+        # Só o total: vai para a coluna do dia, como no snapshot diário
+        valores[NOMES_DIAS[dia.weekday()]] = total or 0.0
+    valores = {campo: v or 0.0 for campo, v in valores.items()}
+    if total is None:
+        total = sum(valores.values())
+
+    return dict(
+        valores,
+        vendedor=vendedor,
+        dia=dia,
+        total=total,
+        created_at=_datetime_opcional(record, "created_at") or datetime.combine(dia, datetime.min.time()),
+    )
+
+
+def validate_resumo(record):
+    started_at = _data(record, "started_at")
+    ended_at = _data(record, "ended_at")
+    if ended_at < started_at:
+        raise ValueError("'ended_at' anterior a 'started_at'")
+
+    breakdown = record.get("breakdown") or []
+    if isinstance(breakdown, str):
+        try:
+            breakdown = json.loads(breakdown)
+        except json.JSONDecodeError:
+            raise ValueError("'breakdown' não é JSON válido")
+    if not isinstance(breakdown, list) or not all(isinstance(item, dict) for item in breakdown):
+        raise ValueError("'breakdown' deve ser uma lista [{seller, total}]")
+    breakdown = [
+        {"seller": _texto(item, "seller", 100), "total": _numero(item, "total") or 0.0}
+        for item in breakdown
+    ]
+
+    total = _numero(record, "total")
+    if total is None:
+        total = sum(item["total"] for item in breakdown)
+
+    week_label = str(record.get("week_label") or f"{started_at} a {ended_at}").strip()
+    if len(week_label) > 50:
+        raise ValueError("'week_label' maior que 50 caracteres")
+
+    return {
+        "week_label": week_label,
+        "started_at": started_at,
+        "ended_at": ended_at,
+        "total": total,
+        "breakdown": breakdown,
+        "created_at": _datetime_opcional(record, "created_at") or datetime.combine(started_at, datetime.min.time()),
+    }
+
+
+# ---------------------------
+# Gravação em lotes
+# ---------------------------
+def _write_daily(rows):
+    # Um mesmo (vendedor, dia) duas vezes no lote: vale o último
+    # (o ON CONFLICT não pode atualizar a mesma linha duas vezes num comando)
+    rows = list({(r["vendedor"], r["dia"]): r for r in rows}.values())
+    # Antes das travas: ensure_partitions faz commit (só DDL; o lote ainda não foi escrito)
+    ensure_partitions(min(r["dia"] for r in rows), max(r["dia"] for r in rows))
+    lock_days(r["dia"] for r in rows)
+    existentes = {
+        (r.vendedor, r.dia): r
+        for r in DailySales.query.filter(
+            tuple_(DailySales.vendedor, DailySales.dia).in_([(r["vendedor"], r["dia"]) for r in rows])
+        )
+    }
+    substituidos = [
+        {"vendedor": r.vendedor, "dia": r.dia, "total": r.total}
+        for r in existentes.values()
+    ]
+
+    if supports_upsert():
+        upsert_rows(DailySales, rows, index_elements=["vendedor", "dia"], update_columns=VALORES)
+    else:
+        for row in rows:
+            record = existentes.get((row["vendedor"], row["dia"]))
+            if record:
+                for campo in VALORES:
+                    setattr(record, campo, row[campo])
+            else:
+                db.session.add(DailySales(**row))
+    apply_daily_sales(rows, substituidos=substituidos)
+    record_history(rows)
+    return len(rows)
+
+
+def _write_resumo(rows):
+    db.session.execute(ResumoHistory.__table__.insert(), rows)
+    return len(rows)
+
+
+DATASETS = {
+    "daily": (validate_daily, _write_daily),
+    "resumo": (validate_resumo, _write_resumo),
+}
+
+
+def _report(job, dataset, **extra):
+    return dict(
+        job_id=job.id,
+        status=job.status,
+        dataset=dataset,
+        rows_committed=job.rows_committed,
+        batches_committed=job.batches_committed,
+        **extra,
+    )
+
+
+def import_file(path, dataset, fmt=None, week_start=None, batch_size=IMPORT_BATCH,
+                filename=None, force=False, on_batch=None):
+    """
+    Importa o arquivo `path` no dataset (daily|resumo) e retorna um relatório
+    (linhas lidas/gravadas/inválidas, linhas por segundo, erros de validação).
+    Um arquivo já importado por completo é ignorado, a não ser com force=True.
+    """
+    if dataset not in DATASETS:
+        raise SalesImportError(f"Dataset inválido: {dataset} (use {', '.join(IMPORT_DATASETS)})")
+    if batch_size < 1:
+        raise SalesImportError("batch_size deve ser positivo")
+    filename = filename or os.path.basename(path)
+    fmt = fmt or detect_format(filename)
+    validate, write = DATASETS[dataset]
+
+    key = file_key(path, dataset)
+    job = ImportJob.query.filter_by(source_key=key).first()
+    if job is not None and job.status == "done" and not force:
+        return _report(job, dataset, skipped=True, message="Arquivo já importado")
+    if job is None:
+        job = ImportJob(source_key=key, dataset=dataset)
+        db.session.add(job)
+    elif job.status == "done":
+        job.rows_committed = 0
+        job.batches_committed = 0
+    job.filename = filename[:255]
+    job.status = "running"
+    job.error = None
+    job.finished_at = None
+    db.session.commit()
+
+    resumed_from = job.rows_committed
+    read = imported = invalid = 0
+    errors = []
+    batch = []
+    position = 0
+    started = time.perf_counter()
+
+    def flush():
+        nonlocal imported, batch
+        if batch:
+            imported += write(batch)
+        job.rows_committed = position
+        job.batches_committed += 1
+        db.session.commit()  # lote + checkpoint na mesma transação
+        if dataset == "daily":
+            render_cache.invalidate("history")
+            grid_cache.invalidate()  # o lote pode ter dias da semana corrente
+        batch = []
+        if on_batch:
+            on_batch(job, imported, time.perf_counter() - started)
+
+    try:
+        for line_num, record in read_records(path, fmt, week_start=week_start):
+            position += 1
+            if position <= resumed_from:
+                continue
+            read += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                if not isinstance(record, dict):
+                    raise ValueError("registro deve ser um objeto")
+                batch.append(validate(record))
+            except ValueError as e:
+                invalid += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_num, "error": str(e)})
+            if len(batch) >= batch_size:
+                flush()
+        if batch or position > job.rows_committed:
+            flush()
+    except Exception as e:
+        db.session.rollback()
+        job.status = "failed"
+        job.error = str(e)[:2000]
+        db.session.commit()
+        raise
+
+    job.status = "done"
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    return _report(
+        job, dataset,
+        skipped=False,
+        resumed_from=resumed_from,
+        rows_read=read,
+        imported=imported,
+        invalid=invalid,
+        errors=errors,
+        seconds=round(elapsed, 3),
+        rows_per_second=round(read / elapsed, 1) if elapsed > 0 else None,
+    )
+
+
+@click.command("import-sales")
+@with_appcontext
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--dataset", type=click.Choice(IMPORT_DATASETS), default="daily", show_default=True)
+@click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), help="Padrão: pela extensão do arquivo")
+@click.option("--week-start", help="Segunda-feira da semana (AAAA-MM-DD), para arquivos de planilha")
+@click.option("--batch-size", type=int, default=IMPORT_BATCH, show_default=True)
+@click.option("--force", is_flag=True, help="Importa de novo um arquivo já importado")
+def import_command(path, dataset, fmt, week_start, batch_size, force):
+    """Importa histórico de vendas (CSV, NDJSON ou JSON) em lotes, com retomada."""
+    def progresso(job, imported, elapsed):
+        rate = imported / elapsed if elapsed > 0 else 0
+        click.echo(f"  lote {job.batches_committed}: {job.rows_committed} linhas processadas ({rate:,.0f} linhas/s)")
+
+    try:
+        report = import_file(
+            path, dataset,
+            fmt=fmt,
+            week_start=parse_date_arg(week_start, "week-start"),
+            batch_size=batch_size,
+            force=force,
+            on_batch=progresso,
+        )
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    if report["skipped"]:
+        click.echo(f"{report['message']} (job {report['job_id']}); use --force para importar de novo.")
+        return
+    for erro in report["errors"]:
+        click.echo(f"  linha {erro['line']}: {erro['error']}", err=True)
+    if report["resumed_from"]:
+        click.echo(f"Retomado a partir da linha {report['resumed_from']}.")
+    click.echo(
+        f"Importação concluída: {report['imported']} gravadas, {report['invalid']} inválidas, "
+        f"{report['rows_read']} lidas em {report['seconds']}s ({report['rows_per_second'] or 0:,.0f} linhas/s)."
+    )
@@ -1,143 +1,362 @@
-from datetime import datetime
+"""
+Jobs agendados: snapshot diário (18:20, seg-sex), virada da semana (00:01
+de segunda) e partições de sales_facts (dia 1 de cada mês, 03:00).
+
+Todo processo (cada worker do gunicorn, cada instância) chama
+start_scheduler, mas só o líder eleito (ver leader.py) roda os jobs:
+
+- os jobs ficam no banco (SQLAlchemyJobStore, tabela apscheduler_jobs),
+  com a hora do próximo disparo; um novo líder continua de onde o
+  anterior parou e, depois de uma parada, dispara na hora os jobs
+  atrasados (coalesce: uma vez só, por mais disparos que tenham passado)
+- run_job recupera cada disparo perdido dentro da janela do job: o
+  snapshot diário refaz os dias da semana corrente que faltam (a planilha
+  ainda tem esses valores); a virada da semana só descarta a grade em
+  cache e não é refeita depois de RESET_GRACE
+- cada disparo vira uma linha em job_runs (chave única job + horário):
+  mesmo que dois processos se considerem líderes, só um executa. A linha
+  guarda quem executou, duração e resultado (success/error). Um processo
+  morto no meio deixa a linha em "running": esse disparo não é refeito
+  sozinho (o snapshot diário pode ser regravado por POST /archive/api/daily-save)
+
+Última execução de cada job: flask jobs status, ou GET /metrics.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import click
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
-from pytz import timezone
+from apscheduler.schedulers.base import STATE_STOPPED
+from apscheduler.triggers.cron import CronTrigger
+from flask.cli import AppGroup
+from pytz import timezone, utc
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
 
 # imports diretos sem src/
-from routes.data import load_data
+import metrics
+from routes.data import load_data, reset_data
+from sales_facts import MONTHS_AHEAD, ensure_future_partitions
+from models.jobs import JobRun
 from models.user import db
+from daily_snapshot import save_daily_snapshot
+from db_pool import pgbouncer_mode
+from formatting import format_brl
+from leader import make_leader, process_id
+
+TZ = timezone("America/Sao_Paulo")
+HOLDER = process_id()
+# Virada atrasada além disso é descartada: o cache da grade já expirou sozinho
+RESET_GRACE = timedelta(hours=8)
 
-# Scheduler global
-scheduler = BackgroundScheduler()
+# Scheduler global (só é iniciado no processo líder)
+scheduler = BackgroundScheduler(timezone=TZ)
+_state = {"app": None, "leader": None, "is_leader": False, "thread": None, "stop": threading.Event()}
 
 # ---------------------------
-# Filtro para moeda brasileira
+# Função que salva resumo diário
 # ---------------------------
-def format_brl(value):
+def salvar_resumo_diario(agendado):
+    """Grava o dia do disparo `agendado` (não o de hoje: pode ser recuperação)."""
+    data = load_data()
+    spreadsheet = data.get("spreadsheetData", {})
+
+    dias_semana = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+    nomes_dias = ["segunda", "terca", "quarta", "quinta", "sexta"]
+
+    hoje = agendado
+    dia_semana = hoje.weekday()
+
+    if dia_semana >= 5:
+        print(f"[INFO] Fim de semana ({hoje.date()}) — não salva resumo diário")
+        return "Fim de semana"
+
+    campo_dia = dias_semana[dia_semana]
+    nome_dia = nomes_dias[dia_semana]
+
+    print(f"[INFO] Salvando resumo diário para {nome_dia} ({hoje.date()})")
+
+    today = hoje.date()
+    total_dia = 0
+    breakdown = {}
+
+    for nome, valores in spreadsheet.items():
+        valor_dia = float(valores.get(campo_dia, 0) or 0)
+        breakdown[nome] = valor_dia
+        total_dia += valor_dia
+
     try:
-        return f"{float(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except (ValueError, TypeError):
-        return "0,00"
+        # Upsert em (vendedor, dia): rodar de novo no mesmo dia não duplica
+        save_daily_snapshot(spreadsheet, today)
+    except Exception as e:
+        print(f"[FALLBACK] Erro ao usar DailySales: {e}")
+        from models.archive import ResumoHistory
+        registro = ResumoHistory(
+            week_label=f"Auto {today} - {nome_dia}",
+            started_at=hoje,
+            ended_at=hoje,
+            total=total_dia,
+            breakdown=breakdown,
+            created_at=hoje
+        )
+        db.session.add(registro)
+        db.session.commit()
+
+    print(f"[OK] Resumo diário salvo em {hoje} — Total: R$ {format_brl(total_dia)}")
+    return f"{nome_dia} {today}: R$ {format_brl(total_dia)}"
 
 # ---------------------------
-# Função que salva resumo diário
+# Virada da semana na planilha
 # ---------------------------
-def salvar_resumo_diario(app):
-    with app.app_context():
-        try:
-            data = load_data()
-            spreadsheet = data.get("spreadsheetData", {})
-
-            dias_semana = ["monday", "tuesday", "wednesday", "thursday", "friday"]
-            nomes_dias = ["segunda", "terca", "quarta", "quinta", "sexta"]
-
-            hoje = datetime.now(timezone("America/Sao_Paulo"))
-            dia_semana = hoje.weekday()
-
-            if dia_semana >= 5:
-                print(f"[INFO] Fim de semana ({hoje.date()}) — não salva resumo diário")
-                return
-
-            campo_dia = dias_semana[dia_semana]
-            nome_dia = nomes_dias[dia_semana]
-
-            print(f"[INFO] Salvando resumo diário para {nome_dia} ({hoje.date()})")
-
-            today = hoje.date()
-            total_dia = 0
-            breakdown = {}
-
-            for nome, valores in spreadsheet.items():
-                valor_dia = float(valores.get(campo_dia, 0) or 0)
-                breakdown[nome] = valor_dia
-                total_dia += valor_dia
-
-            try:
-                from models.archive import DailySales
-                for nome, valores in spreadsheet.items():
-                    valor_dia = float(valores.get(campo_dia, 0) or 0)
-                    record = DailySales(
-                        vendedor=nome,
-                        dia=today,
-                        segunda=valor_dia if nome_dia == "segunda" else 0,
-                        terca=valor_dia if nome_dia == "terca" else 0,
-                        quarta=valor_dia if nome_dia == "quarta" else 0,
-                        quinta=valor_dia if nome_dia == "quinta" else 0,
-                        sexta=valor_dia if nome_dia == "sexta" else 0,
-                        total=valor_dia
-                    )
-                    db.session.add(record)
-            except Exception as e:
-                print(f"[FALLBACK] Erro ao usar DailySales: {e}")
-                from models.archive import ResumoHistory
-                registro = ResumoHistory(
-                    week_label=f"Auto {today} - {nome_dia}",
-                    started_at=hoje,
-                    ended_at=hoje,
-                    total=total_dia,
-                    breakdown=breakdown,
-                    created_at=hoje
-                )
-                db.session.add(registro)
-
-            db.session.commit()
-            print(f"[OK] Resumo diário salvo em {hoje} — Total: R$ {format_brl(total_dia)}")
+def reset_planilha_semanal(agendado):
+    # Nada é apagado: a view current_week_sales já mostra a semana nova,
+    # só o cache da grade é invalidado
+    reset_data()
+    print(f"[OK] Planilha na semana nova em {datetime.now(TZ)}")
+    return "Semana nova"
 
-        except Exception as e:
-            print(f"[ERRO] salvar_resumo_diario: {e}")
+# ---------------------------
+# Partições mensais de sales_facts (PostgreSQL)
+# ---------------------------
+def criar_particoes(agendado):
+    criadas = ensure_future_partitions(agendado.date())
+    print(f"[OK] Partições de sales_facts até {MONTHS_AHEAD} meses à frente: {len(criadas)} criada(s)")
+    return ", ".join(criadas) or "Nenhuma partição nova"
 
 # ---------------------------
-# Função que zera a planilha semanal
+# Jobs e recuperação de disparos perdidos
 # ---------------------------
-def reset_planilha_semanal(app):
-    with app.app_context():
-        try:
-            data = load_data()
-            spreadsheet = data.get("spreadsheetData", {})
-
-            for nome in spreadsheet:
-                spreadsheet[nome] = {
-                    "monday": 0,
-                    "tuesday": 0,
-                    "wednesday": 0,
-                    "thursday": 0,
-                    "friday": 0
-                }
-
-            from models.user import SpreadsheetData
-            for vendedor in spreadsheet:
-                record = SpreadsheetData.query.filter_by(vendedor=vendedor).first()
-                if record:
-                    record.monday = 0
-                    record.tuesday = 0
-                    record.wednesday = 0
-                    record.thursday = 0
-                    record.friday = 0
-
-            db.session.commit()
-            print(f"[OK] Planilha semanal zerada em {datetime.now(timezone('America/Sao_Paulo'))}")
+# window(agora): disparo mais antigo que ainda vale a pena executar
+Job = namedtuple("Job", ["func", "trigger", "window"])
+
+
+def _inicio_da_semana(agora):
+    segunda = agora.date() - timedelta(days=agora.weekday())
+    return TZ.localize(datetime.combine(segunda, datetime.min.time()))
+
+
+JOBS = {
+    # A planilha só guarda a semana corrente: dias de semanas anteriores não têm como ser refeitos
+    "resumo_diario": Job(
+        salvar_resumo_diario,
+        CronTrigger(day_of_week="mon-fri", hour=18, minute=20, timezone=TZ),
+        _inicio_da_semana,
+    ),
+    "reset_semanal": Job(
+        reset_planilha_semanal,
+        CronTrigger(day_of_week="mon", hour=0, minute=1, timezone=TZ),
+        lambda agora: agora - RESET_GRACE,
+    ),
+    # Folga de MONTHS_AHEAD meses: um disparo perdido é refeito no mês seguinte
+    "particoes": Job(
+        criar_particoes,
+        CronTrigger(day=1, hour=3, minute=0, timezone=TZ),
+        lambda agora: agora - timedelta(days=31),
+    ),
+}
+
+
+def _utc(dt):
+    return dt.astimezone(utc).replace(tzinfo=None)
+
+
+def fire_times(trigger, inicio, fim):
+    """Disparos do trigger entre inicio e fim (inclusive)."""
+    horarios = []
+    proximo = trigger.get_next_fire_time(None, inicio)
+    while proximo is not None and proximo <= fim:
+        horarios.append(proximo)
+        proximo = trigger.get_next_fire_time(proximo, proximo + timedelta(seconds=1))
+    return horarios
+
+
+def pending_runs(job_id, agora):
+    """Disparos dentro da janela do job que ainda não têm linha em job_runs."""
+    job = JOBS[job_id]
+    horarios = fire_times(job.trigger, job.window(agora), agora)
+    if not horarios:
+        return []
+    feitos = {
+        r.scheduled_for
+        for r in JobRun.query.filter(JobRun.job_id == job_id, JobRun.scheduled_for >= _utc(horarios[0]))
+    }
+    return [h for h in horarios if _utc(h) not in feitos]
+
 
+def _execute(job_id, agendado):
+    run = JobRun(job_id=job_id, scheduled_for=_utc(agendado), status="running", holder=HOLDER)
+    db.session.add(run)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None  # outro processo já pegou este disparo
+    run_id = run.id
+
+    start = time.perf_counter()
+    try:
+        status, message = "success", JOBS[job_id].func(agendado)
+    except Exception as e:
+        db.session.rollback()
+        status, message = "error", str(e)
+        print(f"[ERRO] {job_id} ({agendado}): {e}")
+    db.session.execute(
+        update(JobRun)
+        .where(JobRun.id == run_id)
+        .values(
+            status=status,
+            message=message,
+            finished_at=datetime.utcnow(),
+            duration_ms=round((time.perf_counter() - start) * 1000, 1),
+        )
+    )
+    db.session.commit()
+    return status
+
+
+def run_job(job_id):
+    """
+    Ponto de entrada gravado no job store ("scheduler:run_job", [job_id]).
+    Executa, em ordem, todo disparo do job ainda pendente na janela.
+    """
+    with _state["app"].app_context():
+        for agendado in pending_runs(job_id, datetime.now(TZ)):
+            _execute(job_id, agendado)
+
+# ---------------------------
+# Eleição de líder
+# ---------------------------
+def _sync_jobs():
+    # Mantém o próximo disparo gravado (é ele que revela atrasos); só troca
+    # o trigger se o horário mudou no código
+    for job_id, job in JOBS.items():
+        stored = scheduler.get_job(job_id)
+        if stored is None:
+            scheduler.add_job("scheduler:run_job", trigger=job.trigger, args=[job_id], id=job_id, name=job_id)
+        elif str(stored.trigger) != str(job.trigger):
+            scheduler.reschedule_job(job_id, trigger=job.trigger)
+
+
+def _become_leader():
+    if scheduler.state == STATE_STOPPED:
+        scheduler.start(paused=True)
+        _sync_jobs()
+    scheduler.resume()
+    _state["is_leader"] = True
+    print(f"[INFO] Scheduler ativo neste processo ({HOLDER}): resumo diário às 18:20, virada da semana às 00:01 de segunda, partições no dia 1")
+
+
+def _step_down():
+    scheduler.pause()
+    _state["is_leader"] = False
+    print(f"[INFO] Scheduler pausado neste processo ({HOLDER}): outro processo é o líder")
+
+
+def _election_loop(interval):
+    while not _state["stop"].is_set():
+        try:
+            is_leader = _state["leader"].acquire()
+        except Exception as e:
+            print(f"[ERRO] eleição do scheduler: {e}")
+            is_leader = False
+        try:
+            if is_leader and not _state["is_leader"]:
+                _become_leader()
+            elif not is_leader and _state["is_leader"]:
+                _step_down()
         except Exception as e:
-            print(f"[ERRO] reset_planilha_semanal: {e}")
+            print(f"[ERRO] scheduler: {e}")
+        _state["stop"].wait(interval)
 
 # ---------------------------
 # Inicializa o scheduler
 # ---------------------------
 def start_scheduler(app):
-    if not scheduler.get_jobs():
-        scheduler.add_job(
-            func=lambda: salvar_resumo_diario(app),
-            trigger="cron",
-            hour=18,
-            minute=20,
-            timezone=timezone("America/Sao_Paulo")
-        )
-        scheduler.add_job(
-            func=lambda: reset_planilha_semanal(app),
-            trigger="cron",
-            day_of_week="mon",
-            hour=0,
-            minute=1,
-            timezone=timezone("America/Sao_Paulo")
-        )
-        scheduler.start()
-        print("[INFO] Scheduler iniciado: resumo diário às 18:20 e reset semanal às 00:01 de segunda")
\ No newline at end of file
+    """Entra na eleição; se este processo for o líder, os jobs rodam aqui."""
+    if _state["thread"] is not None:
+        return
+    app.config.setdefault("SCHEDULER_LEASE_SECONDS", int(os.getenv("SCHEDULER_LEASE_SECONDS", "60")))
+    app.config.setdefault("SCHEDULER_HEARTBEAT_SECONDS", int(os.getenv("SCHEDULER_HEARTBEAT_SECONDS", "15")))
+    _state["app"] = app
+    with app.app_context():
+        engine = db.engine
+    _state["leader"] = make_leader(engine, HOLDER, app.config["SCHEDULER_LEASE_SECONDS"], pgbouncer=pgbouncer_mode())
+    scheduler.configure(
+        jobstores={"default": SQLAlchemyJobStore(engine=engine, tablename="apscheduler_jobs")},
+        # Um job por vez, na ordem dos horários: na recuperação o snapshot de
+        # sexta roda antes da virada de segunda
+        executors={"default": ThreadPoolExecutor(1)},
+        job_defaults={"coalesce": True, "misfire_grace_time": None, "max_instances": 1},
+    )
+    _state["thread"] = threading.Thread(
+        target=_election_loop, args=(app.config["SCHEDULER_HEARTBEAT_SECONDS"],),
+        name="scheduler-leader", daemon=True,
+    )
+    _state["thread"].start()
+    atexit.register(stop_scheduler)
+    print(f"[INFO] Scheduler: eleição de líder iniciada ({_state['leader'].kind})")
+
+
+def stop_scheduler():
+    _state["stop"].set()
+    if scheduler.state != STATE_STOPPED:
+        scheduler.shutdown(wait=False)
+    if _state["is_leader"]:
+        _state["is_leader"] = False
+        try:
+            _state["leader"].release()
+        except Exception as e:
+            print(f"[ERRO] ao liberar a liderança do scheduler: {e}")
+
+# ---------------------------
+# Status (CLI e /metrics)
+# ---------------------------
+def last_runs():
+    """Última execução de cada job (JobRun por job_id)."""
+    ultimas = db.session.query(func.max(JobRun.id)).group_by(JobRun.job_id)
+    return {r.job_id: r for r in JobRun.query.filter(JobRun.id.in_(ultimas))}
+
+
+@metrics.register_collector
+def scheduler_metrics():
+    lines = metrics.gauge("scheduler_leader", "1 se este processo roda os jobs agendados", int(_state["is_leader"]))
+    if _state["app"] is None:
+        return lines
+    runs = last_runs()
+    series = (
+        ("scheduler_job_last_run_timestamp_seconds", "Início da última execução (epoch)",
+         lambda r: r.started_at.replace(tzinfo=utc).timestamp()),
+        ("scheduler_job_last_duration_seconds", "Duração da última execução",
+         lambda r: (r.duration_ms or 0) / 1000),
+        ("scheduler_job_last_success", "1 se a última execução terminou sem erro",
+         lambda r: int(r.status == "success")),
+    )
+    for name, help_text, value in series:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        lines += [f'{name}{{job="{job_id}"}} {metrics.format_value(value(r))}' for job_id, r in sorted(runs.items())]
+    return lines
+
+
+jobs_cli = AppGroup("jobs", help="Jobs agendados (resumo diário, virada da semana, partições).")
+
+
+@jobs_cli.command("status")
+def status_command():
+    """Última execução, duração e resultado de cada job."""
+    runs = last_runs()
+    for job_id in JOBS:
+        r = runs.get(job_id)
+        if r is None:
+            click.echo(f"{job_id}: nunca executado")
+            continue
+        click.echo(
+            f"{job_id}: {r.status} — agendado {r.scheduled_for:%Y-%m-%d %H:%M} UTC, "
+            f"início {r.started_at:%Y-%m-%d %H:%M:%S}, {r.duration_ms or 0:.0f} ms, {r.holder}"
+            + (f" — {r.message}" if r.message else "")
+        )
\ No newline at end of file
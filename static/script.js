@@ -3,6 +3,7 @@ let currentUser = null;
 let isAdmin = false;
 let employees = [];
 let spreadsheetData = {};
+let spreadsheetVersions = {};
 
 // Inicialização
 document.addEventListener('DOMContentLoaded', function() {
@@ -51,6 +52,7 @@ async function loadDataFromServer() {
             const data = await response.json();
             employees = data.employees || [];
             spreadsheetData = data.spreadsheetData || {};
+            spreadsheetVersions = data.versions || {};
             
             employees.forEach(emp => {
                 if (!spreadsheetData[emp.name]) {
@@ -92,6 +94,52 @@ async function saveDataToServer() {
             throw new Error('Erro ao salvar dados no servidor');
         }
         
+        // Versões (e valores) gravados: o próximo PATCH parte delas
+        const data = await response.json();
+        if (data.versions) {
+            spreadsheetVersions = data.versions;
+        }
+        if (data.spreadsheetData) {
+            Object.assign(spreadsheetData, data.spreadsheetData);
+        }
+        return true;
+    } catch (error) {
+        console.error('Erro ao salvar dados:', error);
+        showMessage('Erro ao salvar dados no servidor!', 'error');
+        return false;
+    }
+}
+
+// Envia apenas as células editadas: [{seller, day, value}]
+async function saveCellsToServer(cells) {
+    const payload = cells.map(cell => ({
+        ...cell,
+        version: getCellVersion(cell.seller, cell.day)
+    }));
+
+    try {
+        const response = await fetch('/api/data', {
+            method: 'PATCH',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ cells: payload }),
+            credentials: 'include'
+        });
+        const data = await response.json();
+
+        if (response.status === 409) {
+            // Outra pessoa alterou a mesma célula: aplica o valor do servidor
+            applyServerCells(data.conflicts || []);
+            renderSpreadsheet();
+            showMessage('Esta célula foi alterada por outra pessoa. Valores atualizados.', 'error');
+            return false;
+        }
+        if (!response.ok) {
+            throw new Error(data.error || 'Erro ao salvar dados no servidor');
+        }
+
+        applyServerCells(data.cells || []);
         return true;
     } catch (error) {
         console.error('Erro ao salvar dados:', error);
@@ -100,6 +148,26 @@ async function saveDataToServer() {
     }
 }
 
+function getCellVersion(employeeName, day) {
+    const versions = spreadsheetVersions[employeeName];
+    return versions && versions[day] !== undefined ? versions[day] : 0;
+}
+
+function applyServerCells(cells) {
+    cells.forEach(cell => {
+        if (!spreadsheetData[cell.seller]) {
+            spreadsheetData[cell.seller] = {
+                monday: 0, tuesday: 0, wednesday: 0, thursday: 0, friday: 0
+            };
+        }
+        if (!spreadsheetVersions[cell.seller]) {
+            spreadsheetVersions[cell.seller] = {};
+        }
+        spreadsheetData[cell.seller][cell.day] = cell.value;
+        spreadsheetVersions[cell.seller][cell.day] = cell.version;
+    });
+}
+
 function initializeSpreadsheetData() {
     spreadsheetData = {};
     employees.forEach(emp => {
@@ -275,10 +343,14 @@ async function finishEditing(cell, input) {
         };
     }
     
+    const oldValue = spreadsheetData[employee][day];
     spreadsheetData[employee][day] = newValue;
     cell.textContent = formatCurrency(newValue);
     
-    await saveDataToServer();
+    // Nada mudou: não há o que enviar
+    if (oldValue !== newValue) {
+        await saveCellsToServer([{ seller: employee, day: day, value: newValue }]);
+    }
     updateTotals();
 }
 
@@ -426,19 +498,25 @@ async function handleAddEmployee(e) {
 
 async function removeEmployee(employeeName) {
     if (confirm(`Tem certeza que deseja remover ${employeeName}?`)) {
-        const backupEmployees = [...employees];
-        const backupSpreadsheetData = { ...spreadsheetData };
+        try {
+            const response = await fetch(`/api/sellers/${encodeURIComponent(employeeName)}`, {
+                method: 'DELETE',
+                credentials: 'include'
+            });
+            const data = await response.json();
+            if (!data.success) {
+                showMessage(data.message || 'Erro ao remover funcionário', 'error');
+                return;
+            }
+        } catch (error) {
+            console.error('Erro ao remover funcionário:', error);
+            showMessage('Erro de conexão. Tente novamente.', 'error');
+            return;
+        }
         
         employees = employees.filter(emp => emp.name !== employeeName);
         delete spreadsheetData[employeeName];
         
-        const saved = await saveDataToServer();
-        if (!saved) {
-            employees = backupEmployees;
-            spreadsheetData = backupSpreadsheetData;
-            return;
-        }
-        
         renderEmployeeManagement();
         renderSpreadsheet();
         showMessage('Funcionário removido com sucesso!', 'success');